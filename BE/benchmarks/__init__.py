@@ -0,0 +1,3 @@
+"""
+Benchmarks package - standalone performance measurement scripts (run from the BE directory)
+"""
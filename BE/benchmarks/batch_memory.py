@@ -0,0 +1,93 @@
+"""
+Memory benchmark for /ask-batch processing
+
+Answers batches of unique questions against the local stub provider and reports the transient
+memory peak (peak during the batch minus what is still held afterwards, i.e. excluding the
+results and cache entries) with the bounded window and with one coroutine per question.
+
+Usage (from the BE directory):
+    python -m benchmarks.batch_memory [--sizes 50 200 1000] [--ttft 0.05] [--token-delay 0]
+"""
+
+import os
+import gc
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+import uvicorn
+
+from benchmarks.stub_provider import StubConfig, create_app
+
+
+def _start_stub() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+async def _measure(answer_batch, questions) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    results = await answer_batch(questions)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    errors = sum(1 for result in results if result.error_message)
+    return peak - current, elapsed, errors
+
+
+async def _run(sizes, chunk_size: int) -> None:
+    # Imported here so the cache lives in the temporary working directory set up by main()
+    from config import settings
+    from schemas.requests import QuestionData
+    from routes.quiz import answer_batch
+
+    print(f"{'questions':>9}  {'mode':<10} {'transient peak':>15} {'time':>8}  errors")
+    for size in sizes:
+        for mode in ("bounded", "unbounded"):
+            settings.batch_chunk_size = chunk_size if mode == "bounded" else size
+            questions = [
+                QuestionData(question=f"{mode} benchmark question {size}-{i}: which option is correct?",
+                             options=["alpha", "beta", "gamma", "delta"])
+                for i in range(size)
+            ]
+            transient, elapsed, errors = await _measure(answer_batch, questions)
+            print(f"{size:>9}  {mode:<10} {transient / 1024:>12.0f} KiB {elapsed:>7.2f}s  {errors}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="/ask-batch memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--chunk-size", type=int, default=10)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    StubConfig.ttft = args.ttft
+    StubConfig.token_delay = args.token_delay
+    port = _start_stub()
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    # Keep periodic cache snapshots (which scale with cache size) out of the measurement
+    os.environ.setdefault("CACHE_SAVE_INTERVAL", "3600")
+    logging.disable(logging.WARNING)
+    os.chdir(tempfile.mkdtemp(prefix="batch-memory-"))
+    asyncio.run(_run(args.sizes, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
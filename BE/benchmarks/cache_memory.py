@@ -0,0 +1,91 @@
+"""
+Memory benchmark for the response cache storage layer
+
+Loads the existing cache files and reports bytes per entry for:
+- the legacy layout (one ModelResponse object per entry)
+- compact entries (reasoning as a span into raw, interned model names)
+- compact entries with cold-entry compression
+
+Usage (from the BE directory):
+    python -m benchmarks.cache_memory [--cache-dir cache]
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from pathlib import Path
+
+from schemas.responses import ModelResponse
+from services.cache_storage import CompactEntry, resolve_compression
+
+
+def _measure(build) -> int:
+    """Return bytes retained by the object graph produced by build()"""
+    gc.collect()
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    result = build()
+    gc.collect()
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, "filename"))
+    del result
+    return retained
+
+
+def _legacy(text: str) -> dict:
+    data = json.loads(text)
+    return {
+        key: ModelResponse(
+            model=item["model"],
+            answer=item["answer"],
+            confidence=item["confidence"],
+            raw=item["raw"],
+            reasoning=item.get("reasoning"),
+        )
+        for key, item in data.items()
+    }
+
+
+def _compact(text: str, codec: str) -> dict:
+    data = json.loads(text)
+    cache = {}
+    for key, item in data.items():
+        entry = CompactEntry.from_dict(item)
+        entry.compress(codec)
+        cache[key] = entry
+    return cache
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cache storage memory benchmark")
+    parser.add_argument("--cache-dir", default="cache", help="Directory with *_cache.json files")
+    parser.add_argument("--codec", default="zlib", help="Cold-entry codec to measure (zlib or zstd)")
+    args = parser.parse_args()
+
+    codec = resolve_compression(args.codec)
+    print(f"{'file':<24}{'entries':>8}{'legacy B/e':>12}{'compact B/e':>13}{codec + ' B/e':>12}{'disk old':>11}{'disk new':>11}")
+
+    for cache_file in sorted(Path(args.cache_dir).glob("*_cache.json")):
+        text = cache_file.read_text(encoding="utf-8")
+        data = json.loads(text)
+        if not data:
+            print(f"{cache_file.name:<24}{0:>8}  (empty)")
+            continue
+
+        entries = len(data)
+        # Each build parses the file again so measured objects own their strings
+        legacy = _measure(lambda: _legacy(text)) / entries
+        compact = _measure(lambda: _compact(text, "none")) / entries
+        compressed = _measure(lambda: _compact(text, codec)) / entries
+
+        disk_old = len(json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")) / entries
+        new_data = {key: CompactEntry.from_dict(item).to_dict() for key, item in data.items()}
+        disk_new = len(json.dumps(new_data, indent=2, ensure_ascii=False).encode("utf-8")) / entries
+
+        print(f"{cache_file.name:<24}{entries:>8}{legacy:>12.0f}{compact:>13.0f}{compressed:>12.0f}{disk_old:>11.0f}{disk_new:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
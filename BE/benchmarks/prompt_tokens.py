@@ -0,0 +1,106 @@
+"""
+Prompt token benchmark: previous f-string templates vs. compiled prompts
+
+Counts input tokens per call locally (tiktoken when installed, otherwise the estimator in
+services.prompts) over a spread of question lengths, plus how much of each request is an
+identical static prefix and the output token cap per call.
+
+Usage (from the BE directory):
+    python -m benchmarks.prompt_tokens [--questions 200]
+"""
+
+import random
+import argparse
+import statistics
+
+from services.prompts import OPENAI_PROMPT, XAI_PROMPT, GEMINI_PROMPT, count_tokens, format_options, tokenizer_name
+from config import settings
+
+# The templates as they were sent before compilation (indentation included)
+LEGACY_SYSTEM = "You are a highly accurate quiz assistant. Always provide clear, confident answers in the requested format."
+
+LEGACY_QUIZ = """You are an expert quiz assistant. Analyze this question carefully and provide the best answer.
+
+            Question: {question}
+
+            Options:
+            {options_text}
+
+            Instructions:
+            1. Think through each option systematically
+            2. Choose the most accurate answer
+            3. Provide your confidence level (1-10)
+
+            Format your response as:
+            Answer: [A/B/C/D]
+            Confidence: [1-10]
+            Reasoning: [Brief explanation]"""
+
+LEGACY_GEMINI = """Analyze this educational quiz question and select the most accurate answer.
+
+            Question: {question}
+
+            Options:
+            {options_text}
+
+            Please provide:
+            1. Your selected answer (A, B, C, or D)
+            2. Your confidence level (1-10 scale)
+            3. Brief reasoning
+
+            Format your response as:
+            Answer: [A/B/C/D]
+            Confidence: [1-10]
+            Reasoning: [Brief explanation]"""
+
+WORDS = ("which of the following best describes the process by which cells convert energy "
+         "stored in glucose into a usable form during aerobic respiration in eukaryotic organisms").split()
+
+
+def _questions(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        question = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60))).capitalize() + "?"
+        options = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))) for _ in range(4)]
+        questions.append((question, options))
+    return questions
+
+
+def _static_prefix(texts: list) -> int:
+    """Characters shared by every request from the start (what provider prefix caches can reuse)"""
+    prefix = texts[0]
+    for text in texts[1:]:
+        while not text.startswith(prefix):
+            prefix = prefix[:-1]
+    return count_tokens(prefix)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prompt token benchmark")
+    parser.add_argument("--questions", type=int, default=200)
+    args = parser.parse_args()
+
+    questions = _questions(args.questions)
+    rows = [
+        ("openai", LEGACY_SYSTEM, LEGACY_QUIZ, 150, OPENAI_PROMPT, OPENAI_PROMPT.max_output_tokens),
+        ("xai", LEGACY_SYSTEM, LEGACY_QUIZ, 150, XAI_PROMPT, XAI_PROMPT.max_output_tokens),
+        ("gemini", "", LEGACY_GEMINI, None, GEMINI_PROMPT, settings.answer_max_tokens),
+    ]
+
+    print(f"tokenizer: {tokenizer_name()}, questions: {len(questions)}")
+    print(f"{'provider':<8} {'version':<9} {'input tokens/call':>18} {'static prefix':>14} {'output cap':>11}")
+    for name, legacy_system, legacy_template, legacy_cap, prompt, cap in rows:
+        legacy_texts = [legacy_system + "\n" + legacy_template.format(question=q, options_text=format_options(o))
+                        for q, o in questions]
+        compiled_texts = [(prompt.system or "") + "\n" + prompt.user_text(q, o) for q, o in questions]
+        for version, texts, output_cap in (("previous", legacy_texts, legacy_cap), ("compiled", compiled_texts, cap)):
+            mean = statistics.mean(count_tokens(text) for text in texts)
+            cap_text = str(output_cap) if output_cap else "none"
+            if name == "gemini" and version == "compiled":
+                cap_text = f"+{output_cap}"  # on top of the thinking budget
+            print(f"{name:<8} {version:<9} {mean:>18.1f} {_static_prefix(texts):>14} {cap_text:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Record/replay fidelity benchmark
+
+Records a run of unique questions against the local stub provider, stops the stub, then answers
+the same questions from the recordings at 1x and accelerated speed. Replayed latencies should
+track the recorded ones (scaled by the speed), with no network access during replay.
+
+Usage (from the BE directory):
+    python -m benchmarks.provider_replay [--questions 40] [--concurrency 8] [--speeds 1 4 0] [--streaming]
+"""
+
+import os
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+
+import uvicorn
+
+from benchmarks.stub_provider import StubConfig, create_app
+
+
+def _start_stub() -> tuple:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return port, server, thread
+
+
+async def _answer_all(questions, concurrency: int) -> tuple:
+    from services.ai_service import get_ai_answer
+    from services.streaming import _background_tasks
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def answer(question: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await get_ai_answer(question, ["alpha", "beta", "gamma", "delta"])
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(answer(question) for question in questions))
+    elapsed = time.perf_counter() - start
+    # Streamed completions finish (and get cached/recorded) after the early answer; let them drain
+    await asyncio.gather(*list(_background_tasks), return_exceptions=True)
+    return latencies, elapsed, errors
+
+
+def _report(label: str, latencies, elapsed: float, errors: int) -> None:
+    p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+    print(f"{label:<16} p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms   "
+          f"wall {elapsed:6.2f}s   errors {errors}")
+
+
+async def _run(args, stub_server, stub_thread, record_dir: str) -> None:
+    # Imported here so the cache lives in the temporary working directory set up by main()
+    from config import settings
+    from services.ai_clients import reset_clients
+    from services.cache_service import clear_caches
+    from services.provider_recording import get_replay_store
+
+    settings.openai_streaming = args.streaming
+    questions = [f"replay benchmark question {i}: which option is correct?" for i in range(args.questions)]
+
+    settings.provider_record_dir = record_dir
+    reset_clients()
+    _report("recorded (stub)", *await _answer_all(questions, args.concurrency))
+
+    # Replay with the stub gone: any network call would fail
+    stub_server.should_exit = True
+    stub_thread.join()
+    settings.provider_record_dir = ""
+    settings.provider_replay_dir = record_dir
+    for speed in args.speeds:
+        clear_caches()
+        settings.provider_replay_speed = speed
+        reset_clients()
+        latencies, elapsed, errors = await _answer_all(questions, args.concurrency)
+        _report(f"replay {speed:g}x" if speed > 0 else "replay no delay", latencies, elapsed, errors)
+        stats = get_replay_store().stats()
+        print(f"{'':<16} exact matches {stats['hits']}, fallbacks {stats['misses']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Provider record/replay fidelity benchmark")
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--speeds", type=float, nargs="+", default=[1, 4, 0])
+    parser.add_argument("--streaming", action="store_true", help="Record and replay streamed completions")
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    StubConfig.ttft = args.ttft
+    StubConfig.token_delay = args.token_delay
+    port, stub_server, stub_thread = _start_stub()
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ.setdefault("CACHE_SAVE_INTERVAL", "3600")
+    logging.disable(logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix="provider-replay-")
+    os.chdir(workdir)
+    asyncio.run(_run(args, stub_server, stub_thread, os.path.join(workdir, "recordings")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Cold-start benchmark
+
+Measures, in fresh interpreter processes:
+- import time of main (and whether provider SDKs were imported)
+- time from process start until /health answers and until /health reports ready (caches loaded)
+
+The server runs in a temporary directory holding a copy of the cache files, so the real
+cache is never rewritten.
+
+Usage (from the BE directory):
+    python -m benchmarks.startup_time [--runs 5] [--cache-dir cache]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+from pathlib import Path
+
+BE_DIR = Path(__file__).resolve().parent.parent
+API_KEY = "startup-benchmark"
+
+IMPORT_PROBE = (
+    "import sys, time; t = time.perf_counter(); import main; elapsed = time.perf_counter() - t; "
+    "print('RESULT', elapsed, 'openai' in sys.modules, 'google.genai' in sys.modules)"
+)
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(BE_DIR) + os.pathsep + env.get("PYTHONPATH", "")
+    env["QUIZ_API_KEY"] = API_KEY
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _measure_import(workdir: str) -> tuple:
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", IMPORT_PROBE], cwd=workdir, env=_env(),
+                            capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith("RESULT"))
+    _, elapsed, openai_loaded, genai_loaded = line.split()
+    return float(elapsed), openai_loaded == "True", genai_loaded == "True"
+
+
+def _get_health(port: int):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/health", headers={"X-API-Key": API_KEY})
+    with urllib.request.urlopen(request, timeout=1) as response:
+        return json.loads(response.read())
+
+
+def _measure_server(workdir: str, timeout: float = 60.0) -> tuple:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    first_response = ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                health = _get_health(port)
+            except OSError:
+                time.sleep(0.01)
+                continue
+            now = time.perf_counter() - started
+            if first_response is None:
+                first_response = now
+            if health.get("ready", True):
+                ready = now
+                break
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return first_response, ready
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cache-dir", default=str(BE_DIR / "cache"))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="startup-benchmark-")
+    try:
+        cache_dir = Path(args.cache_dir)
+        if cache_dir.exists():
+            shutil.copytree(cache_dir, Path(workdir) / "cache")
+        cache_bytes = sum(path.stat().st_size for path in (Path(workdir) / "cache").glob("*.json")) \
+            if (Path(workdir) / "cache").exists() else 0
+        print(f"cache files: {cache_bytes / 1024:.0f} KiB, runs: {args.runs}")
+
+        imports, sdk_flags = [], set()
+        for _ in range(args.runs):
+            elapsed, openai_loaded, genai_loaded = _measure_import(workdir)
+            imports.append(elapsed)
+            sdk_flags.add((openai_loaded, genai_loaded))
+        print(f"import main           median {statistics.median(imports) * 1000:7.0f} ms   "
+              f"max {max(imports) * 1000:7.0f} ms   SDKs at import (openai, genai): {sorted(sdk_flags)}")
+
+        first, ready = [], []
+        for _ in range(args.runs):
+            first_response, ready_at = _measure_server(workdir)
+            if first_response is None or ready_at is None:
+                print("server did not become ready")
+                return
+            first.append(first_response)
+            ready.append(ready_at)
+        print(f"first /health         median {statistics.median(first) * 1000:7.0f} ms   max {max(first) * 1000:7.0f} ms")
+        print(f"/health ready=true    median {statistics.median(ready) * 1000:7.0f} ms   max {max(ready) * 1000:7.0f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Time-to-answer benchmark: streaming with early header extraction vs. full completions
+
+Starts the local stub provider on a free port and measures, for each mode, the time until
+the answer is available to the caller and the time until the full completion has arrived.
+
+Usage (from the BE directory):
+    python -m benchmarks.streaming_latency [--requests 10] [--ttft 0.4] [--token-delay 0.03]
+"""
+
+import time
+import socket
+import asyncio
+import argparse
+import statistics
+import threading
+
+import uvicorn
+from openai import AsyncOpenAI
+
+from benchmarks.stub_provider import StubConfig, create_app
+from services.streaming import stream_chat_answer
+
+MESSAGES = [
+    {"role": "system", "content": "You are a highly accurate quiz assistant."},
+    {"role": "user", "content": "Question: ...\nOptions:\nA. ...\nB. ...\nC. ...\nD. ..."}
+]
+
+
+def _start_stub() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+async def _run(client: AsyncOpenAI, requests: int) -> None:
+    full_times, answer_times, stream_full_times = [], [], []
+
+    for _ in range(requests):
+        start = time.perf_counter()
+        await client.chat.completions.create(model="gpt-4.1", messages=MESSAGES, max_tokens=150)
+        full_times.append(time.perf_counter() - start)
+
+        done = asyncio.Event()
+        start = time.perf_counter()
+
+        def on_complete(text, model_id):
+            stream_full_times.append(time.perf_counter() - start)
+            done.set()
+
+        await stream_chat_answer(client, on_complete, model="gpt-4.1", messages=MESSAGES, max_tokens=150)
+        answer_times.append(time.perf_counter() - start)
+        await done.wait()
+
+    def fmt(values):
+        return f"median {statistics.median(values) * 1000:7.1f} ms   max {max(values) * 1000:7.1f} ms"
+
+    print(f"non-streaming  time-to-answer  {fmt(full_times)}")
+    print(f"streaming      time-to-answer  {fmt(answer_times)}")
+    print(f"streaming      time-to-full    {fmt(stream_full_times)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Streaming time-to-answer benchmark")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--ttft", type=float, default=StubConfig.ttft)
+    parser.add_argument("--token-delay", type=float, default=StubConfig.token_delay)
+    args = parser.parse_args()
+
+    StubConfig.ttft = args.ttft
+    StubConfig.token_delay = args.token_delay
+    port = _start_stub()
+    client = AsyncOpenAI(api_key="stub", base_url=f"http://127.0.0.1:{port}/v1")
+    asyncio.run(_run(client, args.requests))
+
+
+if __name__ == "__main__":
+    main()
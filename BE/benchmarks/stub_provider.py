@@ -0,0 +1,292 @@
+"""
+Local stand-in for an OpenAI-compatible provider
+
+Serves /v1/chat/completions (JSON or SSE streaming) with a canned quiz answer and
+configurable latency so provider-facing code can be exercised without network access.
+Usage includes cached prompt tokens the way OpenAI's prefix cache reports them (a prefix of
+1024+ tokens shared with a recent prompt under the same prompt_cache_key).
+Also stands in for the Batch API (/v1/files, /v1/batches): uploaded JSONL batches complete
+after --batch-delay seconds, with every --batch-fail-every'th request failing.
+
+Usage (from the BE directory):
+    python -m benchmarks.stub_provider --port 8009 --ttft 0.4 --token-delay 0.03
+    OPENAI_BASE_URL=http://127.0.0.1:8009/v1 OPENAI_API_KEY=stub python main.py
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from email.parser import BytesParser
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+CANNED_ANSWER = (
+    "Answer: B\n"
+    "Confidence: 9\n"
+    "Reasoning: Option B is the only choice consistent with the definition given in the question; "
+    "the other options describe related but distinct concepts, and option D contradicts the premise."
+)
+
+
+# Prefix caching as OpenAI documents it: prompts of 1024+ tokens, cached in 128-token steps
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+CACHE_RECENT_PROMPTS = 16
+
+
+class StubConfig:
+    """Latency profile shared by the stub endpoints"""
+    ttft = 0.4  # Seconds before the first token
+    token_delay = 0.03  # Seconds between streamed tokens
+    batch_delay = 2.0  # Seconds before a submitted batch completes
+    batch_fail_every = 0  # Fail every n-th batch request (0 = never)
+    answer = CANNED_ANSWER  # Completion text served for every request
+    chunk_chars = 0  # Stream fixed-size character chunks instead of word tokens (0 = words)
+    fail_status = 0  # Answer chat completions with this HTTP error status (0 = never)
+
+
+def _tokens(text: str, chunk_chars: int = 0):
+    """Split into word-ish tokens the way a provider stream roughly would (or fixed-size chunks)"""
+    if chunk_chars:
+        yield from (text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars))
+        return
+    token = ""
+    for char in text:
+        token += char
+        if char in " \n":
+            yield token
+            token = ""
+    if token:
+        yield token
+
+
+class PrefixCache:
+    """Recent prompts per cache key; reports how many leading prompt tokens a new prompt shares"""
+
+    def __init__(self):
+        self._recent = {}
+
+    def lookup(self, body: dict) -> tuple:
+        """(prompt tokens, cached prompt tokens) with tokens estimated as 4 characters each"""
+        prompt = "".join(str(message.get("content", "")) for message in body.get("messages", []))
+        recent = self._recent.setdefault(body.get("prompt_cache_key", ""), [])
+        shared = max((len(os.path.commonprefix([prompt, other])) for other in recent), default=0)
+        recent.append(prompt)
+        del recent[:-CACHE_RECENT_PROMPTS]
+        shared_tokens = shared // 4
+        cached = shared_tokens // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS if shared_tokens >= CACHE_MIN_TOKENS else 0
+        return len(prompt) // 4, cached
+
+
+def _usage(prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens}
+    }
+
+
+def _completion_body(model: str, content: str, usage: dict = None) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": usage or _usage(120, 0, 40)
+    }
+
+
+def _multipart_file(content_type: str, body: bytes) -> tuple:
+    """Extract (filename, bytes) of the "file" field from a multipart/form-data body"""
+    message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    for part in message.get_payload():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_filename(), part.get_payload(decode=True)
+    raise HTTPException(status_code=400, detail="Missing file field")
+
+
+def create_app(config: StubConfig = StubConfig) -> FastAPI:
+    app = FastAPI(title="Stub provider")
+    files = {}  # file id -> {"meta": FileObject dict, "content": bytes}
+    batches = {}  # batch id -> Batch dict
+    prefix_cache = PrefixCache()
+
+    def store_file(filename: str, content: bytes, purpose: str) -> dict:
+        meta = {
+            "id": f"file-{uuid.uuid4().hex[:12]}",
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        files[meta["id"]] = {"meta": meta, "content": content}
+        return meta
+
+    async def run_batch(batch: dict) -> None:
+        await asyncio.sleep(config.batch_delay)
+        batch["status"] = "in_progress"
+        outputs, errors = [], []
+        for number, line in enumerate(files[batch["input_file_id"]]["content"].splitlines(), start=1):
+            if not line.strip():
+                continue
+            if batch["status"] == "cancelling":
+                break
+            request = json.loads(line)
+            if config.batch_fail_every and number % config.batch_fail_every == 0:
+                errors.append({
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 500, "request_id": uuid.uuid4().hex, "body": {
+                        "error": {"message": "Stub failure", "type": "server_error"}
+                    }},
+                    "error": None
+                })
+                continue
+            outputs.append({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "request_id": uuid.uuid4().hex,
+                    "body": _completion_body(request["body"].get("model", "stub-model"), config.answer)
+                },
+                "error": None
+            })
+
+        def jsonl(records):
+            return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+        if outputs:
+            batch["output_file_id"] = store_file(f"{batch['id']}_output.jsonl", jsonl(outputs), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = store_file(f"{batch['id']}_error.jsonl", jsonl(errors), "batch_output")["id"]
+        batch["request_counts"].update(completed=len(outputs), failed=len(errors))
+        batch["status"] = "cancelled" if batch["status"] == "cancelling" else "completed"
+        batch["completed_at"] = int(time.time())
+
+    @app.post("/v1/files")
+    async def upload_file(request: Request):
+        body = await request.body()
+        filename, content = _multipart_file(request.headers["content-type"], body)
+        return store_file(filename, content, "batch")
+
+    @app.get("/v1/files/{file_id}/content")
+    async def file_content(file_id: str):
+        if file_id not in files:
+            raise HTTPException(status_code=404, detail="No such file")
+        return Response(files[file_id]["content"], media_type="application/octet-stream")
+
+    @app.post("/v1/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        if body["input_file_id"] not in files:
+            raise HTTPException(status_code=400, detail="Unknown input file")
+        total = sum(1 for line in files[body["input_file_id"]]["content"].splitlines() if line.strip())
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:12]}",
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": total, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata")
+        }
+        batches[batch["id"]] = batch
+        asyncio.get_running_loop().create_task(run_batch(batch))
+        return batch
+
+    @app.get("/v1/batches/{batch_id}")
+    async def retrieve_batch(batch_id: str):
+        if batch_id not in batches:
+            raise HTTPException(status_code=404, detail="No such batch")
+        return batches[batch_id]
+
+    @app.post("/v1/batches/{batch_id}/cancel")
+    async def cancel_batch(batch_id: str):
+        if batch_id not in batches:
+            raise HTTPException(status_code=404, detail="No such batch")
+        batches[batch_id]["status"] = "cancelling"
+        return batches[batch_id]
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        if config.fail_status:
+            raise HTTPException(status_code=config.fail_status, detail="Stub failure")
+        tokens = list(_tokens(config.answer, config.chunk_chars))
+        usage = _usage(*prefix_cache.lookup(body), len(tokens))
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.ttft + config.token_delay * len(tokens))
+            return _completion_body(model, config.answer, usage)
+
+        async def events():
+            await asyncio.sleep(config.ttft)
+            for token in tokens:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(config.token_delay)
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage_chunk = {**final, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(usage_chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8009)
+    parser.add_argument("--ttft", type=float, default=StubConfig.ttft, help="Seconds to first token")
+    parser.add_argument("--token-delay", type=float, default=StubConfig.token_delay, help="Seconds per token")
+    parser.add_argument("--batch-delay", type=float, default=StubConfig.batch_delay, help="Seconds until a batch completes")
+    parser.add_argument("--batch-fail-every", type=int, default=StubConfig.batch_fail_every,
+                        help="Fail every n-th batch request (0 = never)")
+    args = parser.parse_args()
+
+    StubConfig.ttft = args.ttft
+    StubConfig.token_delay = args.token_delay
+    StubConfig.batch_delay = args.batch_delay
+    StubConfig.batch_fail_every = args.batch_fail_every
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Command-line client for bulk cache operations against a running Quiz Assistant API
+
+Usage (from the BE directory):
+    python cache_cli.py export [--model openai] [--out cache.ndjson]
+    python cache_cli.py import cache.ndjson [--overwrite]
+    python cache_cli.py warm questions.json [--multi-model] [--wait]
+    python cache_cli.py status <job_id>
+    python cache_cli.py batch questions.json [--wait]
+
+Questions for `warm` and `batch` are a JSON list (or NDJSON) of {"question": ..., "options": [...]} objects.
+The API key is read from --api-key or the QUIZ_API_KEY environment variable.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import httpx
+
+DEFAULT_BASE_URL = "http://localhost:3000"
+CHUNK_SIZE = 64 * 1024
+
+
+def _client(args) -> httpx.Client:
+    api_key = args.api_key or os.getenv("QUIZ_API_KEY")
+    if not api_key:
+        sys.exit("API key required: pass --api-key or set QUIZ_API_KEY")
+    return httpx.Client(base_url=args.base_url, headers={"X-API-Key": api_key}, timeout=None)
+
+
+def cmd_export(args) -> None:
+    params = {"model": args.model} if args.model else {}
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    count = 0
+    try:
+        with _client(args) as client, client.stream("GET", "/export-cache", params=params) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                count += chunk.count(b"\n")
+                out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+    print(f"Exported {count} entries", file=sys.stderr)
+
+
+def _iter_file(path: str):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def cmd_import(args) -> None:
+    with _client(args) as client:
+        response = client.post(
+            "/import-cache",
+            params={"overwrite": str(args.overwrite).lower()},
+            content=_iter_file(args.file),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        response.raise_for_status()
+        print(json.dumps(response.json(), indent=2))
+
+
+def _load_questions(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def cmd_warm(args) -> None:
+    questions = _load_questions(args.file)
+    with _client(args) as client:
+        response = client.post("/warm-cache", json={"questions": questions, "multi_model": args.multi_model})
+        response.raise_for_status()
+        job = response.json()["job"]
+        print(json.dumps(job, indent=2))
+
+        while args.wait and job["status"] in ("pending", "running"):
+            time.sleep(2)
+            job = client.get(f"/warm-cache/{job['job_id']}").json()["job"]
+            print(f"{job['processed']}/{job['total']} processed "
+                  f"({job['filled']} filled, {job['already_cached']} cached, {job['failed']} failed)",
+                  file=sys.stderr)
+
+
+def cmd_status(args) -> None:
+    with _client(args) as client:
+        response = client.get(f"/warm-cache/{args.job_id}")
+        response.raise_for_status()
+        print(json.dumps(response.json()["job"], indent=2))
+
+
+def cmd_batch(args) -> None:
+    questions = _load_questions(args.file)
+    with _client(args) as client:
+        response = client.post("/batch-jobs", json={"questions": questions})
+        response.raise_for_status()
+        job = response.json()["job"]
+        print(json.dumps(job, indent=2))
+
+        while args.wait and job["status"] in ("pending", "preparing", "submitted"):
+            time.sleep(30)
+            job = client.get(f"/batch-jobs/{job['job_id']}").json()["job"]
+            print(f"{job['status']}: {job['filled']} filled, {job['failed']} failed "
+                  f"of {job['submitted']} submitted", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk cache import/export and warm-up")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="API base URL")
+    parser.add_argument("--api-key", default=None, help="API key (defaults to QUIZ_API_KEY)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="Stream cache entries to NDJSON")
+    export_parser.add_argument("--model", default=None, help="Only export this cache (openai, gemini, xai)")
+    export_parser.add_argument("--out", default=None, help="Output file (defaults to stdout)")
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = sub.add_parser("import", help="Stream an NDJSON dump into the cache")
+    import_parser.add_argument("file", help="NDJSON file produced by export")
+    import_parser.add_argument("--overwrite", action="store_true", help="Replace existing entries")
+    import_parser.set_defaults(func=cmd_import)
+
+    warm_parser = sub.add_parser("warm", help="Start a background warm-up job")
+    warm_parser.add_argument("file", help="JSON or NDJSON list of questions")
+    warm_parser.add_argument("--multi-model", action="store_true", help="Warm OpenAI and Gemini caches")
+    warm_parser.add_argument("--wait", action="store_true", help="Poll until the job finishes")
+    warm_parser.set_defaults(func=cmd_warm)
+
+    status_parser = sub.add_parser("status", help="Show warm-up job progress")
+    status_parser.add_argument("job_id")
+    status_parser.set_defaults(func=cmd_status)
+
+    batch_parser = sub.add_parser("batch", help="Answer a question bank offline through the provider Batch API")
+    batch_parser.add_argument("file", help="JSON or NDJSON list of questions")
+    batch_parser.add_argument("--wait", action="store_true", help="Poll until the batch job finishes")
+    batch_parser.set_defaults(func=cmd_batch)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except httpx.HTTPError as e:
+        sys.exit(f"Request failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 
 import os
 from typing import Optional
+from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -21,8 +22,88 @@ class Settings(BaseSettings):
     # OpenAI settings
     openai_api_key: Optional[str] = None
     openai_model: str = "gpt-4.1"
-    openai_max_tokens: int = 150
     openai_temperature: float = 0.1
+    openai_streaming: bool = False  # Stream completions and answer as soon as the header is parsed
+    prompt_cache_affinity: bool = True  # Send a per-prompt cache key (OpenAI prompt_cache_key, xAI x-grok-conv-id) so calls hit the provider's prefix cache
+    # Output cap for the Answer/Confidence/one-sentence Reasoning format (added to Gemini's thinking budget); OPENAI_MAX_TOKENS is the older name
+    answer_max_tokens: int = Field(80, validation_alias=AliasChoices("answer_max_tokens", "openai_max_tokens"))
+    
+    # Response cache settings
+    cache_compression: str = "zlib"  # Codec for cold cache entries: none, zlib or zstd
+    cache_save_interval: float = 1.0  # Seconds between group-commit cache writes
+    cache_ttl_seconds: float = 0  # Expire cached answers after this many seconds (0 = never)
+    cache_negative_ttl_seconds: float = 30.0  # How long a provider failure is served from cache
+    cache_soft_ttl_seconds: float = 0  # Serve older answers but re-query them in the background (0 = never)
+    cache_refresh_below_confidence: int = 4  # Re-query served answers below this confidence, or without an Answer: line, in the background (0 = off)
+    cache_refresh_interval_seconds: float = 300.0  # Minimum time between background refreshes of one answer
+    quiz_cache_size: int = 500  # Whole-quiz /ask-batch payloads kept by quiz fingerprint (0 = off)
+    quiz_cache_ttl_seconds: float = 600.0  # Age after which a stored quiz payload is rebuilt from the per-question caches
+    cache_hot_keys: int = 50  # Questions tracked by the most-asked sketch in /cache-stats
+    
+    # Gemini request shaping by question difficulty
+    gemini_adaptive_thinking: bool = True  # False = always unbounded thinking with search grounding
+    gemini_thinking_budget_easy: int = 128  # Smallest budget gemini-2.5-pro accepts
+    gemini_thinking_budget_medium: int = 2048
+    gemini_thinking_budget_hard: int = -1  # -1 = dynamic (model decides)
+    
+    # Multi-model consensus
+    consensus_models: list = ["openai", "gemini"]  # Models asked in /ask multi mode, in order (openai, gemini, xai)
+    # Named ensembles a request can pick with "profile" (latency vs. accuracy); MODEL_PROFILES is the older name
+    ensemble_profiles: dict = Field({
+        "fast": ["openai"],
+        "balanced": ["openai", "gemini"],
+        "thorough": ["openai", "gemini", "xai"],
+    }, validation_alias=AliasChoices("ensemble_profiles", "model_profiles"))
+    single_model_preference: list = ["openai", "gemini", "xai"]  # Stored legs single mode may answer from, in order; OpenAI is asked on a miss
+    consensus_quorum: int = 2  # Models asked in parallel first; the rest only while the vote is uncertain
+    consensus_threshold: float = 0.85  # Calibrated probability needed to report consensus
+    consensus_prior_accuracy: float = 0.8  # Assumed model accuracy before any feedback
+    
+    # Outcome feedback (/feedback) and feedback-driven routing
+    feedback_min_samples: int = 20  # Outcomes per (topic, model) before routing may skip the model
+    feedback_skip_accuracy: float = 0.5  # Skip a model on a topic when its accuracy there is below this
+    
+    # Offline bulk answering (OpenAI Batch API)
+    batch_api_poll_interval: float = 30.0  # Seconds between provider batch status checks
+    batch_api_max_requests: int = 50000  # Requests per provider batch input file
+    batch_api_completion_window: str = "24h"
+    
+    # Provider call scheduling (interactive > batch > background)
+    scheduler_concurrency: int = 8  # Concurrent calls per provider
+    scheduler_initial_service_seconds: float = 5.0  # Assumed call duration until measured
+    scheduler_slo_interactive: float = 20.0  # Reject /ask with 429 when the expected wait exceeds this
+    scheduler_slo_batch: float = 120.0  # Same for /ask-batch, checked once per batch
+    
+    # Provider circuit breakers
+    circuit_failure_threshold: int = 5  # Consecutive failed calls that open a provider's breaker
+    circuit_reset_seconds: float = 30.0  # How long an open breaker fails fast before a probe call
+    
+    # Readiness (/health/ready)
+    readiness_providers: list = ["openai"]  # Not ready while any of these has an open breaker or a queue past its SLO
+    readiness_max_loop_lag: float = 0.5  # Not ready when recent event-loop lag exceeds this (needs LOOP_MONITOR_ENABLED)
+    
+    # Event-loop health instrumentation (lag heartbeat + blocking-call stack capture)
+    loop_monitor_enabled: bool = False
+    loop_monitor_interval: float = 0.05  # Seconds between heartbeats
+    loop_monitor_threshold: float = 0.1  # Loop stalls at least this long are logged with the blocking stack
+    
+    # On-demand sampling profiler (/debug/profile)
+    profiler_interval: float = 0.005  # Seconds between stack samples
+    profiler_max_seconds: float = 60.0
+    profiler_api_keys: list = ["default"]  # API key names allowed to profile
+    
+    # Provider traffic recording and replay (offline benchmarks and load tests)
+    provider_record_dir: str = ""  # Record every provider call (prompt, response, timing) here; empty = off
+    provider_record_max_bytes: int = 10_000_000  # Rotate the recording log at this size
+    provider_record_backups: int = 5  # Rotated recording files kept
+    provider_replay_dir: str = ""  # Answer provider calls from the recordings in this directory instead of the network
+    provider_replay_speed: float = 1.0  # Replay timing multiplier: 2 = twice as fast, 0 = no delays
+    provider_replay_strict: bool = False  # Fail calls without a recording for their exact prompt instead of reusing another
+    
+    # Request size limits and /ask-batch chunking
+    max_request_body_bytes: int = 1_000_000  # Larger bodies get 413 before they are read (bulk upload paths exempt)
+    batch_max_questions: int = 200  # Questions accepted per /ask-batch request
+    batch_chunk_size: int = 10  # Questions of a batch in progress at the same time
     
     # Rate limiting
     batch_size: int = 3
@@ -34,6 +115,7 @@ class Settings(BaseSettings):
     
     # API Key authentication
     api_key: str = os.getenv("QUIZ_API_KEY")
+    api_keys_file: str = "api_keys.json"  # Extra keys with per-key quotas, relative to the BE directory
 
     # Additional keys from environment
     gemini_api_key: Optional[str] = None
@@ -39,13 +39,19 @@ from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from routes import quiz_router, health_router, test_router
+from routes import quiz_router, health_router, test_router, cache_router, feedback_router, debug_router
 
 # Config import
 from config import settings
 
 # Cache service import
 from services.cache_service import cache_manager
+from services.feedback_store import feedback_store
+from services.scheduler import AdmissionRejected
+from services.circuit_breaker import ProviderUnavailable
+from services.api_keys import api_key_registry, current_api_key, QuotaExceeded
+from services.loop_monitor import loop_monitor
+from services.ai_clients import preload_provider_sdks
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -89,8 +95,15 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("🚀 Starting Quiz Assistant API Server...")
-    logger.info("📂 Loading cache files...")
-    # Cache manager is already initialized and loaded
+    logger.info("📂 Loading cache files in the background...")
+    # The server answers /health right away; other requests wait until the caches are loaded
+    cache_manager.start_background_load()
+    feedback_store.start_background_load()
+    # Provider SDKs are imported lazily; warm them up off the loop so the first call doesn't stall
+    asyncio.get_running_loop().run_in_executor(None, preload_provider_sdks)
+    
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
     
     # Setup signal handlers for graceful shutdown
     def signal_handler(signum, frame):
@@ -106,6 +119,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down Quiz Assistant API Server...")
+    loop_monitor.stop()
     logger.info("💾 Saving all cache files before shutdown...")
     
     # Ensure all caches are saved before shutdown
@@ -114,6 +128,7 @@ async def lifespan(app: FastAPI):
         # Wait a bit for any pending background saves
         await asyncio.sleep(0.5)
         cache_manager.shutdown()
+        feedback_store.shutdown()
         logger.info("✅ Cache files saved successfully")
     except Exception as e:
         logger.error(f"❌ Error during cache shutdown: {e}")
@@ -146,11 +161,28 @@ start_time = time.time()
 
 
 
+# Load-balancer probes: polled often, so no API key, no quota and no request logging
+PROBE_PATHS = ("/health/live", "/health/ready")
+
+# Health, metrics and diagnostics requests are authenticated but not counted against quotas
+QUOTA_EXEMPT_PATHS = ("/health", "/metrics", "/debug/profile")
+
+def quota_exceeded_response(exc: QuotaExceeded) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={
+            "error": "Quota exceeded",
+            "message": str(exc),
+            "retry_after": exc.retry_after
+        },
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # --- API Key Authentication Middleware ---
 @app.middleware("http")
 async def api_key_auth_middleware(request: Request, call_next):
-    # Allow docs and openapi endpoints without API key
-    open_endpoints = ["/docs", "/openapi.json", "/redoc"]
+    # Allow docs, openapi and load-balancer probe endpoints without API key
+    open_endpoints = ["/docs", "/openapi.json", "/redoc"] + list(PROBE_PATHS)
     if any(request.url.path.startswith(ep) for ep in open_endpoints):
         return await call_next(request)
 
@@ -159,8 +191,8 @@ async def api_key_auth_middleware(request: Request, call_next):
         return await call_next(request)
 
     # Check for API key in header
-    api_key = request.headers.get("X-API-Key")
-    if not api_key or api_key != settings.api_key:
+    api_key = api_key_registry.authenticate(request.headers.get("X-API-Key"))
+    if api_key is None:
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
             content={
@@ -168,17 +200,60 @@ async def api_key_auth_middleware(request: Request, call_next):
             },
             headers={"WWW-Authenticate": "API-Key"}
         )
-    return await call_next(request)
+
+    # Set before the quota checks so exempt routes can still tell which key is calling
+    current_api_key.set(api_key)
+
+    # Monitoring stays reachable while a key is over its quota
+    if request.url.path in QUOTA_EXEMPT_PATHS:
+        return await call_next(request)
+
+    try:
+        api_key.enter()
+    except QuotaExceeded as exc:
+        return quota_exceeded_response(exc)
+    try:
+        api_key.charge()
+    except QuotaExceeded as exc:
+        api_key.leave()
+        return quota_exceeded_response(exc)
+
+    try:
+        # Requests that can touch the caches wait for the startup load to finish
+        await cache_manager.wait_until_loaded()
+        await feedback_store.wait_until_loaded()
+        return await call_next(request)
+    finally:
+        api_key.leave()
 
 app.include_router(quiz_router)
 app.include_router(health_router)
 app.include_router(test_router)
+app.include_router(cache_router)
+app.include_router(feedback_router)
+app.include_router(debug_router)
+
+# Bulk endpoints stream their bodies - logging them would buffer everything in memory
+# (profiles are large and would also show up in the profile itself)
+UNLOGGED_BODY_PATHS = ("/export-cache", "/import-cache", "/debug/profile")
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """Request/response logging middleware for monitoring and debugging"""
     start_time_req = time.time()
 
+    if request.url.path in PROBE_PATHS:
+        return await call_next(request)
+
+    if request.url.path in UNLOGGED_BODY_PATHS:
+        response = await call_next(request)
+        logger.info(
+            f"{request.method} {request.url.path} - "
+            f"Status: {response.status_code} - "
+            f"Time: {time.time() - start_time_req:.3f}s (streamed, body not logged)"
+        )
+        return response
+
     # Log request details
     try:
         req_body = await request.body()
@@ -215,6 +290,99 @@ async def log_requests(request: Request, call_next):
 
     return response
 
+# Bulk uploads have their own limits (streamed import, question banks for background jobs)
+BODY_LIMIT_EXEMPT_PATHS = ("/import-cache", "/batch-jobs", "/warm-cache")
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies over max_bytes with 413 before anything parses them
+    A declared Content-Length is checked without reading; chunked bodies are counted as they arrive
+    """
+
+    def __init__(self, app, max_bytes: int, exempt_paths=()):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.max_bytes or scope["path"] in self.exempt_paths:
+            return await self.app(scope, receive, send)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            if not content_length.isdigit() or int(content_length) > self.max_bytes:
+                return await self._reject(scope, receive, send)
+            return await self.app(scope, receive, send)
+
+        # No declared length: buffer up to the limit, then replay the body to the app
+        messages = []
+        received = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            received += len(message.get("body", b""))
+            if received > self.max_bytes:
+                return await self._reject(scope, receive, send)
+            if not message.get("more_body", False):
+                break
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        await self.app(scope, replay_receive, send)
+
+    async def _reject(self, scope, receive, send):
+        logger.warning(f"Rejected {scope['method']} {scope['path']}: body exceeds {self.max_bytes} bytes")
+        response = JSONResponse(
+            status_code=413,
+            content={
+                "error": "Request body too large",
+                "message": f"Request bodies are limited to {self.max_bytes} bytes; "
+                           f"/ask-batch accepts at most {settings.batch_max_questions} questions",
+                "max_bytes": self.max_bytes
+            }
+        )
+        await response(scope, receive, send)
+
+# Added last so it runs first, before the logging middleware buffers the body
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=settings.max_request_body_bytes,
+                   exempt_paths=BODY_LIMIT_EXEMPT_PATHS)
+
+@app.exception_handler(QuotaExceeded)
+async def quota_exceeded_handler(request: Request, exc: QuotaExceeded):
+    """A route charged extra quota (e.g. per batch question) that the key does not have"""
+    return quota_exceeded_response(exc)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Provider queues are past their latency SLO - ask the client to come back later"""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={
+            "error": "Server busy",
+            "message": str(exc),
+            "retry_after": exc.retry_after
+        },
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(ProviderUnavailable)
+async def provider_unavailable_handler(request: Request, exc: ProviderUnavailable):
+    """The provider's circuit breaker is open - fail fast instead of waiting for another timeout"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "error": "Provider unavailable",
+            "message": str(exc),
+            "retry_after": exc.retry_after
+        },
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc: HTTPException):
     """Custom 404 handler with helpful information"""
@@ -5,5 +5,8 @@ Routes package initialization
 from .quiz import router as quiz_router
 from .health import router as health_router
 from .test import router as test_router
+from .cache import router as cache_router
+from .feedback import router as feedback_router
+from .debug import router as debug_router
 
-__all__ = ["quiz_router", "health_router", "test_router"]
+__all__ = ["quiz_router", "health_router", "test_router", "cache_router", "feedback_router", "debug_router"]
@@ -0,0 +1,278 @@
+"""
+Cache management routes: statistics, persistence, invalidation, bulk import/export, warm-up
+and offline batch jobs
+"""
+
+import json
+import asyncio
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from schemas.requests import WarmupRequest, BatchJobRequest
+from services.cache_service import (
+    get_cache_stats, clear_caches_async, save_caches_async, invalidate_cache,
+    export_cache_entries, import_cache_entry,
+)
+from services.api_keys import charge_current_key
+from services.warmup_service import warmup_service
+from services.batch_service import batch_service
+from services.quiz_cache import quiz_result_cache
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["cache"])
+
+# Yield to the event loop this often while importing large dumps
+IMPORT_YIELD_EVERY = 500
+
+
+@router.get("/cache-stats")
+async def get_cache_statistics():
+    """
+    Get cache statistics for all AI models
+    Shows how many responses are cached for each model, plus whole-quiz cache hits (/ask-batch)
+    """
+    try:
+        stats = get_cache_stats()
+        return {
+            "status": "success",
+            "cache_stats": stats,
+            "quiz_cache": quiz_result_cache.stats(),
+            "message": "Cache statistics retrieved successfully"
+        }
+    except Exception as e:
+        logger.error(f"Error getting cache stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/clear-cache")
+async def clear_all_caches():
+    """
+    Clear all model caches and remove cache files
+    Use this to reset cached responses for all models
+    """
+    try:
+        await clear_caches_async()
+        quiz_result_cache.clear()
+        return {
+            "status": "success",
+            "message": "All model caches cleared and cache files removed"
+        }
+    except Exception as e:
+        logger.error(f"Error clearing caches: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/invalidate-cache")
+async def invalidate_cache_entries(
+    model: Optional[str] = Query(default=None, description="Cache to invalidate (openai, gemini, xai); all when omitted"),
+    prompt_hash: Optional[str] = Query(default=None, description="Remove entries produced by this prompt version"),
+    stale_prompts: bool = Query(default=False, description="Remove entries whose prompt version is unknown or outdated"),
+    older_than: Optional[float] = Query(default=None, ge=0, description="Remove entries older than this many seconds")
+):
+    """
+    Selectively invalidate cached responses by model, prompt version or age
+    Unlike /clear-cache, entries that do not match the criteria are kept
+    """
+    if prompt_hash is None and not stale_prompts and older_than is None:
+        raise HTTPException(status_code=400, detail="Specify prompt_hash, stale_prompts or older_than")
+    
+    try:
+        removed = invalidate_cache(model, prompt_hash, stale_prompts, older_than)
+        # Stored quiz payloads may contain the removed answers
+        quiz_result_cache.clear()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error invalidating caches: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {
+        "status": "success",
+        "removed": removed,
+        "message": f"Invalidated {sum(removed.values())} cached responses"
+    }
+
+
+@router.post("/save-cache")
+async def save_caches():
+    """
+    Manually save all caches to disk
+    Useful for ensuring caches are persisted without waiting for auto-save
+    """
+    try:
+        saved = await save_caches_async()
+        stats = get_cache_stats()
+        if not all(saved.values()):
+            failed = [model_name for model_name, ok in saved.items() if not ok]
+            raise HTTPException(status_code=500, detail=f"Could not save caches: {', '.join(failed)} (will retry in background)")
+        return {
+            "status": "success",
+            "message": "All caches saved to disk successfully",
+            "cache_stats": stats
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error saving caches: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export-cache")
+async def export_cache(
+    model: Optional[str] = Query(default=None, description="Cache to export (openai, gemini, xai); all when omitted")
+):
+    """
+    Stream cached responses as NDJSON, one entry per line
+    Entries are serialized lazily so large caches are never held in memory as one document
+    """
+    try:
+        records = export_cache_entries(model)
+        first = next(records, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def generate():
+        if first is None:
+            return
+        yield json.dumps(first, ensure_ascii=False) + "\n"
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=quiz-cache.ndjson"}
+    )
+
+
+@router.post("/import-cache")
+async def import_cache(
+    request: Request,
+    overwrite: bool = Query(default=False, description="Replace entries that are already cached")
+):
+    """
+    Import NDJSON produced by /export-cache
+    The request body is consumed as a stream and inserted line by line
+    """
+    imported = skipped = invalid = 0
+    buffer = b""
+
+    def handle(line: bytes) -> None:
+        nonlocal imported, skipped, invalid
+        line = line.strip()
+        if not line:
+            return
+        try:
+            if import_cache_entry(json.loads(line), overwrite=overwrite):
+                imported += 1
+            else:
+                skipped += 1
+        except (ValidationError, ValueError, KeyError, TypeError, AttributeError) as e:
+            invalid += 1
+            logger.debug(f"Skipping invalid import record: {e}")
+
+    try:
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                handle(line)
+                if (imported + skipped + invalid) % IMPORT_YIELD_EVERY == 0:
+                    await asyncio.sleep(0)
+        handle(buffer)
+    except Exception as e:
+        logger.error(f"Error importing caches: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if overwrite and imported:
+        # Replaced answers may be part of stored quiz payloads
+        quiz_result_cache.clear()
+    logger.info(f"Cache import finished: {imported} imported, {skipped} skipped, {invalid} invalid")
+    return {
+        "status": "success",
+        "imported": imported,
+        "skipped": skipped,
+        "invalid": invalid,
+        "message": f"Imported {imported} cached responses"
+    }
+
+
+@router.post("/warm-cache")
+async def warm_cache(request: WarmupRequest):
+    """
+    Start a background job that fills cache misses for a list of questions
+    Provider calls go through the same rate-limited path as /ask-batch
+    """
+    questions = [item.model_dump() for item in request.questions]
+    # As in /ask-batch, every question sent to a provider costs a rate token (one was charged by the middleware)
+    charge_current_key(max(0, warmup_service.count_uncached(questions, multi_model=request.multi_model) - 1))
+    job = warmup_service.start(questions, multi_model=request.multi_model)
+    return {
+        "status": "accepted",
+        "job": job.to_dict(),
+        "message": f"Warm-up started for {job.total} questions"
+    }
+
+
+@router.get("/warm-cache")
+async def list_warmup_jobs():
+    """List recent warm-up jobs and their progress"""
+    return {"status": "success", "jobs": warmup_service.list_jobs()}
+
+
+@router.get("/warm-cache/{job_id}")
+async def get_warmup_job(job_id: str):
+    """Get progress of one warm-up job"""
+    job = warmup_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown warm-up job: {job_id}")
+    return {"status": "success", "job": job.to_dict()}
+
+
+@router.delete("/warm-cache/{job_id}")
+async def cancel_warmup_job(job_id: str):
+    """Cancel a running warm-up job"""
+    if not warmup_service.cancel(job_id):
+        raise HTTPException(status_code=404, detail=f"No running warm-up job: {job_id}")
+    return {"status": "success", "message": f"Warm-up job {job_id} cancelled"}
+
+
+@router.post("/batch-jobs")
+async def create_batch_job(request: BatchJobRequest):
+    """
+    Pre-compute answers for a question bank through the provider Batch API
+    Uncached questions are submitted as one JSONL batch file; results land in the cache when
+    the provider finishes (up to the batch completion window)
+    """
+    questions = [item.model_dump() for item in request.questions]
+    job = batch_service.start(questions)
+    return {
+        "status": "accepted",
+        "job": job.to_dict(),
+        "message": f"Batch job started for {job.total} questions"
+    }
+
+
+@router.get("/batch-jobs")
+async def list_batch_jobs():
+    """List recent batch jobs and their progress"""
+    return {"status": "success", "jobs": batch_service.list_jobs()}
+
+
+@router.get("/batch-jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    """Get progress of one batch job"""
+    job = batch_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job: {job_id}")
+    return {"status": "success", "job": job.to_dict()}
+
+
+@router.delete("/batch-jobs/{job_id}")
+async def cancel_batch_job(job_id: str):
+    """Cancel a batch job and its provider batches; answers already ingested stay cached"""
+    if not batch_service.cancel(job_id):
+        raise HTTPException(status_code=404, detail=f"No running batch job: {job_id}")
+    return {"status": "success", "message": f"Batch job {job_id} cancelled"}
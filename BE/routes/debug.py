@@ -0,0 +1,48 @@
+"""
+Diagnostics routes: on-demand sampling profiler
+"""
+
+import asyncio
+import logging
+import threading
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from config import settings
+from services.api_keys import current_api_key
+from services.profiler import profiler, ProfilerBusy
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/profile")
+async def profile(
+    seconds: float = Query(default=10.0, gt=0, description="How long to sample"),
+    format: str = Query(default="collapsed", pattern="^(collapsed|json)$",
+                        description="collapsed: flamegraph-ready text; json: top functions and stacks"),
+    loop_only: bool = Query(default=False, description="Only sample the event-loop thread")
+):
+    """
+    Sample every thread's stack for `seconds` and return the aggregated stacks
+    collapsed output can be fed to flamegraph.pl, speedscope or inferno as is
+    """
+    api_key = current_api_key.get()
+    # Deny when the caller's key is unknown (e.g. the middleware did not run)
+    if api_key is None or api_key.name not in settings.profiler_api_keys:
+        raise HTTPException(status_code=403, detail="This API key may not run the profiler")
+    if seconds > settings.profiler_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {settings.profiler_max_seconds:g}")
+
+    loop_thread_id = threading.get_ident()
+    logger.info(f"🔬 Profiling for {seconds:g}s (key: {api_key.name}, loop_only={loop_only})")
+    try:
+        # The sampler sleeps between samples in a worker thread; the loop keeps serving requests
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, profiler.run, seconds, loop_only, loop_thread_id
+        )
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "json":
+        return result.to_dict()
+    return PlainTextResponse(result.collapsed())
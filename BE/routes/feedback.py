@@ -0,0 +1,58 @@
+"""
+Outcome feedback routes: correct answers reported by the extension after a quiz is submitted
+"""
+
+import logging
+from fastapi import APIRouter, HTTPException
+from schemas.requests import FeedbackRequest
+from services.cache_service import create_cache_key, peek_cache
+from services.multi_model_service import MODEL_LEGS
+from services.feedback_store import feedback_store
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["feedback"])
+
+
+@router.post("/feedback")
+async def submit_feedback(request: FeedbackRequest):
+    """
+    Record which option was correct for a previously answered question
+    Each model's cached answer is scored against it; the results update per-model and
+    per-topic accuracy used for consensus weighting and routing
+    """
+    correct_answer = request.correct_answer.upper()
+    if ord(correct_answer) - 65 >= len(request.options):
+        raise HTTPException(status_code=400, detail=f"correct_answer {correct_answer} is outside the given options")
+    
+    cache_key = create_cache_key(request.question, request.options)
+    model_answers = {}
+    for model_name in MODEL_LEGS:
+        cached = peek_cache(model_name, cache_key)
+        if cached is not None and not cached.error:
+            model_answers[model_name] = (cached.answer, cached.confidence)
+    
+    if not model_answers:
+        return {
+            "status": "ignored",
+            "recorded": {},
+            "message": "No cached model answers for this question"
+        }
+    
+    try:
+        recorded = feedback_store.record(cache_key, correct_answer, model_answers, request.topic)
+    except Exception as e:
+        logger.error(f"Error recording feedback: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"📝 Feedback for {cache_key[:8]}: correct={correct_answer} {recorded}")
+    return {
+        "status": "success",
+        "recorded": recorded,
+        "message": f"Feedback recorded for {len(recorded)} model(s)"
+    }
+
+
+@router.get("/feedback-stats")
+async def get_feedback_stats():
+    """Per-model and per-topic accuracy aggregated from feedback"""
+    return {"status": "success", "feedback_stats": feedback_store.stats()}
@@ -5,7 +5,17 @@ Health check routes
 import os
 import time
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from config import settings
 from schemas.responses import HealthResponse
+from services.metrics import metrics
+from services.cache_service import cache_manager
+from services.feedback_store import feedback_store
+from services.scheduler import provider_scheduler, INTERACTIVE
+from services.circuit_breaker import circuit_breakers
+from services.api_keys import api_key_registry
+from services.loop_monitor import loop_monitor
+from services.model_results import background_refresher
 from datetime import datetime
 
 router = APIRouter(tags=["health"])
@@ -24,5 +34,72 @@ async def health_check():
         status="healthy",
         uptime=uptime,
         timestamp=datetime.now().isoformat(),
-        openai="configured" if os.getenv("OPENAI_API_KEY") else "not_configured"
+        openai="configured" if os.getenv("OPENAI_API_KEY") else "not_configured",
+        ready=cache_manager.loaded
     )
+
+
+@router.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: the process is up and the event loop answers
+    Never checks dependencies, so a provider outage does not get the instance restarted
+    """
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 when this instance can take traffic, 503 with the failing checks otherwise
+    - cache: caches and the feedback log finished loading from disk
+    - providers: no open circuit breaker and an interactive queue within its SLO (READINESS_PROVIDERS)
+    - event_loop: recent loop lag under READINESS_MAX_LOOP_LAG (only when LOOP_MONITOR_ENABLED)
+    """
+    checks = {"cache": {"ok": cache_manager.loaded and feedback_store.loaded}}
+
+    for provider in settings.readiness_providers:
+        breaker = circuit_breakers.get(provider)
+        expected_wait = provider_scheduler.expected_wait(provider, INTERACTIVE)
+        checks[f"provider:{provider}"] = {
+            "ok": not breaker.is_open and expected_wait <= settings.scheduler_slo_interactive,
+            "circuit": breaker.stats()["state"],
+            "expected_wait": round(expected_wait, 2),
+            "queue_depth": sum(provider_scheduler.stats()[provider]["waiting"].values())
+        }
+
+    if loop_monitor.running:
+        lag = loop_monitor.recent_max_lag()
+        checks["event_loop"] = {"ok": lag <= settings.readiness_max_loop_lag, "recent_max_lag": round(lag, 4)}
+
+    ready = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks}
+    )
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Latency metrics (count, average, p50/p95, max) grouped by metric
+    gemini_tier_latency: Gemini call latency per difficulty tier (easy, medium, hard)
+    scheduler_wait: time spent waiting for a provider slot, per provider and priority
+    api_keys: quota state and usage per API key name (keys themselves are never shown)
+    event_loop_lag / event_loop: loop lag and the stacks of calls that blocked the loop (LOOP_MONITOR_ENABLED)
+    circuit_breakers: breaker state and failure counts per provider
+    token_usage / provider_latency: prompt, prefix-cached and completion tokens per provider, and call
+    latency split by whether the provider served part of the prompt from its prefix cache
+    cache_refresh: background refreshes of low-confidence or soft-expired answers
+    """
+    return {
+        "status": "success",
+        "uptime": time.time() - start_time,
+        "latency": metrics.snapshot(),
+        "scheduler": provider_scheduler.stats(),
+        "api_keys": api_key_registry.stats(),
+        "event_loop": loop_monitor.stats(),
+        "circuit_breakers": circuit_breakers.stats(),
+        "token_usage": metrics.token_usage(),
+        "cache_refresh": background_refresher.stats()
+    }
@@ -3,19 +3,47 @@ Quiz processing routes with multi-model AI support
 """
 
 import asyncio
-from typing import List
-from fastapi import APIRouter, HTTPException, Query
-from schemas.requests import QuestionRequest, BatchRequest
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Response
+from schemas.requests import QuestionRequest, BatchRequest, QuestionData
 from schemas.responses import AnswerResponse, BatchAnswerResponse
 from services.ai_service import get_ai_answer
-from services.multi_model_service import get_multi_model_answer
-from services.cache_service import get_cache_stats, clear_caches, save_caches_now
+from services.multi_model_service import get_multi_model_answer, resolve_models
+from services.cache_service import create_cache_key, record_question
+from services.scheduler import AdmissionRejected, provider_scheduler, set_request_class, INTERACTIVE, BATCH
+from services.api_keys import charge_current_key
+from services.quiz_cache import quiz_fingerprint, quiz_result_cache
+from services.warmup_service import warmup_service
+from services.circuit_breaker import ProviderUnavailable
+from config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["quiz"])
 
 
+def request_models(request, multi_model: bool) -> Optional[List[str]]:
+    """
+    Model legs a request asked for (models list, profile or multi_model=true), or None for single-model
+    analysis (see uses_single_model)
+    """
+    if not (multi_model or request.models or request.profile):
+        return None
+    try:
+        models = resolve_models(request.models, request.profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return models
+
+
+def uses_single_model(models: Optional[List[str]]) -> bool:
+    """
+    An OpenAI-only ensemble takes the single-model path too (it shares the OpenAI cache), but
+    answers only from OpenAI; plain single-model requests may answer from any preferred leg
+    """
+    return models is None or models == ["openai"]
+
+
 @router.post("/ask", response_model=AnswerResponse)
 async def ask_question(
     request: QuestionRequest,
@@ -23,25 +51,119 @@ async def ask_question(
 ):
     """
     Process a single quiz question - Main endpoint for Chrome extension
-    Supports both single model (GPT 4.1) and multi-model analysis (GPT 4.1 + Gemini 2.5 Pro + Grok 4)
+    Supports both single model (GPT 4.1) and multi-model analysis (GPT 4.1 + Gemini 2.5 Pro + Grok 4);
+    the body's models list or profile picks the ensemble per request
     """
+    models = request_models(request, multi_model)
+    # A user is waiting on this one answer: served first, rejected with 429 when queues are too long
+    set_request_class(INTERACTIVE, enforce_slo=True)
     try:
         logger.info(f"🔍 /ask endpoint - multi_model parameter: {multi_model} (type: {type(multi_model)})")
-        logger.info(f"Processing question with multi_model={multi_model}: {request.question[:50]}...")
+        logger.info(f"Processing question with models={models or 'single'}: {request.question[:50]}...")
+        record_question(create_cache_key(request.question, request.options), request.question)
         
-        if multi_model:
-            logger.info("🧠 Using multi-model analysis")
-            result = await get_multi_model_answer(request.question, request.options)
-        else:
+        if uses_single_model(models):
             logger.info("🚀 Using single model analysis")
-            result = await get_ai_answer(request.question, request.options)
+            result = await get_ai_answer(request.question, request.options, models)
+        else:
+            logger.info(f"🧠 Using multi-model analysis ({', '.join(models)})")
+            result = await get_multi_model_answer(request.question, request.options, request.topic, models)
             
         return result
+    except (AdmissionRejected, ProviderUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Error in /ask endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def answer_batch(questions: List[QuestionData], models: Optional[List[str]] = None,
+                       topic: Optional[str] = None) -> List[BatchAnswerResponse]:
+    """
+    Answer a batch with at most settings.batch_chunk_size questions in progress
+    models: multi-model legs for every question (None = single model)
+    Coroutines are created as slots free up, so memory does not grow with the batch size
+    """
+    async def process_question(index: int, question_data) -> BatchAnswerResponse:
+        try:
+            record_question(create_cache_key(question_data.question, question_data.options), question_data.question)
+            if uses_single_model(models):
+                logger.info(f"🚀 Q{index+1}: Using single model analysis")
+                result = await get_ai_answer(question_data.question, question_data.options, models)
+            else:
+                logger.info(f"🧠 Q{index+1}: Using multi-model analysis")
+                result = await get_multi_model_answer(question_data.question, question_data.options, topic, models)
+            
+            # Ensure result is not None
+            if result is None:
+                return BatchAnswerResponse(
+                    index=index,
+                    error_message="Model returned None result"
+                )
+                
+            batch_response = BatchAnswerResponse(
+                index=index,
+                answer=getattr(result, 'answer', None),
+                confidence=getattr(result, 'confidence', None),
+                raw=getattr(result, 'raw', None),
+                reasoning=getattr(result, 'reasoning', None)
+            )
+            
+            # Add multi-model specific fields if available
+            if hasattr(result, 'consensus'):
+                batch_response.consensus = result.consensus
+            if hasattr(result, 'individual_answers'):
+                batch_response.individual_answers = result.individual_answers
+            batch_response.cache_hits = getattr(result, 'cache_hits', None)
+                
+            return batch_response
+            
+        except Exception as e:
+            logger.error(f"Error processing question {index}: {e}")
+            return BatchAnswerResponse(
+                index=index,
+                error_message=str(e)
+            )
+    
+    def normalize(index: int, result) -> BatchAnswerResponse:
+        # Handle any exceptions in results
+        if isinstance(result, Exception):
+            return BatchAnswerResponse(index=index, error_message=str(result))
+        if result is None:
+            return BatchAnswerResponse(index=index, error_message="Received None result from question processing")
+        if isinstance(result, BatchAnswerResponse):
+            return result
+        # Unexpected result type
+        return BatchAnswerResponse(index=index, error_message=f"Unexpected result type: {type(result)}")
+    
+    processed_results: List[Optional[BatchAnswerResponse]] = [None] * len(questions)
+    
+    async def run(index: int, question_data) -> None:
+        try:
+            result = await process_question(index, question_data)
+        except Exception as e:
+            result = e
+        processed_results[index] = normalize(index, result)
+    
+    # Sliding window: a new question starts as soon as one finishes, never more than chunk_size at once;
+    # their provider calls queue in the scheduler
+    window = max(1, settings.batch_chunk_size)
+    pending = set()
+    try:
+        for index, question_data in enumerate(questions):
+            if len(pending) >= window:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.ensure_future(run(index, question_data)))
+        if pending:
+            await asyncio.wait(pending)
+    except asyncio.CancelledError:
+        # Client went away: don't leave the rest of the window running
+        for task in pending:
+            task.cancel()
+        raise
+    return processed_results
+
+
 @router.post("/ask-batch", response_model=List[BatchAnswerResponse])
 async def ask_questions_batch(
     request: BatchRequest,
@@ -49,82 +171,32 @@ async def ask_questions_batch(
 ):
     """
     Process multiple questions in parallel for better performance
-    Supports both single model and multi-model analysis
+    Supports both single model and multi-model analysis (models list or profile as in /ask)
     """
+    models = request_models(request, multi_model)
+    
+    # A repeated quiz is served as the stored payload of its earlier batch
+    question_keys = [create_cache_key(q.question, q.options) for q in request.questions]
+    fingerprint = quiz_fingerprint(question_keys, models, request.topic)
+    payload = quiz_result_cache.get(fingerprint, question_keys)
+    if payload is not None:
+        logger.info(f"📦 Serving quiz of {len(question_keys)} questions from the quiz cache ({fingerprint[:12]})")
+        return Response(content=payload, media_type="application/json", headers={"X-Quiz-Cache": "hit"})
+    
+    # The middleware charged one rate token for the request; on a quiz-cache miss the other questions count too
+    charge_current_key(len(request.questions) - 1)
+    
+    # Admission is decided once for the whole batch; its items then queue behind interactive calls
+    provider_scheduler.admit(models or ["openai"], BATCH)
+    set_request_class(BATCH)
     try:
         logger.info(f"🔍 /ask-batch endpoint - multi_model parameter: {multi_model} (type: {type(multi_model)})")
-        logger.info(f"Processing batch of {len(request.questions)} questions with multi_model={multi_model}")
-        
-        async def process_question(index: int, question_data) -> BatchAnswerResponse:
-            try:
-                if multi_model:
-                    logger.info(f"🧠 Q{index+1}: Using multi-model analysis")
-                    result = await get_multi_model_answer(question_data.question, question_data.options)
-                else:
-                    logger.info(f"🚀 Q{index+1}: Using single model analysis")
-                    result = await get_ai_answer(question_data.question, question_data.options)
-                
-                # Ensure result is not None
-                if result is None:
-                    return BatchAnswerResponse(
-                        index=index,
-                        error_message="Model returned None result"
-                    )
-                    
-                batch_response = BatchAnswerResponse(
-                    index=index,
-                    answer=getattr(result, 'answer', None),
-                    confidence=getattr(result, 'confidence', None),
-                    raw=getattr(result, 'raw', None),
-                    reasoning=getattr(result, 'reasoning', None)
-                )
-                
-                # Add multi-model specific fields if available
-                if hasattr(result, 'consensus'):
-                    batch_response.consensus = result.consensus
-                if hasattr(result, 'individual_answers'):
-                    batch_response.individual_answers = result.individual_answers
-                    
-                return batch_response
-                
-            except Exception as e:
-                logger.error(f"Error processing question {index}: {e}")
-                return BatchAnswerResponse(
-                    index=index,
-                    error_message=str(e)
-                )
+        logger.info(f"Processing batch of {len(request.questions)} questions with models={models or 'single'}")
         
-        # Process questions in parallel with asyncio
-        tasks = [
-            process_question(i, question) 
-            for i, question in enumerate(request.questions)
-        ]
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Handle any exceptions in results
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                processed_results.append(BatchAnswerResponse(
-                    index=i,
-                    error_message=str(result)
-                ))
-            elif result is None:
-                processed_results.append(BatchAnswerResponse(
-                    index=i,
-                    error_message="Received None result from question processing"
-                ))
-            elif isinstance(result, BatchAnswerResponse):
-                processed_results.append(result)
-            else:
-                # Unexpected result type
-                processed_results.append(BatchAnswerResponse(
-                    index=i,
-                    error_message=f"Unexpected result type: {type(result)}"
-                ))
+        processed_results = await answer_batch(request.questions, models, request.topic)
         
         logger.info(f"Batch processing completed: {len(processed_results)} results")
+        quiz_result_cache.put(fingerprint, question_keys, processed_results)
         return processed_results
         
     except Exception as e:
@@ -132,55 +204,38 @@ async def ask_questions_batch(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/cache-stats")
-async def get_cache_statistics():
-    """
-    Get cache statistics for all AI models
-    Shows how many responses are cached for each model
-    """
-    try:
-        stats = get_cache_stats()
-        return {
-            "status": "success",
-            "cache_stats": stats,
-            "message": "Cache statistics retrieved successfully"
-        }
-    except Exception as e:
-        logger.error(f"Error getting cache stats: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.post("/clear-cache")
-async def clear_all_caches():
+@router.post("/prefetch")
+async def prefetch_quiz(
+    request: BatchRequest,
+    multi_model: bool = Query(default=False, description="Prefetch for multi-model analysis")
+):
     """
-    Clear all model caches and remove cache files
-    Use this to reset cached responses for all models
+    Speculatively answer a quiz before the user asks (sent by the extension when a quiz page loads)
+    Uncached questions are answered in the background scheduler lane, so prefetching never delays
+    interactive or batch requests; a request that needs a question still being prefetched shares
+    (and promotes) its provider call. Cancel with DELETE /prefetch/{job_id}.
     """
-    try:
-        clear_caches()
-        return {
-            "status": "success",
-            "message": "All model caches cleared and cache files removed"
-        }
-    except Exception as e:
-        logger.error(f"Error clearing caches: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    models = request_models(request, multi_model)
+    question_keys = [create_cache_key(q.question, q.options) for q in request.questions]
+    fingerprint = quiz_fingerprint(question_keys, models, request.topic)
+    if quiz_result_cache.contains(fingerprint):
+        return {"status": "cached", "job": None, "message": "Quiz answers are already cached"}
+    
+    questions = [item.model_dump() for item in request.questions]
+    if warmup_service.running_prefetch(fingerprint) is None:
+        # As in /ask-batch, every question sent to a provider costs a rate token (one was charged by the middleware)
+        charge_current_key(max(0, warmup_service.count_uncached(questions, models=models) - 1))
+    job = warmup_service.start(questions, models=models, topic=request.topic, fingerprint=fingerprint)
+    return {
+        "status": "accepted",
+        "job": job.to_dict(),
+        "message": f"Prefetch started for {job.total} questions"
+    }
 
 
-@router.post("/save-cache")
-async def save_caches():
-    """
-    Manually save all caches to disk
-    Useful for ensuring caches are persisted without waiting for auto-save
-    """
-    try:
-        save_caches_now()
-        stats = get_cache_stats()
-        return {
-            "status": "success",
-            "message": "All caches saved to disk successfully",
-            "cache_stats": stats
-        }
-    except Exception as e:
-        logger.error(f"Error saving caches: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+@router.delete("/prefetch/{job_id}")
+async def cancel_prefetch(job_id: str):
+    """Cancel a prefetch (the extension sends this when the quiz tab closes or navigates away)"""
+    if not warmup_service.release_prefetch(job_id):
+        raise HTTPException(status_code=404, detail=f"No running prefetch job: {job_id}")
+    return {"status": "success", "message": f"Prefetch job {job_id} released"}
@@ -2,20 +2,27 @@
 Request schemas for API endpoints
 """
 
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
+from config import settings
+
 
 class QuestionRequest(BaseModel):
     """Single question request schema"""
     question: str = Field(..., description="The quiz question")
     options: List[str] = Field(..., min_items=2, max_items=4, description="Answer options")
+    topic: Optional[str] = Field(default=None, max_length=200, description="Quiz or subject name, used for feedback-based routing")
+    models: Optional[List[str]] = Field(default=None, min_items=1, description="Models to ask (openai, gemini, xai); implies multi-model analysis")
+    profile: Optional[str] = Field(default=None, description="Named model ensemble from ENSEMBLE_PROFILES (fast, balanced, thorough); implies multi-model analysis")
 
     class Config:
         json_schema_extra = {
             "example": {
                 "question": "What is the capital of France?",
-                "options": ["London", "Berlin", "Paris", "Madrid"]
+                "options": ["London", "Berlin", "Paris", "Madrid"],
+                "topic": "European Geography",
+                "profile": "balanced"
             }
         }
 
@@ -36,7 +43,10 @@ class QuestionData(BaseModel):
 
 class BatchRequest(BaseModel):
     """Batch questions request schema"""
-    questions: List[QuestionData] = Field(..., description="List of questions to process")
+    questions: List[QuestionData] = Field(..., min_items=1, max_items=settings.batch_max_questions, description="List of questions to process")
+    topic: Optional[str] = Field(default=None, max_length=200, description="Quiz or subject name, used for feedback-based routing")
+    models: Optional[List[str]] = Field(default=None, min_items=1, description="Models to ask (openai, gemini, xai); implies multi-model analysis")
+    profile: Optional[str] = Field(default=None, description="Named model ensemble from ENSEMBLE_PROFILES (fast, balanced, thorough); implies multi-model analysis")
 
     class Config:
         json_schema_extra = {
@@ -53,3 +63,61 @@ class BatchRequest(BaseModel):
                 ]
             }
         }
+
+
+class WarmupRequest(BaseModel):
+    """Cache warm-up request schema"""
+    questions: List[QuestionData] = Field(..., description="Questions whose answers should be pre-cached")
+    multi_model: bool = Field(default=False, description="Warm both OpenAI and Gemini caches")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "questions": [
+                    {
+                        "question": "What is 2 + 2?",
+                        "options": ["3", "4", "5", "6"]
+                    }
+                ],
+                "multi_model": True
+            }
+        }
+
+
+class BatchJobRequest(BaseModel):
+    """Offline bulk-answering request schema (provider Batch API)"""
+    questions: List[QuestionData] = Field(..., min_items=1, description="Question bank to pre-compute answers for")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "questions": [
+                    {
+                        "question": "What is 2 + 2?",
+                        "options": ["3", "4", "5", "6"]
+                    },
+                    {
+                        "question": "Which planet is closest to the Sun?",
+                        "options": ["Venus", "Mercury", "Earth", "Mars"]
+                    }
+                ]
+            }
+        }
+
+
+class FeedbackRequest(BaseModel):
+    """Outcome feedback: the correct answer to a question that was answered earlier"""
+    question: str = Field(..., description="The quiz question, exactly as it was asked")
+    options: List[str] = Field(..., min_items=2, max_items=4, description="Answer options, in the order they were asked")
+    correct_answer: str = Field(..., pattern="^[A-Da-d]$", description="Letter of the option marked correct")
+    topic: Optional[str] = Field(default=None, max_length=200, description="Quiz or subject name")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "question": "What is the capital of France?",
+                "options": ["London", "Berlin", "Paris", "Madrid"],
+                "correct_answer": "C",
+                "topic": "European Geography"
+            }
+        }
@@ -14,6 +14,7 @@ class ModelResponse(BaseModel):
     confidence: int = Field(..., ge=1, le=10, description="Confidence level 1-10")
     raw: str = Field(..., description="Raw AI response")
     reasoning: Optional[str] = Field(None, description="Reasoning explanation from the model")
+    error: bool = Field(False, description="Whether this model response is an error fallback")
     error_message: Optional[bool] = Field(False, description="Whether this model response is an error fallback")
 
     model_config = {"protected_namespaces": ()}
@@ -26,6 +27,11 @@ class MultiModelAnalysis(BaseModel):
     avg_confidence: float = Field(..., description="Average confidence across models")
     conflicting_answers: List[str] = Field(default=[], description="Different answers if no consensus")
     ai_model_responses: List[ModelResponse] = Field(..., description="Individual model responses")
+    consensus_probability: Optional[float] = Field(None, description="Calibrated probability that the selected answer is correct")
+    answer_probabilities: Optional[Dict[str, float]] = Field(None, description="Calibrated probability per option")
+    votes: Optional[List[Dict[str, Any]]] = Field(None, description="Per-model vote weights used for the decision")
+    skipped_models: List[str] = Field(default=[], description="Models not called because the quorum was already confident")
+    cached_models: List[str] = Field(default=[], description="Model legs served from stored results instead of a provider call")
 
     model_config = {"protected_namespaces": ()}
 
@@ -47,6 +53,7 @@ class AnswerResponse(BaseModel):
     # Extension compatibility fields
     consensus: Optional[bool] = Field(None, description="Whether models reached consensus (for extension compatibility)")
     individual_answers: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="Individual model answers for extension")
+    cache_hits: Optional[Dict[str, bool]] = Field(None, description="Per model leg: served from stored results (true) or fetched (false)")
 
     class Config:
         json_schema_extra = {
@@ -93,6 +100,7 @@ class BatchAnswerResponse(BaseModel):
     # Multi-model fields for extension compatibility
     consensus: Optional[bool] = None
     individual_answers: Optional[Dict[str, Dict[str, Any]]] = None
+    cache_hits: Optional[Dict[str, bool]] = None
 
     class Config:
         json_schema_extra = {
@@ -132,6 +140,7 @@ class HealthResponse(BaseModel):
     uptime: float
     timestamp: str
     openai: str
+    ready: bool = Field(default=True, description="False while the response caches are still loading")
 
     class Config:
         json_schema_extra = {
@@ -139,6 +148,7 @@ class HealthResponse(BaseModel):
                 "status": "healthy",
                 "uptime": 1234.56,
                 "timestamp": "2025-07-23T17:30:00.000000",
-                "openai": "configured"
+                "openai": "configured",
+                "ready": True
             }
         }
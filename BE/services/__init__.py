@@ -2,6 +2,7 @@
 Services package initialization
 """
 
-from .ai_service import get_ai_answer, parse_answer_response
+from .ai_service import get_ai_answer
+from .answer_parser import parse_answer_response
 
 __all__ = ["get_ai_answer", "parse_answer_response"]
@@ -5,63 +5,93 @@ Handles client initialization and configuration
 
 import os
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-# AI Model imports
-from openai import AsyncOpenAI
-from google import genai
+# Provider SDKs are imported on first use so startup (and --reload) does not pay for them
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from google import genai
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+from services.provider_recording import (
+    get_recorder, get_replay_store, reset_recording,
+    RecordingOpenAIClient, RecordingGeminiClient, ReplayOpenAIClient, ReplayGeminiClient
+)
+
 logger = logging.getLogger(__name__)
 
 # Global client variables
-_openai_client: Optional[AsyncOpenAI] = None
-_xai_client: Optional[AsyncOpenAI] = None
-_gemini_client: Optional[genai.Client] = None
+_openai_client: Optional["AsyncOpenAI"] = None
+_xai_client: Optional["AsyncOpenAI"] = None
+_gemini_client: Optional["genai.Client"] = None
 
 
-def get_openai_client() -> AsyncOpenAI:
+def get_openai_client() -> "AsyncOpenAI":
     """Get or create OpenAI client with lazy initialization"""
     global _openai_client
     if _openai_client is None:
+        replay_store = get_replay_store()
+        if replay_store is not None:
+            _openai_client = ReplayOpenAIClient("openai", replay_store)
+            logger.info("OpenAI client replaying recorded calls")
+            return _openai_client
+
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
+        from openai import AsyncOpenAI
         _openai_client = AsyncOpenAI(
             api_key=api_key,
             timeout=30.0  # 30 second timeout
         )
+        if get_recorder() is not None:
+            _openai_client = RecordingOpenAIClient(_openai_client, "openai", get_recorder())
         logger.info("OpenAI client initialized")
     
     return _openai_client
 
 
-def get_xai_client() -> AsyncOpenAI:
+def get_xai_client() -> "AsyncOpenAI":
     """Get or create xAI client with lazy initialization"""
     global _xai_client
     if _xai_client is None:
+        replay_store = get_replay_store()
+        if replay_store is not None:
+            _xai_client = ReplayOpenAIClient("xai", replay_store)
+            logger.info("xAI client replaying recorded calls")
+            return _xai_client
+
         api_key = os.getenv("XAI_API_KEY")
         if not api_key:
             raise ValueError("XAI_API_KEY environment variable is required")
         
+        from openai import AsyncOpenAI
         _xai_client = AsyncOpenAI(
             api_key=api_key,
             base_url="https://api.x.ai/v1",
             timeout=30.0  # 30 second timeout
         )
+        if get_recorder() is not None:
+            _xai_client = RecordingOpenAIClient(_xai_client, "xai", get_recorder())
         logger.info("xAI client initialized")
     
     return _xai_client
 
 
-def get_gemini_client() -> genai.Client:
+def get_gemini_client() -> "genai.Client":
     """Get or create Gemini client with lazy initialization"""
     global _gemini_client
     if _gemini_client is None:
+        replay_store = get_replay_store()
+        if replay_store is not None:
+            _gemini_client = ReplayGeminiClient("gemini", replay_store)
+            logger.info("Gemini client replaying recorded calls")
+            return _gemini_client
+
         api_key = os.getenv("GEMINI_API_KEY")
         location = os.getenv("GOOGLE_CLOUD_LOCATION")
         project = os.getenv("GOOGLE_CLOUD_PROJECT")
@@ -69,23 +99,40 @@ def get_gemini_client() -> genai.Client:
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable is required")
         
+        from google import genai
         _gemini_client = genai.Client(
             # api_key=api_key,
             vertexai=True,
             project=project,
             location=location,
         )
+        if get_recorder() is not None:
+            _gemini_client = RecordingGeminiClient(_gemini_client, "gemini", get_recorder())
         logger.info("Gemini client initialized")
     
     return _gemini_client
 
 
+def preload_provider_sdks() -> None:
+    """
+    Import the SDKs of configured providers ahead of the first request
+    Meant to run in a worker thread after startup, so the first provider call does not block the loop
+    """
+    if os.getenv("OPENAI_API_KEY") or os.getenv("XAI_API_KEY"):
+        import openai  # noqa: F401
+    if os.getenv("GEMINI_API_KEY"):
+        from google import genai  # noqa: F401
+        from google.genai import types  # noqa: F401
+    logger.info("Provider SDKs preloaded")
+
+
 def reset_clients() -> None:
     """Reset all clients (useful for testing or configuration changes)"""
     global _openai_client, _xai_client, _gemini_client
     _openai_client = None
     _xai_client = None
     _gemini_client = None
+    reset_recording()
     logger.info("All AI clients reset")
 
 
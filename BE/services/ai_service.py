@@ -2,167 +2,96 @@
 AI service for quiz processing using OpenAI GPT models
 """
 
-import re
 import logging
-from typing import List, Tuple
+from typing import Dict, List, Optional
 from fastapi import HTTPException
+from config import settings
 from schemas.responses import AnswerResponse, ModelResponse
 from services.ai_clients import get_openai_client
-from services.cache_service import create_cache_key, get_from_cache, add_to_cache
+from services.model_results import lookup_results, fetch_result, complete_chat_answer, register_leg
+from services.scheduler import AdmissionRejected
+from services.circuit_breaker import ProviderUnavailable
+from services.cache_service import create_cache_key, add_to_cache, register_prompt_version
+from services.prompts import OPENAI_PROMPT
 
 logger = logging.getLogger(__name__)
 
-
-def parse_answer_response(response_content: str) -> Tuple[str, int, str]:
-    """
-    Parse AI response to extract answer, confidence, and reasoning with enhanced regex patterns
-    """
-    try:
-        # Strategy 1: Look for explicit Answer: pattern
-        answer_match = re.search(r'[Aa]nswer:\s*([A-Da-d])', response_content)
-        if answer_match:
-            answer = answer_match.group(1).upper()
-        else:
-            # Strategy 2: Look for standalone letter patterns
-            letter_matches = re.findall(r'\b([A-Da-d])\b', response_content)
-            if letter_matches:
-                answer = letter_matches[0].upper()
-            else:
-                # Strategy 3: Fallback to first found letter
-                all_letters = re.findall(r'([A-Da-d])', response_content)
-                answer = all_letters[0].upper() if all_letters else "A"
-        
-        # Enhanced confidence parsing with multiple patterns
-        confidence_patterns = [
-            r'[Cc]onfidence:\s*(\d+)',
-            r'[Cc]onfidence\s+[Ll]evel:\s*(\d+)',
-            r'(\d+)/10',
-            r'(\d+)\s*out\s*of\s*10',
-            r'[Cc]ertain.*?(\d+)',
-        ]
-        
-        confidence = 8  # Default confidence
-        for pattern in confidence_patterns:
-            conf_match = re.search(pattern, response_content)
-            if conf_match:
-                confidence = min(10, max(1, int(conf_match.group(1))))
-                break
-        
-        # Extract reasoning
-        reasoning_patterns = [
-            r'[Rr]easoning:\s*(.+?)(?:\n|$)',
-            r'[Ee]xplanation:\s*(.+?)(?:\n|$)',
-            r'[Jj]ustification:\s*(.+?)(?:\n|$)',
-            r'[Bb]ecause:\s*(.+?)(?:\n|$)',
-        ]
-        
-        reasoning = "No reasoning provided"
-        for pattern in reasoning_patterns:
-            reasoning_match = re.search(pattern, response_content, re.DOTALL)
-            if reasoning_match:
-                reasoning = reasoning_match.group(1).strip()
-                break
-        
-        # If no explicit reasoning found, try to extract everything after the confidence
-        if reasoning == "No reasoning provided":
-            # Look for content after confidence line
-            after_confidence = re.search(r'[Cc]onfidence:\s*\d+\s*(.+)', response_content, re.DOTALL)
-            if after_confidence:
-                potential_reasoning = after_confidence.group(1).strip()
-                if len(potential_reasoning) > 10:  # Only use if substantial content
-                    reasoning = potential_reasoning
-        
-        return answer, confidence, reasoning
-        
-    except Exception as e:
-        logger.warning(f"Error parsing response: {e}")
-        return "A", 1, "Error parsing reasoning"
+# Precompiled static-prefix prompt shared with the consensus path (see services/prompts.py)
+PROMPT_HASH = OPENAI_PROMPT.prompt_hash
+register_prompt_version("openai", PROMPT_HASH)
 
 
-async def get_ai_answer(question: str, options: List[str]) -> AnswerResponse:
+async def get_ai_answer(question: str, options: List[str], legs: Optional[List[str]] = None) -> AnswerResponse:
     """
     Get AI answer for a single question with caching and enhanced error handling
+    
+    Any leg in legs (default settings.single_model_preference) that already answered the
+    question (in either mode) serves it; otherwise GPT-4.1 is asked. A caller that picked the
+    ensemble explicitly passes only those legs.
     """
-    # Check cache first
     cache_key = create_cache_key(question, options)
-    cached_response = get_from_cache("openai", cache_key)
-    if cached_response:
-        logger.debug("Returning cached single-model response")
-        # Convert ModelResponse to AnswerResponse for compatibility
-        return AnswerResponse(
-            answer=cached_response.answer,
-            confidence=cached_response.confidence,
-            raw=cached_response.raw,
-            reasoning=cached_response.reasoning,
-            model=cached_response.model
-        )
+    cached = lookup_results(legs or settings.single_model_preference, question, options, cache_key, first_hit=True)
+    for model_name, cached_response in cached.items():
+        if not cached_response.error:
+            logger.debug(f"Returning cached {model_name} response for single-model request")
+            return to_answer_response(cached_response, {model_name: True})
+    if cached.get("openai") is not None:
+        # Recent failure for this question - fail fast instead of hitting the provider again
+        raise HTTPException(status_code=500, detail=f"AI service error: {cached['openai'].raw}")
     
-    try:
-        # Format options properly
-        formatted_options = []
-        for i, option in enumerate(options):
-            letter = chr(65 + i)  # A, B, C, D
-            formatted_options.append(f"{letter}. {option}")
-        
-        options_text = "\n".join(formatted_options)
-        
-        # Enhanced prompt for better accuracy
-        prompt = f"""You are an expert quiz assistant. Analyze this question carefully and provide the best answer.
+    result = await fetch_result("openai", fetch_openai_result, question, options, cache_key)
+    if result.error:
+        raise HTTPException(status_code=500, detail=f"AI service error: {result.raw}")
+    logger.info(f"Question processed: {question[:50]}... -> Answer: {result.answer} (Confidence: {result.confidence})")
+    return to_answer_response(result, {"openai": False})
 
-Question: {question}
 
-Options:
-{options_text}
+def to_answer_response(result: ModelResponse, cache_hits: Dict[str, bool]) -> AnswerResponse:
+    """Single-model AnswerResponse for one leg's result"""
+    return AnswerResponse(
+        answer=result.answer,
+        confidence=result.confidence,
+        raw=result.raw,
+        reasoning=result.reasoning,
+        model=result.model,
+        cache_hits=cache_hits
+    )
 
-Instructions:
-1. Think through each option systematically
-2. Choose the most accurate answer
-3. Provide your confidence level (1-10)
 
-Format your response as:
-Answer: [A/B/C/D]
-Confidence: [1-10]
-Reasoning: [Brief explanation]"""
+def build_chat_request(question: str, options: List[str]) -> dict:
+    """Chat completion parameters for a single-model answer (shared by live and batch requests)"""
+    return dict(
+        model="gpt-4.1",
+        messages=OPENAI_PROMPT.messages(question, options),
+        temperature=0.1,  # Low temperature for consistency
+        **OPENAI_PROMPT.chat_params()
+    )
 
-        # Get OpenAI client
-        openai_client = get_openai_client()
 
-        response = await openai_client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": "You are a highly accurate quiz assistant. Always provide clear, confident answers in the requested format."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0.1  # Low temperature for consistency
-        )
-        
-        response_content = response.choices[0].message.content
-        answer, confidence, reasoning = parse_answer_response(response_content)
-        
-        logger.info(f"Question processed: {question[:50]}... -> Answer: {answer} (Confidence: {confidence})")
-        
-        # Create response objects
-        answer_response = AnswerResponse(
-            answer=answer,
-            confidence=confidence,
-            raw=response_content,
-            reasoning=reasoning,
-            model="gpt-4.1"
+async def fetch_openai_result(question: str, options: List[str], cache_key: str) -> ModelResponse:
+    """Call OpenAI GPT-4.1 and store the result (shared by single-model mode and the consensus leg)"""
+    try:
+        return await complete_chat_answer(
+            get_openai_client(), "openai", cache_key, "gpt-4.1", PROMPT_HASH,
+            **build_chat_request(question, options)
         )
         
-        # Cache the response for future use (as ModelResponse)
-        model_response = ModelResponse(
+    except (AdmissionRejected, ProviderUnavailable):
+        # Overload and open circuits are not answers for this question - do not negative-cache them
+        raise
+    except Exception as e:
+        logger.error(f"Error getting OpenAI answer: {e}")
+        # Return error response instead of raising exception (briefly negative-cached)
+        error_response = ModelResponse(
             model="gpt-4.1",
-            answer=answer,
-            confidence=confidence,
-            raw=response_content,
-            reasoning=reasoning
+            answer="A",  # Arbitrary fallback answer
+            confidence=1,  # Minimum confidence for failed request
+            raw=f"OpenAI Error: {str(e)}",
+            reasoning="Error: OpenAI model failed to respond",
+            error=True
         )
-        add_to_cache("openai", cache_key, model_response)
-        
-        return answer_response
-        
-    except Exception as e:
-        logger.error(f"Error getting AI answer: {e}")
-        raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
+        add_to_cache("openai", cache_key, error_response)
+        return error_response
+
+
+register_leg("openai", fetch_openai_result)
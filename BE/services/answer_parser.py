@@ -0,0 +1,97 @@
+"""
+Model answer parsing
+One parser for every provider and mode, so a stored result means the same thing whether it was
+produced by single-model mode, a consensus leg, a warm-up or an offline batch job.
+"""
+
+import re
+import logging
+from typing import Tuple
+
+from schemas.responses import ModelResponse
+
+logger = logging.getLogger(__name__)
+
+# Used when the model states no confidence: neither a confident nor a failed answer
+DEFAULT_CONFIDENCE = 5
+
+_ANSWER_PATTERN = re.compile(r'[Aa]nswer:\s*([A-Da-d])')
+
+_CONFIDENCE_PATTERNS = [
+    re.compile(r'[Cc]onfidence:\s*(\d+)'),
+    re.compile(r'[Cc]onfidence\s+[Ll]evel:\s*(\d+)'),
+    re.compile(r'(\d+)/10'),
+    re.compile(r'(\d+)\s*out\s*of\s*10'),
+]
+
+_REASONING_PATTERNS = [
+    re.compile(r'[Rr]easoning:\s*(.+?)(?:\n|$)', re.DOTALL),
+    re.compile(r'[Ee]xplanation:\s*(.+?)(?:\n|$)', re.DOTALL),
+    re.compile(r'[Jj]ustification:\s*(.+?)(?:\n|$)', re.DOTALL),
+    re.compile(r'[Bb]ecause:\s*(.+?)(?:\n|$)', re.DOTALL),
+]
+
+
+def parse_answer_response(response_content: str) -> Tuple[str, int, str]:
+    """
+    Parse AI response to extract answer, confidence, and reasoning
+    """
+    try:
+        # Strategy 1: Look for explicit Answer: pattern
+        answer_match = _ANSWER_PATTERN.search(response_content)
+        if answer_match:
+            answer = answer_match.group(1).upper()
+        else:
+            # Strategy 2: Look for standalone letter patterns
+            letter_matches = re.findall(r'\b([A-Da-d])\b', response_content)
+            if letter_matches:
+                answer = letter_matches[0].upper()
+            else:
+                # Strategy 3: Fallback to first found letter
+                all_letters = re.findall(r'([A-Da-d])', response_content)
+                answer = all_letters[0].upper() if all_letters else "A"
+
+        confidence = DEFAULT_CONFIDENCE
+        for pattern in _CONFIDENCE_PATTERNS:
+            conf_match = pattern.search(response_content)
+            if conf_match:
+                confidence = min(10, max(1, int(conf_match.group(1))))
+                break
+
+        reasoning = "No reasoning provided"
+        for pattern in _REASONING_PATTERNS:
+            reasoning_match = pattern.search(response_content)
+            if reasoning_match:
+                reasoning = reasoning_match.group(1).strip()
+                break
+
+        # If no explicit reasoning found, try to extract everything after the confidence
+        if reasoning == "No reasoning provided":
+            after_confidence = re.search(r'[Cc]onfidence:\s*\d+\s*(.+)', response_content, re.DOTALL)
+            if after_confidence:
+                potential_reasoning = after_confidence.group(1).strip()
+                if len(potential_reasoning) > 10:  # Only use if substantial content
+                    reasoning = potential_reasoning
+
+        return answer, confidence, reasoning
+
+    except Exception as e:
+        logger.warning(f"Error parsing response: {e}")
+        return "A", 1, "Error parsing reasoning"
+
+
+def is_parse_fallback(response_content: str) -> bool:
+    """Whether the answer was guessed from stray letters rather than read from an Answer: line"""
+    return _ANSWER_PATTERN.search(response_content) is None
+
+
+def build_model_response(model_name: str, response_content: str) -> ModelResponse:
+    """Parse provider text into a ModelResponse"""
+    answer, confidence, reasoning = parse_answer_response(response_content)
+    return ModelResponse(
+        model=model_name,
+        answer=answer,
+        confidence=confidence,
+        raw=response_content,
+        reasoning=reasoning
+    )
@@ -0,0 +1,161 @@
+"""
+API keys with per-key quotas
+Keys are loaded from a local JSON file; each key has a token-bucket rate limit, a cap on
+concurrent requests and a fair-share weight used by the provider scheduler. All checks on the
+request path are O(1): one dict lookup, one bucket refill and one counter comparison.
+"""
+
+import json
+import math
+import time
+import logging
+from pathlib import Path
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+API_KEYS_FILE = Path(__file__).parent.parent / settings.api_keys_file
+
+
+class QuotaExceeded(Exception):
+    """Raised when an API key is over its rate or concurrency quota"""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        self.name = name
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"API key '{name}' exceeded its {reason} quota, retry after {self.retry_after}s")
+
+
+class ApiKey:
+    """One tenant: its quotas, token bucket and usage counters"""
+
+    def __init__(self, name: str, key: str, requests_per_minute: float = 0, burst: Optional[float] = None,
+                 max_concurrent: int = 0, weight: float = 1.0):
+        self.name = name
+        self.key = key
+        self.rate = requests_per_minute / 60.0  # tokens per second; 0 = unlimited
+        self.capacity = burst if burst is not None else max(1.0, requests_per_minute / 6.0)
+        self.max_concurrent = max_concurrent  # 0 = unlimited
+        self.weight = max(0.01, weight)
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.usage = {
+            "requests": 0,
+            "rate_limited": 0,
+            "concurrency_limited": 0,
+            "provider_calls": 0,
+            "provider_seconds": 0.0
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def charge(self, cost: float = 1.0) -> None:
+        """
+        Take `cost` tokens from the bucket or raise QuotaExceeded
+
+        A cost larger than the burst is admitted once the bucket is full and leaves it in debt,
+        so a large batch is never refused outright but delays the key's next requests.
+        """
+        if not self.rate:
+            return
+        self._refill()
+        needed = min(cost, self.capacity)
+        if self._tokens < needed:
+            self.usage["rate_limited"] += 1
+            raise QuotaExceeded(self.name, "rate", (needed - self._tokens) / self.rate)
+        self._tokens -= cost
+
+    def enter(self) -> None:
+        """Count one request in flight, or raise QuotaExceeded when at the concurrency cap"""
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            self.usage["concurrency_limited"] += 1
+            raise QuotaExceeded(self.name, "concurrency", 1)
+        self.in_flight += 1
+        self.usage["requests"] += 1
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+
+    def record_provider_call(self, seconds: float) -> None:
+        self.usage["provider_calls"] += 1
+        self.usage["provider_seconds"] += seconds
+
+    def stats(self) -> dict:
+        if self.rate:
+            self._refill()
+        return {
+            "requests_per_minute": round(self.rate * 60, 2) or None,
+            "max_concurrent": self.max_concurrent or None,
+            "weight": self.weight,
+            "in_flight": self.in_flight,
+            "tokens": round(self._tokens, 2) if self.rate else None,
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.usage.items()}
+        }
+
+
+# The key that authenticated the current request; provider calls it makes are charged to it
+current_api_key: ContextVar[Optional[ApiKey]] = ContextVar("current_api_key", default=None)
+
+
+class ApiKeyRegistry:
+    """
+    Lookup table from key string to ApiKey
+
+    File format (api_keys.json next to main.py):
+    {"keys": [{"name": "alice", "key": "...", "requests_per_minute": 60, "burst": 20,
+               "max_concurrent": 4, "weight": 1.0}]}
+    The single QUIZ_API_KEY from settings stays valid as an unlimited key named "default".
+    """
+
+    def __init__(self, path: Path = API_KEYS_FILE):
+        self.path = path
+        self._keys: Dict[str, ApiKey] = {}
+        self.load()
+
+    def load(self) -> None:
+        keys: Dict[str, ApiKey] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for entry in data.get("keys", []):
+                    api_key = ApiKey(
+                        name=entry["name"],
+                        key=entry["key"],
+                        requests_per_minute=entry.get("requests_per_minute", 0),
+                        burst=entry.get("burst"),
+                        max_concurrent=entry.get("max_concurrent", 0),
+                        weight=entry.get("weight", 1.0)
+                    )
+                    keys[api_key.key] = api_key
+                logger.info(f"🔑 Loaded {len(keys)} API keys from {self.path}")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.error(f"Error loading API keys from {self.path}: {e}")
+        if settings.api_key and settings.api_key not in keys:
+            keys[settings.api_key] = ApiKey("default", settings.api_key)
+        self._keys = keys
+
+    def authenticate(self, key: Optional[str]) -> Optional[ApiKey]:
+        return self._keys.get(key) if key else None
+
+    def stats(self) -> Dict[str, dict]:
+        return {api_key.name: api_key.stats() for api_key in self._keys.values()}
+
+
+def charge_current_key(cost: float) -> None:
+    """Charge extra rate tokens to the current request's key (e.g. one per batch question)"""
+    api_key = current_api_key.get()
+    if api_key is not None:
+        api_key.charge(cost)
+
+
+# Global registry used by the auth middleware
+api_key_registry = ApiKeyRegistry()
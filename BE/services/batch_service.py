@@ -0,0 +1,257 @@
+"""
+Offline bulk answering through the OpenAI Batch API
+Turns uncached questions into a batch input file (JSONL), submits it, polls until the provider
+finishes and bulk-inserts the parsed answers into the "openai" cache
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from schemas.responses import ModelResponse
+from services.ai_clients import get_openai_client
+from services.ai_service import PROMPT_HASH, build_chat_request
+from services.answer_parser import build_model_response
+from services.cache_service import create_cache_key, peek_cache, add_many_to_cache
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Finished jobs kept around for status queries
+MAX_TRACKED_JOBS = 20
+
+# Parsed results are inserted into the cache in chunks of this size
+INSERT_CHUNK_SIZE = 500
+
+
+class BatchJob:
+    """Progress of one bulk-answering run (may span several provider batches)"""
+
+    def __init__(self, questions: List[dict]):
+        self.id = uuid.uuid4().hex[:12]
+        self.questions = questions
+        self.status = "pending"
+        self.total = len(questions)
+        self.already_cached = 0
+        self.submitted = 0
+        self.filled = 0
+        self.failed = 0
+        self.provider_batches: Dict[str, dict] = {}  # provider batch id -> status summary
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "already_cached": self.already_cached,
+            "submitted": self.submitted,
+            "filled": self.filled,
+            "failed": self.failed,
+            "provider_batches": list(self.provider_batches.values()),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+def build_batch_lines(questions: List[dict]) -> Tuple[List[str], int]:
+    """
+    Build Batch API input lines for the questions that are not cached yet
+
+    A question counts as cached when any leg single mode answers from has it stored (peeked, so
+    the scan does not skew hit/miss stats). Each line's custom_id is the question's cache key, so
+    results map straight back into the cache.
+    Returns (lines, already_cached); duplicate questions are only requested once.
+    """
+    lines = []
+    seen = set()
+    already_cached = 0
+    for item in questions:
+        cache_key = create_cache_key(item["question"], item["options"])
+        if cache_key in seen:
+            already_cached += 1
+            continue
+        seen.add(cache_key)
+
+        if any(peek_cache(name, cache_key) is not None for name in settings.single_model_preference):
+            already_cached += 1
+            continue
+
+        lines.append(json.dumps({
+            "custom_id": cache_key,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": build_chat_request(item["question"], item["options"])
+        }))
+    return lines, already_cached
+
+
+def parse_batch_result(record: dict) -> Tuple[str, Optional[ModelResponse], Optional[str]]:
+    """Turn one output-file record into (cache_key, response, model_id); response is None on failure"""
+    cache_key = record["custom_id"]
+    response = record.get("response") or {}
+    if record.get("error") or response.get("status_code") != 200:
+        return cache_key, None, None
+
+    body = response["body"]
+    response_content = body["choices"][0]["message"]["content"]
+    return cache_key, build_model_response("gpt-4.1", response_content), body.get("model")
+
+
+class BatchService:
+    """Submits provider batch jobs for question banks and ingests their results"""
+
+    def __init__(self, poll_interval: float = settings.batch_api_poll_interval,
+                 max_requests: int = settings.batch_api_max_requests,
+                 completion_window: str = settings.batch_api_completion_window):
+        self.poll_interval = poll_interval
+        self.max_requests = max(1, max_requests)
+        self.completion_window = completion_window
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+
+    async def _submit(self, client, job: BatchJob, lines: List[str]) -> str:
+        """Upload one JSONL input file and create a provider batch for it"""
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        input_file = await client.files.create(file=(f"quiz-batch-{job.id}.jsonl", payload), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+            metadata={"job_id": job.id}
+        )
+        job.provider_batches[batch.id] = {"id": batch.id, "status": batch.status, "requests": len(lines)}
+        job.submitted += len(lines)
+        logger.info(f"📦 Batch job {job.id}: submitted {len(lines)} requests as provider batch {batch.id}")
+        return batch.id
+
+    async def _ingest_file(self, client, job: BatchJob, file_id: str) -> None:
+        """Stream an output or error file and bulk-insert successful answers"""
+        items = []
+
+        def flush() -> None:
+            job.filled += add_many_to_cache("openai", items)
+            items.clear()
+
+        async with client.files.with_streaming_response.content(file_id) as response:
+            async for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    cache_key, model_response, model_id = parse_batch_result(json.loads(line))
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    logger.warning(f"Batch job {job.id}: unreadable result line: {e}")
+                    job.failed += 1
+                    continue
+
+                if model_response is None:
+                    job.failed += 1
+                    continue
+                items.append((cache_key, model_response, {"prompt_hash": PROMPT_HASH, "model_id": model_id}))
+                if len(items) >= INSERT_CHUNK_SIZE:
+                    flush()
+                    await asyncio.sleep(0)  # Let queued requests run between chunks
+        flush()
+
+    async def _wait_for(self, client, job: BatchJob, batch_id: str) -> None:
+        """Poll one provider batch until it reaches a terminal state, then ingest its results"""
+        while True:
+            batch = await client.batches.retrieve(batch_id)
+            summary = job.provider_batches[batch_id]
+            summary["status"] = batch.status
+            if batch.request_counts is not None:
+                summary["completed"] = batch.request_counts.completed
+                summary["failed"] = batch.request_counts.failed
+            if batch.status in TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        # Expired and cancelled batches still return whatever finished before the cut-off
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                await self._ingest_file(client, job, file_id)
+
+        # Requests the provider never got to (expired or cancelled) appear in neither file
+        if batch.request_counts is not None:
+            counts = batch.request_counts
+            job.failed += max(0, summary["requests"] - counts.completed - counts.failed)
+        logger.info(f"📦 Batch job {job.id}: provider batch {batch_id} {batch.status}")
+
+    async def _cancel_provider_batches(self, client, job: BatchJob) -> None:
+        for batch_id, summary in job.provider_batches.items():
+            if summary["status"] in TERMINAL_STATUSES:
+                continue
+            try:
+                await client.batches.cancel(batch_id)
+                summary["status"] = "cancelling"
+            except Exception as e:
+                logger.warning(f"Batch job {job.id}: could not cancel provider batch {batch_id}: {e}")
+
+    async def _run(self, job: BatchJob) -> None:
+        job.status = "preparing"
+        client = None
+        try:
+            lines, job.already_cached = build_batch_lines(job.questions)
+            logger.info(f"📦 Batch job {job.id} started: {len(lines)} of {job.total} questions need answers")
+            if lines:
+                client = get_openai_client()
+                batch_ids = []
+                for start in range(0, len(lines), self.max_requests):
+                    batch_ids.append(await self._submit(client, job, lines[start:start + self.max_requests]))
+
+                job.status = "submitted"
+                await asyncio.gather(*(self._wait_for(client, job, batch_id) for batch_id in batch_ids))
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            if client is not None:
+                await self._cancel_provider_batches(client, job)
+            raise
+        except Exception as e:
+            logger.error(f"Batch job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"📦 Batch job {job.id} {job.status}: {job.to_dict()}")
+
+    def start(self, questions: List[dict]) -> BatchJob:
+        """Schedule a bulk-answering job on the running event loop and return it immediately"""
+        job = BatchJob(questions)
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        self._jobs[job.id] = job
+
+        # Forget the oldest finished jobs
+        while len(self._jobs) > MAX_TRACKED_JOBS:
+            oldest_id = next(iter(self._jobs))
+            if not self._jobs[oldest_id].task.done():
+                break
+            del self._jobs[oldest_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.task is None or job.task.done():
+            return False
+        job.task.cancel()
+        return True
+
+    def list_jobs(self) -> List[Dict]:
+        return [job.to_dict() for job in self._jobs.values()]
+
+
+# Global batch service instance
+batch_service = BatchService()
@@ -0,0 +1,133 @@
+"""
+Lightweight cache instrumentation
+Plain integer counters per model plus a bounded Space-Saving sketch of the most-asked questions
+"""
+
+from typing import Dict, Hashable, List, Optional
+
+
+class ModelCacheCounters:
+    """Per-model counters; updated with plain attribute increments on the hot path"""
+
+    __slots__ = (
+        "hits", "misses", "negative_hits", "inserts", "evictions", "expirations",
+        "saves", "save_failures", "last_save_seconds", "total_save_seconds",
+        "last_save_at", "load_seconds",
+    )
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.inserts = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.saves = 0
+        self.save_failures = 0
+        self.last_save_seconds: Optional[float] = None
+        self.total_save_seconds = 0.0
+        self.last_save_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+
+    def record_save(self, duration: float, finished_at: float, ok: bool) -> None:
+        if not ok:
+            self.save_failures += 1
+            return
+        self.saves += 1
+        self.last_save_seconds = duration
+        self.total_save_seconds += duration
+        self.last_save_at = finished_at
+
+    def to_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        data = {field: getattr(self, field) for field in self.__slots__}
+        data["hit_rate"] = round(self.hits / lookups, 4) if lookups else None
+        data["avg_save_seconds"] = round(self.total_save_seconds / self.saves, 4) if self.saves else None
+        return data
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch (Metwally et al.)
+
+    Tracks at most ``capacity`` keys. Counts for tracked keys are over-estimates by at most
+    the reported error; any key asked more than N/capacity times is guaranteed to be tracked.
+    Keys are grouped in buckets of equal count, linked in ascending order (the paper's stream
+    summary), so every add is O(1): the minimum to replace is always the first bucket.
+    """
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self._counts: Dict[Hashable, List] = {}  # key -> [count, error, label]
+        self._buckets: Dict[int, Dict[Hashable, None]] = {}  # count -> keys, oldest first
+        self._next: Dict[int, Optional[int]] = {}  # count -> next larger count with a bucket
+        self._prev: Dict[int, Optional[int]] = {}
+        self._min: Optional[int] = None
+        self.total = 0
+
+    def _attach(self, key: Hashable, count: int, after: Optional[int]) -> None:
+        """Put key in the bucket for count, creating it right after bucket ``after`` (None = first)"""
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+            following = self._min if after is None else self._next[after]
+            self._prev[count], self._next[count] = after, following
+            if after is None:
+                self._min = count
+            else:
+                self._next[after] = count
+            if following is not None:
+                self._prev[following] = count
+        bucket[key] = None
+
+    def _detach(self, key: Hashable, count: int) -> None:
+        bucket = self._buckets[count]
+        del bucket[key]
+        if bucket:
+            return
+        del self._buckets[count]
+        prev, following = self._prev.pop(count), self._next.pop(count)
+        if prev is None:
+            self._min = following
+        else:
+            self._next[prev] = following
+        if following is not None:
+            self._prev[following] = prev
+
+    def add(self, key: Hashable, label: Optional[str] = None) -> None:
+        self.total += 1
+        slot = self._counts.get(key)
+        if slot is not None:
+            # The next bucket is linked before the old one can disappear
+            self._attach(key, slot[0] + 1, slot[0])
+            self._detach(key, slot[0])
+            slot[0] += 1
+            return
+
+        if len(self._counts) < self.capacity:
+            self._counts[key] = [1, 0, label]
+            self._attach(key, 1, None)
+            return
+
+        # Replace the oldest key of the minimum count; its count becomes the new key's error bound
+        min_count = self._min
+        min_key = next(iter(self._buckets[min_count]))
+        del self._counts[min_key]
+        self._counts[key] = [min_count + 1, min_count, label]
+        self._attach(key, min_count + 1, min_count)
+        self._detach(min_key, min_count)
+
+    def top(self, n: int = 10) -> List[dict]:
+        ranked = sorted(self._counts.items(), key=lambda item: item[1][0], reverse=True)[:n]
+        return [
+            {"key": key, "question": label, "count": count, "max_overcount": error}
+            for key, (count, error, label) in ranked
+        ]
+
+    def clear(self) -> None:
+        self._counts.clear()
+        self._buckets.clear()
+        self._next.clear()
+        self._prev.clear()
+        self._min = None
+        self.total = 0
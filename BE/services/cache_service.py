@@ -3,36 +3,74 @@ Cache service for persistent storage of AI model responses
 Handles file-based caching with automatic persistence and memory management
 """
 
+import os
 import json
+import time
 import atexit
 import hashlib
 import logging
 import asyncio
+import tempfile
+import threading
+import traceback
 from pathlib import Path
-from typing import Dict, Optional, List
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, Optional, List, Tuple
 from concurrent.futures import ThreadPoolExecutor
 
+from config import settings
 from schemas.responses import ModelResponse
+from services.cache_storage import CompactEntry, resolve_compression
+from services.cache_metrics import ModelCacheCounters, SpaceSaving
+from services.inflight import inflight_requests
 
 logger = logging.getLogger(__name__)
 
 # Cache configuration
 CACHE_SIZE = 10000  # Number of cached responses per model
 CACHE_DIR = Path("cache")  # Directory to store cache files
+NEGATIVE_CACHE_SIZE = 1000  # Failed lookups remembered per model
+
+# Accepted types of the provenance fields in imported records
+IMPORT_METADATA_TYPES = {
+    "created_at": (int, float),
+    "prompt_hash": str,
+    "model_id": str,
+    "latency_ms": int,
+    "variant": str,
+}
 
 
 class CacheManager:
     """Manages persistent caches for AI model responses with background saving"""
     
-    def __init__(self, cache_size: int = CACHE_SIZE, cache_dir: Path = CACHE_DIR):
+    def __init__(self, cache_size: int = CACHE_SIZE, cache_dir: Path = CACHE_DIR,
+                 compression: str = settings.cache_compression,
+                 save_interval: float = settings.cache_save_interval,
+                 ttl_seconds: float = settings.cache_ttl_seconds,
+                 negative_ttl_seconds: float = settings.cache_negative_ttl_seconds):
         self.cache_size = cache_size
         self.cache_dir = cache_dir
+        self.save_interval = save_interval
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        
+        # Codec used for entries that have not been touched since they were loaded
+        self.compression = resolve_compression(compression)
         
         # Thread pool for background operations
         self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-worker")
         
-        # Track pending saves to avoid duplicate operations
-        self._pending_saves = set()
+        # Group commit state: models with unsaved changes and the task that flushes them
+        self._dirty = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        
+        # Serializes the rename step so concurrent writers cannot interleave backups
+        self._save_lock = threading.Lock()
+        
+        # Bumped by every clear; a save of a snapshot taken before the clear is discarded
+        self._generation = 0
         
         # Ensure cache directory exists
         self.cache_dir.mkdir(exist_ok=True)
@@ -51,124 +89,256 @@ class CacheManager:
             "xai": {}
         }
         
-        # Load existing caches from disk
-        self._load_all_caches()
+        # Short-lived memory of failed requests (not persisted): key -> (expires_at, response)
+        self._negative: Dict[str, Dict[str, Tuple[float, ModelResponse]]] = {
+            model_name: {} for model_name in self._caches
+        }
+        
+        # Prompt hashes the running code produces, used for selective invalidation
+        self._current_prompt_hashes: Dict[str, set] = {
+            model_name: set() for model_name in self._caches
+        }
+        
+        # Instrumentation: per-model counters and the most-asked questions
+        self.counters = {model_name: ModelCacheCounters() for model_name in self._caches}
+        self.hot_questions = SpaceSaving(settings.cache_hot_keys)
+        self.load_seconds: Optional[float] = None
+        self._file_to_model = {cache_file: name for name, cache_file in self.cache_files.items()}
+        
+        # Existing caches are loaded on first use, or in the background by the app lifespan
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._load_future: Optional[asyncio.Future] = None
         
         # Note: atexit registration is done globally, not per instance
     
-    def _serialize_model_response(self, response: ModelResponse) -> dict:
-        """Convert ModelResponse to dictionary for JSON serialization"""
-        return {
-            "model": response.model,
-            "answer": response.answer,
-            "confidence": response.confidence,
-            "raw": response.raw,
-            "reasoning": response.reasoning,
-            "error": getattr(response, 'error', False)
-        }
+    def _serialize_model_response(self, entry: CompactEntry) -> dict:
+        """Convert a cache entry to dictionary for JSON serialization"""
+        return entry.to_dict()
     
-    def _deserialize_model_response(self, data: dict) -> ModelResponse:
-        """Convert dictionary back to ModelResponse"""
-        return ModelResponse(
-            model=data["model"],
-            answer=data["answer"],
-            confidence=data["confidence"],
-            raw=data["raw"],
-            reasoning=data.get("reasoning"),
-            error=data.get("error", False)
-        )
+    def _deserialize_model_response(self, data: dict) -> CompactEntry:
+        """Convert dictionary back to a compact cache entry"""
+        return CompactEntry.from_dict(data)
+    
+    @staticmethod
+    def _backup_path(cache_file: Path) -> Path:
+        """Previous good version of a cache file, kept for crash recovery"""
+        return cache_file.with_name(cache_file.name + ".bak")
     
-    def _load_cache_from_file(self, cache_file: Path) -> Dict[str, ModelResponse]:
-        """Load cache from JSON file"""
-        if not cache_file.exists():
+    def _read_cache_file(self, cache_file: Path) -> Dict[str, CompactEntry]:
+        """Parse a cache file into compact entries (raises on damaged files)"""
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        # Convert dicts to compact entries; freshly loaded entries are cold until first hit
+        cache = {}
+        for key, response_data in data.items():
+            entry = self._deserialize_model_response(response_data)
+            entry.compress(self.compression)
+            cache[key] = entry
+        return cache
+    
+    def _quarantine_cache_file(self, cache_file: Path) -> None:
+        """Move a damaged cache file aside so the next save cannot overwrite the evidence"""
+        corrupt_file = cache_file.with_name(f"{cache_file.name}.corrupt-{int(time.time())}")
+        try:
+            os.replace(cache_file, corrupt_file)
+            logger.warning(f"Moved damaged cache file to {corrupt_file}")
+        except OSError as e:
+            logger.error(f"Could not quarantine damaged cache file {cache_file}: {e}")
+    
+    def _load_cache_from_file(self, cache_file: Path) -> Dict[str, CompactEntry]:
+        """Load cache from JSON file, falling back to the backup copy when it is missing or damaged"""
+        backup_file = self._backup_path(cache_file)
+        if not cache_file.exists() and not backup_file.exists():
             logger.info(f"Cache file {cache_file} does not exist, starting with empty cache")
             return {}
         
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Convert dict back to ModelResponse objects
-            cache = {}
-            for key, response_data in data.items():
-                cache[key] = self._deserialize_model_response(response_data)
+        for candidate in (cache_file, backup_file):
+            if not candidate.exists():
+                continue
+            try:
+                cache = self._read_cache_file(candidate)
+            except Exception as e:
+                logger.error(f"Error loading cache from {candidate}: {e}")
+                if candidate == cache_file:
+                    self._quarantine_cache_file(cache_file)
+                continue
             
-            logger.info(f"Loaded {len(cache)} cached responses from {cache_file}")
+            if candidate == backup_file:
+                logger.warning(f"♻️  Recovered {len(cache)} cached responses from backup {backup_file}")
+            else:
+                logger.info(f"Loaded {len(cache)} cached responses from {cache_file}")
             return cache
         
-        except Exception as e:
-            logger.error(f"Error loading cache from {cache_file}: {e}")
-            return {}
+        logger.error(f"No readable copy of {cache_file}, starting with empty cache")
+        return {}
     
-    def _save_cache_to_file(self, cache: Dict[str, ModelResponse], cache_file: Path) -> None:
-        """Save cache to JSON file (synchronous)"""
+    def _save_cache_to_file(self, cache: Dict[str, CompactEntry], cache_file: Path,
+                            generation: Optional[int] = None) -> bool:
+        """
+        Atomically save cache to JSON file (synchronous)
+        
+        The data is written and fsynced to a temp file in the same directory, the current
+        file is kept as a .bak copy and the temp file is renamed into place, so a crash at
+        any point leaves either the old or the new file intact. When the caches were cleared
+        after the snapshot was taken (generation differs), the write is dropped.
+        """
+        tmp_path = None
+        started = time.perf_counter()
+        counters = self.counters.get(self._file_to_model.get(cache_file))
         try:
-            # Convert ModelResponse objects to dictionaries
+            # Convert cache entries to dictionaries
             data = {}
-            for key, response in cache.items():
-                data[key] = self._serialize_model_response(response)
+            for key, entry in cache.items():
+                data[key] = self._serialize_model_response(entry)
             
-            with open(cache_file, 'w', encoding='utf-8') as f:
+            fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, prefix=f".{cache_file.name}.", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            with self._save_lock:
+                if generation is not None and generation != self._generation:
+                    logger.info(f"Discarded save of {cache_file}: caches were cleared after the snapshot")
+                    return True
+                if cache_file.exists():
+                    os.replace(cache_file, self._backup_path(cache_file))
+                os.replace(tmp_path, cache_file)
+                tmp_path = None
+                _fsync_directory(cache_file.parent)
             
+            if counters is not None:
+                counters.record_save(time.perf_counter() - started, time.time(), ok=True)
             logger.debug(f"Saved {len(cache)} cached responses to {cache_file}")
+            return True
         
         except Exception as e:
+            if counters is not None:
+                counters.record_save(time.perf_counter() - started, time.time(), ok=False)
             logger.error(f"Error saving cache to {cache_file}: {e}")
-    
-    def _save_cache_to_file_background(self, model_name: str) -> None:
-        """Background thread function to save specific model cache"""
-        try:
-            cache = self._caches[model_name].copy()  # Copy to avoid threading issues
-            cache_file = self.cache_files[model_name]
-            self._save_cache_to_file(cache, cache_file)
-            logger.debug(f"Background save completed for {model_name} cache")
-        except Exception as e:
-            logger.error(f"Background save failed for {model_name}: {e}")
+            return False
+        
         finally:
-            # Remove from pending saves
-            self._pending_saves.discard(model_name)
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
     
-    async def _save_cache_async(self, model_name: str) -> None:
-        """Asynchronously save cache for specific model in background"""
-        if model_name in self._pending_saves:
-            logger.debug(f"Save already pending for {model_name}, skipping duplicate")
-            return
+    def _mark_dirty(self, model_name: str) -> None:
+        """Record unsaved changes and make sure a group-commit flush is scheduled"""
+        self._dirty.add(model_name)
         
-        if model_name not in self._caches:
-            logger.warning(f"Unknown model name for async save: {model_name}")
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop running (scripts, shutdown), fall back to synchronous save
+            logger.debug(f"No event loop running, falling back to synchronous save for {model_name}")
+            self._flush_dirty_now()
             return
         
-        self._pending_saves.add(model_name)
-        
-        # Run the save operation in background thread
-        loop = asyncio.get_event_loop()
-        try:
-            await loop.run_in_executor(
-                self.executor, 
-                self._save_cache_to_file_background, 
-                model_name
-            )
-        except Exception as e:
-            logger.error(f"Async save error for {model_name}: {e}")
-            self._pending_saves.discard(model_name)
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._flush_task = loop.create_task(self._flush_loop())
+            logger.debug(f"Scheduled group-commit save for {model_name} cache")
+    
+    async def _flush_loop(self) -> None:
+        """Coalesce bursts of inserts into one atomic write (and fsync) per model per interval"""
+        loop = asyncio.get_running_loop()
+        while self._dirty:
+            await asyncio.sleep(self.save_interval)
+            
+            dirty, self._dirty = self._dirty, set()
+            for model_name in dirty:
+                # Snapshot on the loop thread so the worker never sees a dict being mutated
+                snapshot = dict(self._caches[model_name])
+                try:
+                    saved = await loop.run_in_executor(
+                        self.executor,
+                        self._save_cache_to_file,
+                        snapshot,
+                        self.cache_files[model_name],
+                        self._generation
+                    )
+                except Exception as e:
+                    logger.error(f"Async save error for {model_name}: {e}")
+                    saved = False
+                
+                if not saved:
+                    # Keep the model dirty so the next interval retries the write
+                    self._dirty.add(model_name)
+                else:
+                    logger.debug(f"Group-commit save completed for {model_name} cache")
+    
+    def _flush_dirty_now(self) -> None:
+        """Synchronously save every model with unsaved changes"""
+        dirty, self._dirty = self._dirty, set()
+        for model_name in dirty:
+            if not self._save_cache_to_file(dict(self._caches[model_name]), self.cache_files[model_name]):
+                self._dirty.add(model_name)
     
     def _load_all_caches(self) -> None:
         """Load all caches from disk on startup"""
         logger.info("Loading persistent caches from disk...")
         
+        # Remove temp files left behind by writes that were interrupted by a crash
+        for stale_tmp in self.cache_dir.glob(".*.tmp"):
+            try:
+                stale_tmp.unlink()
+                logger.info(f"Removed incomplete cache write {stale_tmp}")
+            except OSError as e:
+                logger.warning(f"Could not remove incomplete cache write {stale_tmp}: {e}")
+        
+        load_started = time.perf_counter()
         for model_name, cache_file in self.cache_files.items():
-            self._caches[model_name] = self._load_cache_from_file(cache_file)
+            started = time.perf_counter()
+            loaded = self._load_cache_from_file(cache_file)
+            # Anything inserted while the file was being read is newer than the file
+            loaded.update(self._caches[model_name])
+            self._caches[model_name] = loaded
+            self.counters[model_name].load_seconds = round(time.perf_counter() - started, 4)
+        self.load_seconds = round(time.perf_counter() - load_started, 4)
         
         total_cached = sum(len(cache) for cache in self._caches.values())
-        logger.info(f"Loaded {total_cached} total cached responses from disk")
+        logger.info(f"Loaded {total_cached} total cached responses from disk in {self.load_seconds:.3f}s")
+    
+    @property
+    def loaded(self) -> bool:
+        return self._loaded.is_set()
+    
+    def ensure_loaded(self) -> None:
+        """Load the cache files now if that has not happened yet (blocks while a background load runs)"""
+        if self._loaded.is_set():
+            return
+        with self._load_lock:
+            if not self._loaded.is_set():
+                self._load_all_caches()
+                self._loaded.set()
+    
+    def start_background_load(self) -> "asyncio.Future":
+        """Load the cache files in the worker pool; returns a future that completes when loaded"""
+        loop = asyncio.get_running_loop()
+        if self._load_future is None or self._load_future.get_loop() is not loop:
+            self._load_future = loop.run_in_executor(self.executor, self.ensure_loaded)
+        return self._load_future
+    
+    async def wait_until_loaded(self) -> None:
+        if not self._loaded.is_set():
+            await asyncio.shield(self.start_background_load())
     
     def _save_all_caches(self) -> None:
         """Save all caches to disk"""
+        if not self._loaded.is_set():
+            # Nothing can have changed, and saving now would overwrite the files with empty caches
+            return
         logger.info("Saving persistent caches to disk...")
         
+        self._dirty.clear()
         for model_name, cache in self._caches.items():
-            self._save_cache_to_file(cache, self.cache_files[model_name])
+            if not self._save_cache_to_file(dict(cache), self.cache_files[model_name]):
+                self._dirty.add(model_name)
         
         total_cached = sum(len(cache) for cache in self._caches.values())
         logger.info(f"Saved {total_cached} total cached responses to disk")
@@ -179,52 +349,268 @@ class CacheManager:
         return hashlib.md5(content.encode()).hexdigest()
     
     def get_from_cache(self, model_name: str, cache_key: str) -> Optional[ModelResponse]:
-        """Get response from specific model cache"""
+        """
+        Get response from specific model cache
+        
+        Expired entries are dropped lazily. A recent failure for the same key is returned
+        as its error response (error=True) so retries do not hammer a failing provider.
+        """
+        self.ensure_loaded()
         if model_name not in self._caches:
             logger.warning(f"Unknown model name: {model_name}")
             return None
-        return self._caches[model_name].get(cache_key)
+        
+        now = time.time()
+        counters = self.counters[model_name]
+        cache = self._caches[model_name]
+        entry = cache.get(cache_key)
+        if entry is not None:
+            if not entry.is_expired(self.ttl_seconds, now):
+                counters.hits += 1
+                return entry.to_model_response()
+            del cache[cache_key]
+            counters.expirations += 1
+            self._mark_dirty(model_name)
+            logger.debug(f"Expired {model_name} cache entry {cache_key}")
+        
+        negative = self._negative[model_name].get(cache_key)
+        if negative is not None:
+            expires_at, error_response = negative
+            if now < expires_at:
+                counters.negative_hits += 1
+                return error_response
+            del self._negative[model_name][cache_key]
+        counters.misses += 1
+        return None
+    
+    def peek(self, model_name: str, cache_key: str) -> Optional[ModelResponse]:
+        """Look up a stored answer without touching hit/miss counters or the negative cache"""
+        self.ensure_loaded()
+        entry = self._caches.get(model_name, {}).get(cache_key)
+        if entry is None or entry.is_expired(self.ttl_seconds, time.time()):
+            return None
+        return entry.to_model_response()
+    
+    def created_at(self, model_name: str, cache_key: str) -> Optional[float]:
+        """When a stored answer was created (None when missing or stored before provenance tracking)"""
+        entry = self._caches.get(model_name, {}).get(cache_key)
+        return entry.created_at if entry is not None else None
     
-    def add_to_cache(self, model_name: str, cache_key: str, response: ModelResponse) -> None:
-        """Add response to specific model cache with size limit and background auto-save"""
+    def add_to_cache(self, model_name: str, cache_key: str, response: ModelResponse,
+                     prompt_hash: Optional[str] = None, model_id: Optional[str] = None,
+                     latency_ms: Optional[int] = None, variant: Optional[str] = None) -> None:
+        """
+        Add response to specific model cache with size limit and background auto-save
+        
+        Error fallbacks (response.error) only go to the short-lived negative cache.
+        """
+        self.ensure_loaded()
         if model_name not in self._caches:
             logger.warning(f"Unknown model name: {model_name}")
             return
         
+        if response.error:
+            self._add_negative(model_name, cache_key, response)
+            return
+        
+        self._insert(model_name, cache_key, response, time.time(), prompt_hash, model_id, latency_ms, variant)
+        
+        # Schedule group-commit save (non-blocking)
+        self._mark_dirty(model_name)
+    
+    def add_many(self, model_name: str, items: Iterable[Tuple[str, ModelResponse, dict]]) -> int:
+        """
+        Bulk-insert (cache_key, response, metadata) tuples with a single scheduled save
+        
+        metadata holds the optional prompt_hash / model_id / latency_ms / variant provenance fields.
+        Error responses are skipped. Returns the number of entries inserted.
+        """
+        self.ensure_loaded()
+        if model_name not in self._caches:
+            raise ValueError(f"Unknown model name: {model_name}")
+        
+        now = time.time()
+        inserted = 0
+        for cache_key, response, metadata in items:
+            if response.error:
+                continue
+            self._insert(model_name, cache_key, response, now, **metadata)
+            inserted += 1
+        
+        if inserted:
+            self._mark_dirty(model_name)
+        return inserted
+    
+    def _insert(self, model_name: str, cache_key: str, response: ModelResponse, created_at: float,
+                prompt_hash: Optional[str] = None, model_id: Optional[str] = None,
+                latency_ms: Optional[int] = None, variant: Optional[str] = None) -> None:
         cache = self._caches[model_name]
         
         # Implement FIFO eviction if cache is full
-        if len(cache) >= self.cache_size:
+        if cache_key not in cache and len(cache) >= self.cache_size:
             # Remove oldest entry
             oldest_key = next(iter(cache))
             del cache[oldest_key]
+            self.counters[model_name].evictions += 1
+        
+        # Add new response in compact form with provenance metadata
+        cache[cache_key] = CompactEntry.from_model_response(
+            response,
+            created_at=created_at,
+            prompt_hash=prompt_hash,
+            model_id=model_id,
+            latency_ms=latency_ms,
+            variant=variant
+        )
+        self._negative[model_name].pop(cache_key, None)
+        self.counters[model_name].inserts += 1
+    
+    def _add_negative(self, model_name: str, cache_key: str, response: ModelResponse) -> None:
+        """Remember a failed request for negative_ttl_seconds"""
+        if not self.negative_ttl_seconds:
+            return
         
-        # Add new response
-        cache[cache_key] = response
+        negative = self._negative[model_name]
+        now = time.time()
+        if len(negative) >= NEGATIVE_CACHE_SIZE:
+            for key in [k for k, (expires_at, _) in negative.items() if expires_at <= now]:
+                del negative[key]
+            if len(negative) >= NEGATIVE_CACHE_SIZE:
+                del negative[next(iter(negative))]
         
-        # Schedule background save (non-blocking)
-        try:
-            # Check if we're in an async context and can create tasks
-            try:
-                asyncio.get_running_loop()
-                # We're in an async context, create task for background save
-                asyncio.create_task(self._save_cache_async(model_name))
-                logger.debug(f"Scheduled background save for {model_name} cache")
-            except RuntimeError:
-                # No event loop running, fall back to synchronous save
-                logger.debug(f"No event loop running, falling back to synchronous save for {model_name}")
-                self._save_cache_to_file(cache, self.cache_files[model_name])
-        except Exception as e:
-            logger.error(f"Error scheduling background save for {model_name}: {e}")
-            # Fallback to synchronous save if async fails
-            try:
-                self._save_cache_to_file(cache, self.cache_files[model_name])
-                logger.debug(f"Fallback synchronous save completed for {model_name}")
-            except Exception as fallback_error:
-                logger.error(f"Fallback save also failed for {model_name}: {fallback_error}")
+        negative[cache_key] = (now + self.negative_ttl_seconds, response)
+        logger.debug(f"Negative-cached {model_name} failure for {self.negative_ttl_seconds}s")
     
-    def get_cache_stats(self) -> Dict[str, int]:
+    def iter_entries(self, model_name: Optional[str] = None) -> Iterator[dict]:
+        """
+        Yield cache entries one at a time as export records ({"cache", "key", ...entry fields})
+        
+        Only the key list is snapshotted, so entries are serialized lazily and entries removed
+        while the export is running are skipped.
+        """
+        self.ensure_loaded()
+        names = [model_name] if model_name else list(self._caches)
+        for name in names:
+            if name not in self._caches:
+                raise ValueError(f"Unknown model name: {name}")
+            cache = self._caches[name]
+            for key in list(cache):
+                entry = cache.get(key)
+                if entry is None:
+                    continue
+                record = {"cache": name, "key": key}
+                record.update(self._serialize_model_response(entry))
+                yield record
+    
+    def import_entry(self, record: dict, overwrite: bool = False) -> bool:
+        """
+        Insert one export record into the matching cache
+        
+        Returns False when the key already exists and overwrite is off; raises ValueError
+        (pydantic's ValidationError included) or KeyError for missing fields on malformed records.
+        """
+        self.ensure_loaded()
+        if not isinstance(record, dict):
+            raise ValueError(f"Import record must be an object, got {type(record).__name__}")
+        model_name = record.get("cache")
+        if model_name not in self._caches:
+            raise ValueError(f"Unknown model name: {model_name}")
+        
+        cache = self._caches[model_name]
+        key = record["key"]
+        if not isinstance(key, str):
+            raise ValueError(f"Import record key must be a string, got {type(key).__name__}")
+        if key in cache and not overwrite:
+            return False
+        
+        entry = self._validate_import_record(record)
+        if key not in cache and len(cache) >= self.cache_size:
+            del cache[next(iter(cache))]
+            self.counters[model_name].evictions += 1
+        cache[key] = entry
+        self.counters[model_name].inserts += 1
+        self._mark_dirty(model_name)
+        return True
+    
+    @staticmethod
+    def _validate_import_record(record: dict) -> CompactEntry:
+        """Check an import record the way a fresh answer is checked, so a bad line fails here and not on /ask"""
+        raw = record["raw"]
+        reasoning = record.get("reasoning")
+        span = record.get("reasoning_span")
+        if span is not None:
+            if (not isinstance(raw, str) or not isinstance(span, list) or len(span) != 2
+                    or not all(type(i) is int for i in span) or not 0 <= span[0] <= span[1] <= len(raw)):
+                raise ValueError(f"Invalid reasoning_span: {span!r}")
+            reasoning = raw[span[0]:span[1]]
+        
+        response = ModelResponse(
+            model=record["model"],
+            answer=record["answer"],
+            confidence=record["confidence"],
+            raw=raw,
+            reasoning=reasoning,
+            error=record.get("error", False)
+        )
+        if response.error:
+            raise ValueError("Error fallbacks are not cached")
+        
+        metadata = {}
+        for field, types in IMPORT_METADATA_TYPES.items():
+            value = record.get(field)
+            # bool is an int subclass but never a valid timestamp or latency
+            if value is not None and (isinstance(value, bool) or not isinstance(value, types)):
+                raise ValueError(f"Invalid {field}: {value!r}")
+            metadata[field] = value
+        return CompactEntry.from_model_response(response, **metadata)
+    
+    def register_prompt_version(self, model_name: str, prompt_hash: str) -> None:
+        """Record a prompt hash produced by the running code for this model cache"""
+        if model_name in self._current_prompt_hashes:
+            self._current_prompt_hashes[model_name].add(prompt_hash)
+    
+    def invalidate(self, model_name: Optional[str] = None, prompt_hash: Optional[str] = None,
+                   stale_prompts: bool = False, older_than: Optional[float] = None) -> Dict[str, int]:
+        """
+        Selectively remove cache entries
+        
+        - prompt_hash: drop entries produced by this prompt version
+        - stale_prompts: drop entries whose prompt version is unknown or no longer current
+        - older_than: drop entries created more than this many seconds ago
+        Criteria are combined with OR; model_name limits the scope to one cache.
+        """
+        self.ensure_loaded()
+        if model_name is not None and model_name not in self._caches:
+            raise ValueError(f"Unknown model name: {model_name}")
+        
+        cutoff = time.time() - older_than if older_than is not None else None
+        removed = {}
+        for name in ([model_name] if model_name else list(self._caches)):
+            cache = self._caches[name]
+            current = self._current_prompt_hashes[name]
+            doomed = [
+                key for key, entry in cache.items()
+                if (prompt_hash is not None and entry.prompt_hash == prompt_hash)
+                or (stale_prompts and entry.prompt_hash not in current)
+                or (cutoff is not None and entry.created_at is not None and entry.created_at < cutoff)
+            ]
+            for key in doomed:
+                del cache[key]
+            self._negative[name].clear()
+            removed[name] = len(doomed)
+            if doomed:
+                self._mark_dirty(name)
+        
+        logger.info(f"Invalidated cache entries: {removed}")
+        return removed
+    
+    def record_question(self, cache_key: str, question: str) -> None:
+        """Count a question for the most-asked tracking (O(1), see SpaceSaving)"""
+        self.hot_questions.add(cache_key, question[:120])
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics for monitoring"""
+        self.ensure_loaded()
         stats = {}
         total_cached = 0
         
@@ -233,32 +619,68 @@ class CacheManager:
             stats[f"{model_name}_cache_size"] = cache_size
             total_cached += cache_size
         
+        models = {}
+        for model_name, counters in self.counters.items():
+            model_stats = counters.to_dict()
+            model_stats["size"] = len(self._caches[model_name])
+            model_stats["coalesced_waits"] = inflight_requests.coalesced_waits.get(model_name, 0)
+            models[model_name] = model_stats
+        
+        save_times = [c.last_save_at for c in self.counters.values() if c.last_save_at is not None]
+        
         stats.update({
             "total_cached_responses": total_cached,
-            "cache_size_limit": self.cache_size
+            "cache_size_limit": self.cache_size,
+            "models": models,
+            "hot_questions": self.hot_questions.top(10),
+            "questions_seen": self.hot_questions.total,
+            "load_seconds": self.load_seconds,
+            "last_save_at": max(save_times) if save_times else None,
+            "dirty_models": sorted(self._dirty)
         })
         
         return stats
     
     def clear_all_caches(self) -> None:
         """Clear all model caches and remove cache files"""
-        # Log who is calling this method for debugging
-        import traceback
-        logger.warning("🚨 CLEAR_ALL_CACHES CALLED! Stack trace:")
-        for line in traceback.format_stack():
-            logger.warning(f"   {line.strip()}")
+        caller_stack = self._clear_memory()
+        self._remove_cache_files(caller_stack)
+    
+    async def clear_all_caches_async(self) -> None:
+        """Clear caches on the loop; log the caller and remove files in the worker pool"""
+        caller_stack = self._clear_memory()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._remove_cache_files, caller_stack)
+    
+    def _clear_memory(self) -> traceback.StackSummary:
+        self.ensure_loaded()
+        # Capture who is calling without touching source files; lines are looked up when logging
+        caller_stack = traceback.StackSummary.extract(traceback.walk_stack(None), lookup_lines=False)
+        caller_stack.reverse()
         
         for model_name in self._caches:
             self._caches[model_name].clear()
+            self._negative[model_name].clear()
+        self._dirty.clear()
+        # Writes of snapshots taken before this point must not bring the cleared files back
+        self._generation += 1
+        return caller_stack
+    
+    def _remove_cache_files(self, caller_stack: traceback.StackSummary) -> None:
+        # Log who is calling this method for debugging
+        logger.warning("🚨 CLEAR_ALL_CACHES CALLED! Stack trace:")
+        for line in caller_stack.format():
+            logger.warning(f"   {line.strip()}")
         
-        # Also remove cache files
-        for cache_file in self.cache_files.values():
-            try:
-                if cache_file.exists():
-                    cache_file.unlink()
-                    logger.warning(f"🗑️  Removed cache file: {cache_file}")
-            except Exception as e:
-                logger.error(f"Error removing cache file {cache_file}: {e}")
+        # Also remove cache files and their backups (under the save lock, so no rename lands in between)
+        with self._save_lock:
+            for cache_file in self.cache_files.values():
+                for path in (cache_file, self._backup_path(cache_file)):
+                    try:
+                        if path.exists():
+                            path.unlink()
+                            logger.warning(f"🗑️  Removed cache file: {path}")
+                    except Exception as e:
+                        logger.error(f"Error removing cache file {path}: {e}")
         
         logger.warning("🚨 All model caches cleared and cache files removed")
     
@@ -266,6 +688,26 @@ class CacheManager:
         """Manually trigger cache save (useful for periodic saves)"""
         self._save_all_caches()
     
+    async def save_caches_async(self) -> Dict[str, bool]:
+        """Save every cache from the worker pool; only the snapshot copies run on the loop"""
+        await self.wait_until_loaded()
+        loop = asyncio.get_running_loop()
+        results = {}
+        for model_name, cache in self._caches.items():
+            snapshot = dict(cache)
+            try:
+                results[model_name] = await loop.run_in_executor(
+                    self.executor, self._save_cache_to_file, snapshot, self.cache_files[model_name], self._generation
+                )
+            except Exception as e:
+                logger.error(f"Async save error for {model_name}: {e}")
+                results[model_name] = False
+            if not results[model_name]:
+                # Let the group-commit flusher retry the write
+                self._mark_dirty(model_name)
+        logger.info(f"Saved {sum(len(cache) for cache in self._caches.values())} total cached responses to disk")
+        return results
+    
     def shutdown(self) -> None:
         """Graceful shutdown - save all caches and cleanup resources"""
         logger.info("Cache manager shutting down...")
@@ -277,40 +719,95 @@ class CacheManager:
         
         self._shutdown_called = True
         
-        # Wait for any pending background saves to complete
-        if self._pending_saves:
-            logger.info(f"Waiting for {len(self._pending_saves)} pending saves to complete...")
-            # Give background saves time to finish
-            import time
-            max_wait = 2.0  # Maximum 2 seconds
-            waited = 0.0
-            while self._pending_saves and waited < max_wait:
-                time.sleep(0.1)
-                waited += 0.1
-            
-            if self._pending_saves:
-                logger.warning(f"Timeout waiting for {len(self._pending_saves)} pending saves: {self._pending_saves}")
-        
-        # Save all caches synchronously before shutdown
-        logger.info("Saving all caches before shutdown...")
-        self._save_all_caches()
+        # Stop the group-commit flusher; the final save below covers anything it had pending
+        if self._flush_task is not None and not self._flush_task.done():
+            try:
+                self._flush_task.cancel()
+            except RuntimeError:
+                # Owning event loop already closed
+                pass
         
-        # Shutdown the thread pool
+        # Wait for in-flight background writes so they cannot land after the final save
         if hasattr(self, 'executor') and self.executor:
             logger.info("Shutting down thread pool...")
             self.executor.shutdown(wait=True)
             logger.info("Thread pool shutdown complete")
         
+        # Save all caches synchronously before shutdown
+        logger.info("Saving all caches before shutdown...")
+        self._save_all_caches()
+        
         logger.info("✅ Cache manager shutdown complete - files preserved")
     
-    def get_cache_for_model(self, model_name: str) -> Dict[str, ModelResponse]:
-        """Get the entire cache dictionary for a specific model (for internal use)"""
+    def get_cache_for_model(self, model_name: str) -> Dict[str, CompactEntry]:
+        """Get the entire cache dictionary of compact entries for a specific model (for internal use)"""
+        self.ensure_loaded()
         if model_name not in self._caches:
             logger.warning(f"Unknown model name: {model_name}")
             return {}
         return self._caches[model_name]
 
 
+def _fsync_directory(directory: Path) -> None:
+    """Flush a directory entry so a completed rename survives power loss (POSIX only)"""
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class CapturedWrites:
+    """
+    Cache writes held back from a provider fetch until the caller decides whether to keep them
+
+    Writes made after apply() go straight to the cache (e.g. a streamed answer's full text
+    arriving later); writes after drop() are discarded.
+    """
+
+    def __init__(self):
+        self.pending: List[tuple] = []
+        self.decision: Optional[bool] = None
+
+    def write(self, args: tuple) -> None:
+        if self.decision is None:
+            self.pending.append(args)
+        elif self.decision:
+            cache_manager.add_to_cache(*args)
+
+    def apply(self) -> None:
+        self.decision = True
+        pending, self.pending = self.pending, []
+        for args in pending:
+            cache_manager.add_to_cache(*args)
+
+    def drop(self) -> None:
+        self.decision = False
+        self.pending = []
+
+
+# Set while writes are being captured; copied into tasks the fetch starts (in-flight calls, streams)
+_captured_writes: ContextVar[Optional[CapturedWrites]] = ContextVar("captured_cache_writes", default=None)
+
+
+@contextmanager
+def capture_cache_writes() -> Iterator[CapturedWrites]:
+    """Hold back add_to_cache calls made in this context (and tasks started from it)"""
+    captured = CapturedWrites()
+    token = _captured_writes.set(captured)
+    try:
+        yield captured
+    finally:
+        _captured_writes.reset(token)
+
+
 # Global cache manager instance
 cache_manager = CacheManager()
 
@@ -322,15 +819,59 @@ def create_cache_key(question: str, options: List[str]) -> str:
     """Create a cache key for question+options combination"""
     return cache_manager.create_cache_key(question, options)
 
+def create_prompt_hash(*prompt_parts: str) -> str:
+    """Short stable hash identifying a prompt version (system text + template)"""
+    return hashlib.sha256("\x00".join(prompt_parts).encode()).hexdigest()[:12]
+
 def get_from_cache(model_name: str, cache_key: str) -> Optional[ModelResponse]:
     """Get response from specific model cache"""
     return cache_manager.get_from_cache(model_name, cache_key)
 
-def add_to_cache(model_name: str, cache_key: str, response: ModelResponse) -> None:
+def peek_cache(model_name: str, cache_key: str) -> Optional[ModelResponse]:
+    """Look up a stored answer without affecting cache statistics"""
+    return cache_manager.peek(model_name, cache_key)
+
+def cache_entry_created_at(model_name: str, cache_key: str) -> Optional[float]:
+    """Creation time of a stored answer"""
+    return cache_manager.created_at(model_name, cache_key)
+
+def add_to_cache(model_name: str, cache_key: str, response: ModelResponse,
+                 prompt_hash: Optional[str] = None, model_id: Optional[str] = None,
+                 latency_ms: Optional[int] = None, variant: Optional[str] = None) -> None:
     """Add response to specific model cache with size limit and auto-save"""
-    cache_manager.add_to_cache(model_name, cache_key, response)
+    args = (model_name, cache_key, response, prompt_hash, model_id, latency_ms, variant)
+    captured = _captured_writes.get()
+    if captured is not None:
+        captured.write(args)
+        return
+    cache_manager.add_to_cache(*args)
+
+def add_many_to_cache(model_name: str, items: Iterable[Tuple[str, ModelResponse, dict]]) -> int:
+    """Bulk-insert (cache_key, response, metadata) tuples with a single scheduled save"""
+    return cache_manager.add_many(model_name, items)
 
-def get_cache_stats() -> Dict[str, int]:
+def export_cache_entries(model_name: Optional[str] = None) -> Iterator[dict]:
+    """Yield cache entries one at a time as export records"""
+    return cache_manager.iter_entries(model_name)
+
+def import_cache_entry(record: dict, overwrite: bool = False) -> bool:
+    """Insert one export record into the matching cache"""
+    return cache_manager.import_entry(record, overwrite)
+
+def register_prompt_version(model_name: str, prompt_hash: str) -> None:
+    """Record a prompt hash produced by the running code for this model cache"""
+    cache_manager.register_prompt_version(model_name, prompt_hash)
+
+def invalidate_cache(model_name: Optional[str] = None, prompt_hash: Optional[str] = None,
+                     stale_prompts: bool = False, older_than: Optional[float] = None) -> Dict[str, int]:
+    """Selectively remove cache entries by model, prompt version or age"""
+    return cache_manager.invalidate(model_name, prompt_hash, stale_prompts, older_than)
+
+def record_question(cache_key: str, question: str) -> None:
+    """Count a question for the most-asked tracking"""
+    cache_manager.record_question(cache_key, question)
+
+def get_cache_stats() -> Dict[str, Any]:
     """Get cache statistics for monitoring"""
     return cache_manager.get_cache_stats()
 
@@ -341,3 +882,11 @@ def clear_caches() -> None:
 def save_caches_now() -> None:
     """Manually trigger cache save (useful for periodic saves)"""
     cache_manager.save_caches_now()
+
+async def clear_caches_async() -> None:
+    """Clear all model caches; file removal runs off the event loop"""
+    await cache_manager.clear_all_caches_async()
+
+async def save_caches_async() -> Dict[str, bool]:
+    """Save all caches to disk without blocking the event loop"""
+    return await cache_manager.save_caches_async()
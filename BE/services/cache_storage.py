@@ -0,0 +1,213 @@
+"""
+Compact in-memory storage for cached model responses
+Keeps reasoning as a slice into raw, interns model names and optionally compresses cold entries
+"""
+
+import sys
+import zlib
+import logging
+from typing import Optional, Tuple
+
+from schemas.responses import ModelResponse
+
+# Optional zstd support (falls back to zlib when not installed)
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_NONE = "none"
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_ZSTD = "zstd"
+
+# Optional provenance fields persisted alongside each entry
+METADATA_FIELDS = ("created_at", "prompt_hash", "model_id", "latency_ms", "variant")
+
+
+def resolve_compression(name: Optional[str]) -> str:
+    """Normalize the configured compression codec, falling back to zlib when zstd is unavailable"""
+    name = (name or COMPRESSION_NONE).lower()
+    if name == COMPRESSION_ZSTD and zstandard is None:
+        logger.warning("zstandard is not installed, falling back to zlib cache compression")
+        return COMPRESSION_ZLIB
+    if name not in (COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_ZSTD):
+        logger.warning(f"Unknown cache compression '{name}', disabling compression")
+        return COMPRESSION_NONE
+    return name
+
+
+def _compress(text: str, codec: str) -> bytes:
+    data = text.encode("utf-8")
+    if codec == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(blob: bytes, codec: str) -> str:
+    if codec == COMPRESSION_ZSTD:
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def find_reasoning_span(raw: str, reasoning: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Return (start, end) of reasoning inside raw, or None when it is not a substring"""
+    if not reasoning:
+        return None
+    start = raw.rfind(reasoning)
+    if start < 0:
+        return None
+    return start, start + len(reasoning)
+
+
+class CompactEntry:
+    """
+    Memory-efficient representation of a cached ModelResponse.
+
+    - ``reasoning`` is stored as a (start, end) span into ``raw`` whenever it is a substring
+    - model names are interned so thousands of entries share one string object
+    - ``raw`` can be compressed while the entry is cold and is transparently restored on access
+
+    Provenance metadata (creation time, prompt hash, provider model id, latency, request variant)
+    is optional so entries written before it existed still load; missing values are ``None``.
+    """
+
+    __slots__ = (
+        "model", "answer", "confidence", "error", "_raw", "_codec", "_span", "_reasoning",
+        "created_at", "prompt_hash", "model_id", "latency_ms", "variant",
+    )
+
+    def __init__(
+        self,
+        model: str,
+        answer: str,
+        confidence: int,
+        raw: str,
+        reasoning: Optional[str] = None,
+        error: bool = False,
+        span: Optional[Tuple[int, int]] = None,
+        created_at: Optional[float] = None,
+        prompt_hash: Optional[str] = None,
+        model_id: Optional[str] = None,
+        latency_ms: Optional[int] = None,
+        variant: Optional[str] = None,
+    ):
+        self.model = sys.intern(model)
+        self.answer = sys.intern(answer)
+        self.confidence = confidence
+        self.error = error
+        # Plain str while hot, compressed bytes while cold
+        self._raw = raw
+        self._codec = COMPRESSION_NONE
+
+        if span is None:
+            span = find_reasoning_span(raw, reasoning)
+        self._span = span
+        # Only keep a separate reasoning string when it cannot be sliced from raw
+        self._reasoning = None if span is not None else reasoning
+
+        self.created_at = created_at
+        self.prompt_hash = sys.intern(prompt_hash) if prompt_hash else None
+        self.model_id = sys.intern(model_id) if model_id else None
+        self.latency_ms = latency_ms
+        # Request shaping used to produce the answer, e.g. Gemini "easy/128/nosearch"
+        self.variant = sys.intern(variant) if variant else None
+
+    @classmethod
+    def from_model_response(cls, response: ModelResponse, **metadata) -> "CompactEntry":
+        return cls(
+            model=response.model,
+            answer=response.answer,
+            confidence=response.confidence,
+            raw=response.raw,
+            reasoning=response.reasoning,
+            error=response.error,
+            **metadata
+        )
+
+    def is_expired(self, ttl_seconds: float, now: float) -> bool:
+        """Entries without a creation time predate provenance tracking and never expire"""
+        return bool(ttl_seconds) and self.created_at is not None and now - self.created_at > ttl_seconds
+
+    @property
+    def is_compressed(self) -> bool:
+        return isinstance(self._raw, bytes)
+
+    @property
+    def raw(self) -> str:
+        raw = self._raw
+        if isinstance(raw, bytes):
+            # Entry became hot again - keep it decompressed
+            raw = _decompress(raw, self._codec)
+            self._raw = raw
+        return raw
+
+    def peek_raw(self) -> str:
+        """Return raw text without promoting a compressed entry back to hot"""
+        raw = self._raw
+        if isinstance(raw, bytes):
+            return _decompress(raw, self._codec)
+        return raw
+
+    @property
+    def reasoning(self) -> Optional[str]:
+        if self._span is None:
+            return self._reasoning
+        start, end = self._span
+        return self.raw[start:end]
+
+    def compress(self, codec: str) -> None:
+        """Compress raw text in place (no-op when already compressed or codec is 'none')"""
+        raw = self._raw
+        if codec == COMPRESSION_NONE or isinstance(raw, bytes):
+            return
+        blob = _compress(raw, codec)
+        # Short answers do not always shrink - keep plain text in that case
+        if len(blob) < len(raw.encode("utf-8")):
+            self._codec = codec
+            self._raw = blob
+
+    def to_model_response(self) -> ModelResponse:
+        return ModelResponse(
+            model=self.model,
+            answer=self.answer,
+            confidence=self.confidence,
+            raw=self.raw,
+            reasoning=self.reasoning,
+            error=self.error
+        )
+
+    def to_dict(self) -> dict:
+        """Serialize for the JSON cache file (reasoning stored as a span when possible)"""
+        data = {
+            "model": self.model,
+            "answer": self.answer,
+            "confidence": self.confidence,
+            "raw": self.peek_raw(),
+            "error": self.error
+        }
+        if self._span is not None:
+            data["reasoning_span"] = list(self._span)
+        else:
+            data["reasoning"] = self._reasoning
+        for field in METADATA_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CompactEntry":
+        """Deserialize from the JSON cache file (accepts both legacy and span formats)"""
+        span = data.get("reasoning_span")
+        return cls(
+            model=data["model"],
+            answer=data["answer"],
+            confidence=data["confidence"],
+            raw=data["raw"],
+            reasoning=data.get("reasoning"),
+            error=data.get("error", False),
+            span=tuple(span) if span else None,
+            **{field: data.get(field) for field in METADATA_FIELDS}
+        )
@@ -0,0 +1,112 @@
+"""
+Per-provider circuit breakers
+After a run of consecutive failed calls a provider's breaker opens and calls fail fast for a
+cool-down period; then one probe call is let through (half-open) and its outcome closes or
+re-opens the breaker. Breaker state also feeds /health/ready.
+"""
+
+import math
+import time
+import logging
+from typing import Dict
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+    def __init__(self, provider: str, retry_after: float):
+        self.provider = provider
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"{provider} is unavailable after repeated failures, retry after {self.retry_after}s")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one provider"""
+
+    def __init__(self, provider: str, failure_threshold: int = settings.circuit_failure_threshold,
+                 reset_seconds: float = settings.circuit_reset_seconds):
+        self.provider = provider
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being refused (open and still cooling down)"""
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_seconds
+
+    def before_call(self) -> None:
+        """Raise ProviderUnavailable unless a call may go through now"""
+        if self.state == CLOSED:
+            return
+        elapsed = time.monotonic() - self.opened_at
+        if self.state == OPEN and elapsed >= self.reset_seconds:
+            self.state = HALF_OPEN
+            logger.info(f"🔌 {self.provider} circuit half-open, sending a probe call")
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        self.rejected += 1
+        raise ProviderUnavailable(self.provider, self.reset_seconds - elapsed if self.state == OPEN else 1)
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info(f"🔌 {self.provider} circuit closed, provider recovered")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(f"🔌 {self.provider} circuit open after {self.consecutive_failures} consecutive failures; "
+                           f"failing fast for {self.reset_seconds:.0f}s")
+
+    def record_cancelled(self) -> None:
+        """The call was abandoned without an outcome; let another probe through"""
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": OPEN if self.is_open else (HALF_OPEN if self.state != CLOSED else CLOSED),
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+
+class CircuitBreakers:
+    """Breakers keyed by provider name, created on first use"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = self._breakers[provider] = CircuitBreaker(provider)
+        return breaker
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
+
+
+# Global breakers shared by all provider calls
+circuit_breakers = CircuitBreakers()
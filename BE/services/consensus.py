@@ -0,0 +1,174 @@
+"""
+Weighted, calibrated consensus for multi-model answers
+Each model's vote is weighted by how often its answers turn out to be correct at the confidence it
+reported; votes are combined into a probability per option and models are asked in stages so
+later models are only called while the answer is still uncertain
+"""
+
+import math
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from schemas.responses import ModelResponse
+
+logger = logging.getLogger(__name__)
+
+# Pseudo-counts pulling learned accuracy towards the prior while there is little feedback
+PRIOR_STRENGTH = 10.0
+BUCKET_PRIOR_STRENGTH = 5.0
+
+# Keep calibrated probabilities away from 0 and 1 so one model can never decide alone
+MIN_PROBABILITY = 0.05
+MAX_PROBABILITY = 0.98
+
+
+class ModelReliability:
+    """
+    Per-model accuracy and confidence calibration learned from outcome feedback
+
+    Accuracy is a Beta-smoothed hit rate; calibration keeps one counter pair per self-reported
+    confidence level (1-10) smoothed towards the model's overall accuracy.
+    """
+
+    def __init__(self, prior_accuracy: float = settings.consensus_prior_accuracy):
+        self.prior_accuracy = prior_accuracy
+        self._totals: Dict[str, List[int]] = {}  # model -> [correct, total]
+        self._buckets: Dict[str, List[List[int]]] = {}  # model -> 10 x [correct, total]
+
+    def record_outcome(self, model_name: str, confidence: int, correct: bool, count: int = 1) -> None:
+        """Count an outcome; count=-1 retracts one recorded earlier (e.g. superseded feedback)"""
+        totals = self._totals.setdefault(model_name, [0, 0])
+        buckets = self._buckets.setdefault(model_name, [[0, 0] for _ in range(10)])
+        bucket = buckets[min(10, max(1, confidence)) - 1]
+        totals[1] += count
+        bucket[1] += count
+        if correct:
+            totals[0] += count
+            bucket[0] += count
+
+    def accuracy(self, model_name: str) -> float:
+        correct, total = self._totals.get(model_name, (0, 0))
+        return (correct + PRIOR_STRENGTH * self.prior_accuracy) / (total + PRIOR_STRENGTH)
+
+    def probability(self, model_name: str, confidence: int) -> float:
+        """Calibrated probability that this model's answer is correct at the given confidence"""
+        confidence = min(10, max(1, confidence))
+        # Without feedback, lower self-reported confidence scales the model's accuracy down
+        prior = self.accuracy(model_name) * (0.6 + 0.04 * confidence)
+        buckets = self._buckets.get(model_name)
+        if buckets:
+            correct, total = buckets[confidence - 1]
+            prior = (correct + BUCKET_PRIOR_STRENGTH * prior) / (total + BUCKET_PRIOR_STRENGTH)
+        return min(MAX_PROBABILITY, max(MIN_PROBABILITY, prior))
+
+    def reset(self) -> None:
+        self._totals.clear()
+        self._buckets.clear()
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            model_name: {
+                "correct": correct,
+                "total": total,
+                "accuracy": round(self.accuracy(model_name), 4)
+            }
+            for model_name, (correct, total) in self._totals.items()
+        }
+
+
+class VoteResult:
+    """Outcome of a weighted vote over model answers"""
+
+    def __init__(self, answer: Optional[str], probabilities: Dict[str, float], votes: List[dict],
+                 threshold: float):
+        self.answer = answer
+        self.probabilities = probabilities
+        self.probability = probabilities.get(answer, 0.0) if answer else 0.0
+        self.votes = votes
+        self.consensus = answer is not None and self.probability >= threshold
+
+    @property
+    def conflicting_answers(self) -> List[str]:
+        return sorted({vote["answer"] for vote in self.votes})
+
+
+def weighted_vote(responses: Dict[str, ModelResponse], num_options: int,
+                  threshold: float = settings.consensus_threshold,
+                  model_reliability: Optional[ModelReliability] = None) -> VoteResult:
+    """
+    Combine model answers into a probability per option
+
+    A model whose answer is correct with calibrated probability p multiplies the odds of its answer
+    by p and of every other option by (1 - p) / (n - 1). Error responses carry no evidence.
+    """
+    model_reliability = model_reliability or reliability
+    num_options = max(2, num_options)
+    options = [chr(65 + i) for i in range(num_options)]
+    log_scores = {option: 0.0 for option in options}
+    votes = []
+
+    for model_name, response in responses.items():
+        if response.error or response.answer not in log_scores:
+            continue
+        p = model_reliability.probability(model_name, response.confidence)
+        miss = (1 - p) / (num_options - 1)
+        for option in options:
+            log_scores[option] += math.log(p if option == response.answer else miss)
+        votes.append({
+            "model": model_name,
+            "answer": response.answer,
+            "confidence": response.confidence,
+            "probability_correct": round(p, 4),
+            "weight": round(math.log(p / miss), 4)
+        })
+
+    if not votes:
+        return VoteResult(None, {}, [], threshold)
+
+    top = max(log_scores.values())
+    exp_scores = {option: math.exp(score - top) for option, score in log_scores.items()}
+    total = sum(exp_scores.values())
+    probabilities = {option: round(score / total, 4) for option, score in exp_scores.items()}
+    answer = max(probabilities, key=probabilities.get)
+    return VoteResult(answer, probabilities, votes, threshold)
+
+
+async def run_quorum(legs: List[Tuple[str, Callable[[], Awaitable[ModelResponse]]]], num_options: int,
+                     quorum: int = settings.consensus_quorum,
+                     threshold: float = settings.consensus_threshold,
+                     known: Optional[Dict[str, ModelResponse]] = None) -> Tuple[VoteResult, Dict[str, ModelResponse], List[str]]:
+    """
+    Ask models in stages until the vote is confident enough
+
+    known holds responses that are already available (stored results) and count towards the
+    quorum without a call. The rest of the first `quorum` legs run in parallel; further legs are
+    called one at a time only while the winning answer's probability is below threshold
+    (disagreement or failed models). Returns (vote, responses by leg, skipped legs).
+    """
+    # Strongest models first so the quorum is formed by the most reliable voters
+    ordered = sorted(legs, key=lambda leg: reliability.accuracy(leg[0]), reverse=True)
+    responses: Dict[str, ModelResponse] = dict(known or {})
+    first_stage = max(0, max(1, min(quorum, len(ordered) + len(responses))) - len(responses))
+
+    results = await asyncio.gather(*(call() for _, call in ordered[:first_stage]))
+    for (name, _), response in zip(ordered[:first_stage], results):
+        responses[name] = response
+    vote = weighted_vote(responses, num_options, threshold)
+
+    remaining = ordered[first_stage:]
+    while remaining and not vote.consensus:
+        name, call = remaining.pop(0)
+        logger.info(f"No confident consensus yet (p={vote.probability:.2f}), asking {name}")
+        responses[name] = await call()
+        vote = weighted_vote(responses, num_options, threshold)
+
+    skipped = [name for name, _ in remaining]
+    if skipped:
+        logger.info(f"Quorum reached with p={vote.probability:.2f}; skipped {', '.join(skipped)}")
+    return vote, responses, skipped
+
+
+# Global reliability estimates shared by all consensus decisions
+reliability = ModelReliability()
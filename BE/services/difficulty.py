@@ -0,0 +1,121 @@
+"""
+Cheap local question difficulty estimate
+Picks the Gemini thinking budget and whether Google Search grounding is worth its latency, from
+question length, keyword cues and whether models have disagreed on the question before
+"""
+
+import re
+import logging
+from collections import OrderedDict
+from typing import List
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("easy", "medium", "hard")
+
+# Facts that change over time need search grounding regardless of difficulty
+TIME_SENSITIVE = re.compile(
+    r"\b(current(ly)?|latest|recent(ly)?|today|this year|now|as of|newest|incumbent|20[2-9]\d)\b", re.IGNORECASE
+)
+REASONING_CUES = re.compile(
+    r"\b(calculate|compute|how many|how much|estimate|derive|probability|percent(age)?|ratio|"
+    r"most likely|best explains|infer|implies|least|except)\b", re.IGNORECASE
+)
+SPECIALIST_TERMS = re.compile(
+    r"\b(theorem|lemma|integral|derivative|eigen\w*|quantum|isotope|enzyme|genom\w*|syndrome|"
+    r"patho\w*|pharmaco\w*|diagnos\w*|statute|jurisdiction|tort|amendment|algorithm|asymptotic)\b", re.IGNORECASE
+)
+# Emphasised negations ("Which is NOT ...") are a classic trap for fast answers
+EMPHASISED_NEGATION = re.compile(r"\b(NOT|EXCEPT|FALSE|INCORRECT)\b")
+TRIVIAL_ARITHMETIC = re.compile(r"^\s*(what is|calculate|compute)?[\s\d+\-*/x×÷().=^]+\??\s*$", re.IGNORECASE)
+
+# Questions whose model answers disagreed recently (cache key -> times seen disagreeing)
+MAX_TRACKED_DISAGREEMENTS = 10000
+
+
+class DifficultyEstimate:
+    """Chosen tier and the request settings that go with it"""
+
+    __slots__ = ("tier", "score", "thinking_budget", "use_search", "reasons")
+
+    def __init__(self, tier: str, score: int, thinking_budget: int, use_search: bool, reasons: List[str]):
+        self.tier = tier
+        self.score = score
+        self.thinking_budget = thinking_budget
+        self.use_search = use_search
+        self.reasons = reasons
+
+    @property
+    def variant(self) -> str:
+        """Compact label stored with cached answers, e.g. "easy/128/nosearch" """
+        return f"{self.tier}/{self.thinking_budget}/{'search' if self.use_search else 'nosearch'}"
+
+    def to_dict(self) -> dict:
+        return {
+            "tier": self.tier,
+            "score": self.score,
+            "thinking_budget": self.thinking_budget,
+            "use_search": self.use_search,
+            "reasons": self.reasons
+        }
+
+
+_disagreements: "OrderedDict[str, int]" = OrderedDict()
+
+
+def note_vote_outcome(cache_key: str, disagreed: bool) -> None:
+    """Remember questions on which models disagreed so later misses get more thinking"""
+    if not disagreed:
+        return
+    _disagreements[cache_key] = _disagreements.pop(cache_key, 0) + 1
+    while len(_disagreements) > MAX_TRACKED_DISAGREEMENTS:
+        _disagreements.popitem(last=False)
+
+
+def thinking_budget_for(tier: str) -> int:
+    return {
+        "easy": settings.gemini_thinking_budget_easy,
+        "medium": settings.gemini_thinking_budget_medium,
+        "hard": settings.gemini_thinking_budget_hard,
+    }[tier]
+
+
+def estimate_difficulty(question: str, options: List[str], cache_key: str) -> DifficultyEstimate:
+    """Score a question (0 = trivial) and map it to a tier, thinking budget and search flag"""
+    if not settings.gemini_adaptive_thinking:
+        return DifficultyEstimate("hard", 0, settings.gemini_thinking_budget_hard, True, ["adaptive thinking disabled"])
+
+    time_sensitive = bool(TIME_SENSITIVE.search(question))
+    if TRIVIAL_ARITHMETIC.match(question) and not time_sensitive:
+        return DifficultyEstimate("easy", 0, thinking_budget_for("easy"), False, ["arithmetic"])
+
+    score = 0
+    reasons = []
+    words = len(question.split())
+    option_words = sum(len(option.split()) for option in options) / max(1, len(options))
+    if words > 40:
+        score += 1 + (words > 90)
+        reasons.append("long question")
+    if option_words > 8:
+        score += 1
+        reasons.append("long options")
+    if REASONING_CUES.search(question):
+        score += 1
+        reasons.append("reasoning")
+    if SPECIALIST_TERMS.search(question) or any(SPECIALIST_TERMS.search(option) for option in options):
+        score += 1
+        reasons.append("specialist terms")
+    if EMPHASISED_NEGATION.search(question):
+        score += 1
+        reasons.append("negation")
+    if cache_key in _disagreements:
+        score += 2
+        reasons.append("models disagreed before")
+    if time_sensitive:
+        reasons.append("time-sensitive")
+
+    tier = "easy" if score == 0 else "medium" if score <= 2 else "hard"
+    use_search = time_sensitive or tier == "hard"
+    return DifficultyEstimate(tier, score, thinking_budget_for(tier), use_search, reasons)
@@ -0,0 +1,269 @@
+"""
+Outcome feedback store
+Append-only log of which answer turned out to be correct per question, aggregated into per-model
+and per-topic accuracy that feeds consensus calibration and model routing
+"""
+
+import os
+import json
+import time
+import atexit
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from services.cache_service import CACHE_DIR
+from services.consensus import reliability
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_FILE = CACHE_DIR / "feedback.ndjson"
+
+# Rewrite the log once superseded records outnumber live ones by this factor
+COMPACT_RATIO = 2
+COMPACT_MIN_LINES = 1000
+
+# Pseudo-counts for topic accuracy, pulled towards the model's overall accuracy
+TOPIC_PRIOR_STRENGTH = 5.0
+
+
+class FeedbackStore:
+    """
+    Append-only outcome log with in-memory aggregates
+
+    One compact JSON line per feedback: {"t", "k" (cache key), "topic", "correct", "m": {model: [answer, confidence]}}.
+    Later feedback for the same question supersedes earlier feedback, so aggregates count each
+    question once per model. The log is read on first use or in the background by the app
+    lifespan, and appends are group-committed off the event loop like cache saves.
+    """
+
+    def __init__(self, path: Path = FEEDBACK_FILE, min_samples: int = settings.feedback_min_samples,
+                 skip_accuracy: float = settings.feedback_skip_accuracy,
+                 save_interval: float = settings.cache_save_interval):
+        self.path = path
+        self.min_samples = min_samples
+        self.skip_accuracy = skip_accuracy
+        self.save_interval = save_interval
+        self._latest: Dict[str, dict] = {}  # cache key -> latest record
+        self._models: Dict[str, List[int]] = {}  # model -> [correct, total]
+        self._topics: Dict[str, Dict[str, List[int]]] = {}  # topic -> model -> [correct, total]
+        self._lines = 0
+        
+        # One worker, so the load, compaction and appends reach the file in order
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feedback-worker")
+        self._pending: List[str] = []  # Serialized records not appended to the log yet
+        self._flush_task: Optional[asyncio.Task] = None
+        
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._load_future: Optional[asyncio.Future] = None
+
+    def _apply(self, record: dict, count: int) -> None:
+        topic = record.get("topic")
+        for model_name, (answer, confidence) in record["m"].items():
+            correct = answer == record["correct"]
+            targets = [self._models.setdefault(model_name, [0, 0])]
+            if topic:
+                targets.append(self._topics.setdefault(topic, {}).setdefault(model_name, [0, 0]))
+            for totals in targets:
+                totals[1] += count
+                if correct:
+                    totals[0] += count
+            reliability.record_outcome(model_name, confidence, correct, count)
+
+    def _add(self, record: dict) -> None:
+        previous = self._latest.get(record["k"])
+        if previous is not None:
+            self._apply(previous, -1)
+        self._apply(record, 1)
+        self._latest[record["k"]] = record
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        skipped = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._lines += 1
+                try:
+                    self._add(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    # A crash mid-append leaves at most one partial line
+                    skipped += 1
+        logger.info(f"Loaded {len(self._latest)} feedback records from {self.path}"
+                    + (f" ({skipped} unreadable lines skipped)" if skipped else ""))
+        if self._lines >= COMPACT_MIN_LINES and self._lines > COMPACT_RATIO * len(self._latest):
+            self.compact()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded.is_set()
+
+    def ensure_loaded(self) -> None:
+        """Read the log now if that has not happened yet (blocks while a background load runs)"""
+        if self._loaded.is_set():
+            return
+        with self._load_lock:
+            if not self._loaded.is_set():
+                self._load()
+                self._loaded.set()
+
+    def start_background_load(self) -> "asyncio.Future":
+        """Read the log in the worker thread; returns a future that completes when loaded"""
+        loop = asyncio.get_running_loop()
+        if self._load_future is None or self._load_future.get_loop() is not loop:
+            self._load_future = loop.run_in_executor(self.executor, self.ensure_loaded)
+        return self._load_future
+
+    async def wait_until_loaded(self) -> None:
+        if not self._loaded.is_set():
+            await asyncio.shield(self.start_background_load())
+
+    def compact(self) -> None:
+        """Atomically rewrite the log with only the latest record per question"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for record in self._latest.values():
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            tmp_path = None
+            logger.info(f"Compacted feedback log from {self._lines} to {len(self._latest)} lines")
+            self._lines = len(self._latest)
+        except OSError as e:
+            logger.error(f"Error compacting feedback log: {e}")
+        finally:
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+    def record(self, cache_key: str, correct_answer: str, model_answers: Dict[str, Tuple[str, int]],
+               topic: Optional[str] = None) -> Dict[str, bool]:
+        """Append one outcome and update aggregates; returns whether each model was correct"""
+        record = {
+            "t": int(time.time()),
+            "k": cache_key,
+            "topic": topic or None,
+            "correct": correct_answer,
+            "m": {model_name: [answer, confidence] for model_name, (answer, confidence) in model_answers.items()}
+        }
+        self.ensure_loaded()
+        self._add(record)
+        self._pending.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._lines += 1
+        self._schedule_flush()
+        return {model_name: answer == correct_answer for model_name, (answer, _) in model_answers.items()}
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop running (scripts, shutdown): append synchronously
+            self.flush_now()
+            return
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        """Coalesce feedback bursts into one append per interval, written by the worker thread"""
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            await asyncio.sleep(self.save_interval)
+            lines, self._pending = self._pending, []
+            try:
+                await loop.run_in_executor(self.executor, self._append, lines)
+            except OSError as e:
+                logger.error(f"Error appending to feedback log: {e}")
+                # Retried with the next interval's records
+                self._pending[:0] = lines
+
+    def _append(self, lines: List[str]) -> None:
+        self.path.parent.mkdir(exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+
+    def flush_now(self) -> None:
+        """Synchronously append every pending record"""
+        lines, self._pending = self._pending, []
+        if not lines:
+            return
+        try:
+            self._append(lines)
+        except OSError as e:
+            logger.error(f"Error appending to feedback log: {e}")
+            self._pending[:0] = lines
+
+    def shutdown(self) -> None:
+        """Stop the flusher, wait for in-flight appends and write what is still pending"""
+        if self._flush_task is not None and not self._flush_task.done():
+            try:
+                self._flush_task.cancel()
+            except RuntimeError:
+                # Owning event loop already closed
+                pass
+        self.executor.shutdown(wait=True)
+        self.flush_now()
+
+    def topic_accuracy(self, model_name: str, topic: str) -> Tuple[float, int]:
+        """Smoothed accuracy of a model on a topic and the number of outcomes behind it"""
+        self.ensure_loaded()
+        correct, total = self._topics.get(topic, {}).get(model_name, (0, 0))
+        prior = reliability.accuracy(model_name)
+        return (correct + TOPIC_PRIOR_STRENGTH * prior) / (total + TOPIC_PRIOR_STRENGTH), total
+
+    def route(self, model_names: List[str], topic: Optional[str]) -> Tuple[List[str], List[str]]:
+        """
+        Drop models that underperform on this topic
+
+        A model is skipped once it has at least min_samples outcomes on the topic and its accuracy
+        there is below skip_accuracy. The best model on the topic is always kept.
+        Returns (kept, skipped) in the original order.
+        """
+        self.ensure_loaded()
+        if not topic or topic not in self._topics or len(model_names) < 2:
+            return list(model_names), []
+
+        scores = {name: self.topic_accuracy(name, topic) for name in model_names}
+        best = max(model_names, key=lambda name: scores[name][0])
+        skipped = [
+            name for name in model_names
+            if name != best and scores[name][1] >= self.min_samples and scores[name][0] < self.skip_accuracy
+        ]
+        if skipped:
+            logger.info(f"Routing for topic '{topic}': skipping {', '.join(skipped)} (low accuracy)")
+        return [name for name in model_names if name not in skipped], skipped
+
+    def stats(self) -> dict:
+        def summarize(totals: Dict[str, List[int]]) -> Dict[str, dict]:
+            return {
+                model_name: {"correct": correct, "total": total,
+                             "accuracy": round(correct / total, 4) if total else None}
+                for model_name, (correct, total) in totals.items()
+            }
+
+        self.ensure_loaded()
+        return {
+            "questions": len(self._latest),
+            "log_lines": self._lines,
+            "models": summarize(self._models),
+            "topics": {topic: summarize(models) for topic, models in self._topics.items()},
+            "calibrated_accuracy": reliability.summary()
+        }
+
+
+# Global feedback store instance
+feedback_store = FeedbackStore()
+
+# Append pending feedback on program exit
+atexit.register(feedback_store.shutdown)
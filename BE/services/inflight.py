@@ -0,0 +1,58 @@
+"""
+In-flight request coalescing for provider calls
+Concurrent cache misses for the same (model, question) share one provider request
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from services.scheduler import current_call_key, current_request_class, provider_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightRegistry:
+    """
+    Single-flight registry: the first caller for a key runs the call, later callers await it
+
+    Keys are tuples whose first element names the model cache; coalesced waits are counted per model.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced_waits: Dict[str, int] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory() once per key at a time and share its result with concurrent callers"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._call(key, factory))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            model_name = key[0] if isinstance(key, tuple) else str(key)
+            self.coalesced_waits[model_name] = self.coalesced_waits.get(model_name, 0) + 1
+            logger.debug(f"Coalescing with in-flight request for {key}")
+            # A call still queued at a lower priority (e.g. a prefetch) now has a more urgent waiter
+            provider_scheduler.promote(key, current_request_class.get().priority)
+
+        # Shield so one cancelled waiter (e.g. a closed client) does not cancel the shared call
+        return await asyncio.shield(future)
+
+
+    @staticmethod
+    async def _call(key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        # Runs in its own task context: tags the provider slot with the key so waiters can promote it
+        current_call_key.set(key)
+        return await factory()
+
+
+# Global registry shared by all provider calls
+inflight_requests = InFlightRegistry()
@@ -0,0 +1,157 @@
+"""
+Event-loop health monitor
+A heartbeat task measures how late the loop wakes it up (loop lag); a watchdog thread notices when
+the heartbeat stalls past a threshold and captures the stack of whatever is running on the loop
+thread, so blocking calls show up in the logs and /metrics with the code that caused them.
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import OrderedDict, deque
+from typing import List, Optional
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Distinct blocking stacks remembered for /metrics (least recently seen dropped first)
+MAX_OFFENDERS = 20
+# Innermost frames kept per captured stack
+STACK_DEPTH = 12
+# Seconds of heartbeats considered by recent_max_lag (readiness)
+RECENT_LAG_WINDOW = 10.0
+
+
+class BlockingOffender:
+    """A stack seen running on the loop thread while the loop was stalled"""
+
+    def __init__(self, stack: List[str]):
+        self.stack = stack
+        self.count = 0
+        self.max_seconds = 0.0
+        self.last_seen = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "max_seconds": round(self.max_seconds, 3),
+            "last_seen": self.last_seen,
+            "stack": self.stack
+        }
+
+
+class LoopMonitor:
+    """Heartbeat on the event loop plus a watchdog thread that samples the loop thread's stack"""
+
+    def __init__(self, interval: float = settings.loop_monitor_interval,
+                 threshold: float = settings.loop_monitor_threshold):
+        self.interval = interval
+        self.threshold = threshold
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._stall_key: Optional[str] = None  # offender captured for the current stall
+        self._lock = threading.Lock()
+        self.offenders: "OrderedDict[str, BlockingOffender]" = OrderedDict()
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._recent_lags = deque(maxlen=max(1, int(RECENT_LAG_WINDOW / interval)))
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"🩺 Event-loop monitor started (interval {self.interval * 1000:.0f}ms, "
+                    f"blocking threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            self.max_lag = max(self.max_lag, lag)
+            self._recent_lags.append(lag)
+            metrics.observe("event_loop_lag", "loop", lag)
+            if lag >= self.threshold or self._stall_key is not None:
+                self._finish_stall(lag)
+
+    def _finish_stall(self, lag: float) -> None:
+        with self._lock:
+            key, self._stall_key = self._stall_key, None
+            self.stalls += 1
+            offender = self.offenders.get(key) if key else None
+            if offender is not None:
+                offender.max_seconds = max(offender.max_seconds, lag)
+        where = offender.stack[-1].splitlines()[0].strip() if offender is not None and offender.stack else "unknown"
+        logger.warning(f"🐢 Event loop blocked for {lag * 1000:.0f}ms ({where})")
+
+    def _watch(self) -> None:
+        # Check several times per threshold so short stalls are still caught mid-flight
+        poll = max(0.005, self.threshold / 4)
+        while not self._stop.wait(poll):
+            stalled_for = time.perf_counter() - self._last_beat - self.interval
+            if stalled_for < self.threshold or self._stall_key is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._record(traceback.format_stack(frame)[-STACK_DEPTH:], stalled_for)
+
+    def _record(self, stack: List[str], stalled_for: float) -> None:
+        key = "".join(stack)
+        with self._lock:
+            offender = self.offenders.pop(key, None) or BlockingOffender(stack)
+            offender.count += 1
+            offender.max_seconds = max(offender.max_seconds, stalled_for)
+            offender.last_seen = time.time()
+            self.offenders[key] = offender
+            while len(self.offenders) > MAX_OFFENDERS:
+                self.offenders.popitem(last=False)
+            self._stall_key = key
+        logger.warning(f"🐢 Event loop blocked for {stalled_for * 1000:.0f}ms so far, running:\n{key}")
+
+    def recent_max_lag(self) -> float:
+        """Worst lag over the last RECENT_LAG_WINDOW seconds, including a stall still in progress"""
+        ongoing = max(0.0, time.perf_counter() - self._last_beat - self.interval) if self.running else 0.0
+        return max(max(self._recent_lags, default=0.0), ongoing)
+
+    def stats(self) -> dict:
+        with self._lock:
+            offenders = sorted(self.offenders.values(), key=lambda o: o.max_seconds, reverse=True)
+            return {
+                "enabled": self.running,
+                "interval_ms": round(self.interval * 1000, 1),
+                "threshold_ms": round(self.threshold * 1000, 1),
+                "max_lag_seconds": round(self.max_lag, 4),
+                "stalls": self.stalls,
+                "offenders": [offender.to_dict() for offender in offenders]
+            }
+
+
+# Global monitor, started from the app lifespan when settings.loop_monitor_enabled is set
+loop_monitor = LoopMonitor()
@@ -0,0 +1,119 @@
+"""
+In-process latency metrics
+Small fixed-size windows per key, summarized as count / average / percentiles for /metrics
+"""
+
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# Observations kept per key for percentile estimates
+WINDOW_SIZE = 512
+
+
+class LatencyStats:
+    """Running totals plus a sliding window of recent observations (seconds)"""
+
+    __slots__ = ("count", "total", "max", "_recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=WINDOW_SIZE)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else None,
+            "p50_ms": round(self.percentile(0.5) * 1000, 1) if self.count else None,
+            "p95_ms": round(self.percentile(0.95) * 1000, 1) if self.count else None,
+            "max_ms": round(self.max * 1000, 1) if self.count else None
+        }
+
+
+class TokenUsage:
+    """Token totals for one provider, including prompt tokens served from the provider's prefix cache"""
+
+    __slots__ = ("calls", "prompt", "cached", "completion", "cached_calls")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt = 0
+        self.cached = 0
+        self.completion = 0
+        self.cached_calls = 0
+
+    def add(self, prompt: int, cached: int, completion: int) -> None:
+        self.calls += 1
+        self.prompt += prompt
+        self.cached += cached
+        self.completion += completion
+        if cached:
+            self.cached_calls += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt,
+            "cached_prompt_tokens": self.cached,
+            "completion_tokens": self.completion,
+            "cached_token_ratio": round(self.cached / self.prompt, 3) if self.prompt else None,
+            "calls_with_cache_hit": self.cached_calls,
+            "avg_prompt_tokens": round(self.prompt / self.calls, 1) if self.calls else None,
+            "avg_completion_tokens": round(self.completion / self.calls, 1) if self.calls else None
+        }
+
+
+class MetricsRegistry:
+    """Latency stats grouped by metric name and key (e.g. "gemini_tiers" -> "easy")"""
+
+    def __init__(self):
+        self._latencies: Dict[str, Dict[str, LatencyStats]] = {}
+        self._tokens: Dict[str, TokenUsage] = {}
+        self.started_at = time.time()
+
+    def observe(self, group: str, key: str, seconds: float) -> None:
+        stats = self._latencies.setdefault(group, {}).get(key)
+        if stats is None:
+            stats = self._latencies[group][key] = LatencyStats()
+        stats.observe(seconds)
+
+    def record_tokens(self, provider: str, prompt: int, cached: int, completion: int,
+                      seconds: Optional[float] = None) -> None:
+        """
+        Count one call's token usage; with seconds, its latency also goes to provider_latency
+        split by whether part of the prompt was a provider prefix-cache hit
+        """
+        self._tokens.setdefault(provider, TokenUsage()).add(prompt, cached, completion)
+        if seconds is not None:
+            self.observe("provider_latency", f"{provider}/{'prefix_cached' if cached else 'uncached'}", seconds)
+
+    def token_usage(self) -> Dict[str, dict]:
+        return {provider: usage.to_dict() for provider, usage in self._tokens.items()}
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        return {
+            group: {key: stats.to_dict() for key, stats in keys.items()}
+            for group, keys in self._latencies.items()
+        }
+
+    def reset(self) -> None:
+        self._latencies.clear()
+        self._tokens.clear()
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
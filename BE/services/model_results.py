@@ -0,0 +1,283 @@
+"""
+Per-model result store
+Every model leg (openai, gemini, xai) keeps its parsed answers in its own cache namespace,
+whichever mode asked for them: single-model answers, consensus legs, warm-up and batch jobs read
+and write the same entries. Callers look up what is already stored for a set of legs and fetch
+only the missing ones; concurrent fetches of the same leg and question share one provider call.
+Stored answers with low confidence or past the soft TTL are served as they are and re-queried in
+the background (stale-while-revalidate).
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from schemas.responses import ModelResponse
+from services.answer_parser import build_model_response, is_parse_fallback
+from services.cache_service import (
+    create_cache_key, get_from_cache, peek_cache, add_to_cache, cache_entry_created_at, capture_cache_writes,
+)
+from services.inflight import inflight_requests
+from services.quiz_cache import quiz_result_cache
+from services.streaming import stream_chat_answer
+from services.scheduler import AdmissionRejected, provider_scheduler, set_request_class, BACKGROUND
+from services.prompts import chat_usage, record_usage
+
+logger = logging.getLogger(__name__)
+
+# Provider call for one leg: fetch(question, options, cache_key) -> ModelResponse (stores the result)
+LegFetch = Callable[[str, List[str], str], Awaitable[ModelResponse]]
+
+# Refresh attempts remembered per (leg, question) so a refresh is not retried on every read
+REFRESH_TRACKED_KEYS = 10000
+
+# Provider fetch per leg, registered by the services that own them (used by background refreshes)
+_leg_fetchers: Dict[str, LegFetch] = {}
+
+# Streamed completions still holding their provider slot after the answer was returned
+_stream_tasks: Set[asyncio.Task] = set()
+
+
+def register_leg(model_name: str, fetch: LegFetch) -> None:
+    _leg_fetchers[model_name] = fetch
+
+
+class BackgroundRefresher:
+    """
+    Stale-while-revalidate for stored results
+
+    A stored answer below settings.cache_refresh_below_confidence or guessed by the parser
+    fallback (refreshed while that setting is on), or older than
+    settings.cache_soft_ttl_seconds, is still served immediately; the leg is re-queried through
+    the background scheduler lane and the new answer replaces the entry only if it is an
+    improvement (see improves). Attempts per entry are at least
+    settings.cache_refresh_interval_seconds apart.
+    """
+
+    def __init__(self, max_tracked: int = REFRESH_TRACKED_KEYS):
+        self.max_tracked = max_tracked
+        self._attempts: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self.started = 0
+        self.replaced = 0
+        self.kept = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def needs_refresh(self, model_name: str, cache_key: str, result: ModelResponse, now: float) -> bool:
+        if result.error or model_name not in _leg_fetchers:
+            return False
+        if (model_name, cache_key) in inflight_requests:
+            # Already being fetched; a refresh would only join that call
+            return False
+        interval = settings.cache_refresh_interval_seconds
+        last_attempt = self._attempts.get((model_name, cache_key))
+        if last_attempt is not None and now - last_attempt < interval:
+            return False
+        created_at = cache_entry_created_at(model_name, cache_key)
+        # Entries stored before provenance tracking have no age and count as old
+        age = now - created_at if created_at is not None else None
+        threshold = settings.cache_refresh_below_confidence
+        # A parse fallback (no Answer: line) gets the default confidence, so it is refreshed by shape
+        if result.confidence < threshold or (threshold and is_parse_fallback(result.raw)):
+            return age is None or age >= interval
+        soft_ttl = settings.cache_soft_ttl_seconds
+        return bool(soft_ttl) and age is not None and age >= soft_ttl
+
+    def maybe_refresh(self, model_name: str, question: str, options: List[str], cache_key: str,
+                      result: ModelResponse) -> bool:
+        """Start a background refresh of a stored result that needs one; returns whether it started"""
+        now = time.time()
+        if not self.needs_refresh(model_name, cache_key, result, now):
+            return False
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        self._attempts[(model_name, cache_key)] = now
+        self._attempts.move_to_end((model_name, cache_key))
+        while len(self._attempts) > self.max_tracked:
+            self._attempts.popitem(last=False)
+        self.started += 1
+        logger.info(f"🔄 Refreshing {model_name} answer {cache_key[:8]} in the background "
+                    f"(confidence {result.confidence})")
+        task = loop.create_task(self._refresh(model_name, question, options, cache_key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    @staticmethod
+    def improves(refreshed: ModelResponse, current: Optional[ModelResponse], soft_expired: bool) -> bool:
+        """
+        Whether a refreshed answer should replace the stored one: higher confidence, a stored
+        answer that was only a parse fallback, or the same answer renewing a soft-expired entry
+        """
+        if refreshed.error:
+            return False
+        if current is None or current.error:
+            return True
+        if refreshed.confidence > current.confidence:
+            return True
+        if is_parse_fallback(current.raw) and not is_parse_fallback(refreshed.raw):
+            return True
+        return soft_expired and refreshed.answer == current.answer and refreshed.confidence == current.confidence
+
+    async def _refresh(self, model_name: str, question: str, options: List[str], cache_key: str) -> None:
+        # The task runs in a copy of the caller's context, so this only lowers the refresh's priority
+        set_request_class(BACKGROUND)
+        current = peek_cache(model_name, cache_key)
+        created_at = cache_entry_created_at(model_name, cache_key)
+        soft_ttl = settings.cache_soft_ttl_seconds
+        soft_expired = bool(soft_ttl) and created_at is not None and time.time() - created_at >= soft_ttl
+        # The fetch's cache writes are held back so a worse answer never replaces the served one
+        with capture_cache_writes() as captured:
+            try:
+                refreshed = await fetch_result(model_name, _leg_fetchers[model_name], question, options, cache_key)
+            except AdmissionRejected:
+                captured.drop()
+                self.rejected += 1
+                return
+            except Exception as e:
+                captured.drop()
+                logger.warning(f"Background refresh of {model_name} answer failed: {e}")
+                self.failed += 1
+                return
+        if refreshed.error:
+            # Failures are not negative-cached either: the stored answer is still being served
+            captured.drop()
+            self.failed += 1
+        elif self.improves(refreshed, current, soft_expired):
+            captured.apply()
+            quiz_result_cache.discard_question(cache_key)
+            self.replaced += 1
+        else:
+            captured.drop()
+            self.kept += 1
+            logger.debug(f"Kept stored {model_name} answer {cache_key[:8]} (confidence {current.confidence} "
+                         f"vs refreshed {refreshed.confidence})")
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "replaced": self.replaced,
+            "kept": self.kept,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "in_progress": len(self._tasks),
+        }
+
+
+def lookup_results(model_names: List[str], question: str, options: List[str], cache_key: str,
+                   first_hit: bool = False) -> Dict[str, ModelResponse]:
+    """
+    Stored results for the given legs, in order; legs without one are left out
+
+    Recent failures are included as their error responses (error=True). With first_hit the
+    lookup stops at the first successful result. Results that are due for a refresh are still
+    returned and refreshed in the background.
+    """
+    results = {}
+    for name in model_names:
+        result = get_from_cache(name, cache_key)
+        if result is None:
+            continue
+        results[name] = result
+        background_refresher.maybe_refresh(name, question, options, cache_key, result)
+        if first_hit and not result.error:
+            break
+    return results
+
+
+async def fetch_result(model_name: str, fetch: LegFetch, question: str, options: List[str],
+                       cache_key: str) -> ModelResponse:
+    """Fetch one leg from its provider; concurrent misses for the same question share the call"""
+    return await inflight_requests.run(
+        (model_name, cache_key), lambda: fetch(question, options, cache_key)
+    )
+
+
+async def get_result(model_name: str, fetch: LegFetch, question: str, options: List[str]) -> ModelResponse:
+    """Stored result for one leg, fetched from the provider on a miss"""
+    cache_key = create_cache_key(question, options)
+    cached = get_from_cache(model_name, cache_key)
+    if cached:
+        logger.debug(f"Returning cached {model_name} response")
+        background_refresher.maybe_refresh(model_name, question, options, cache_key, cached)
+        return cached
+    return await fetch_result(model_name, fetch, question, options, cache_key)
+
+
+async def complete_chat_answer(client, cache_name: str, cache_key: str, model_name: str,
+                               prompt_hash: str, **create_kwargs) -> ModelResponse:
+    """
+    Run a chat completion against an OpenAI-compatible client and store the parsed answer
+
+    With settings.openai_streaming the answer is returned (and stored) as soon as its
+    Answer/Confidence header has streamed in; the full completion replaces it when the stream
+    ends. The provider slot stays held until then, since the connection is still open.
+    """
+    completed = False
+
+    def cache_completed(response_content: str, model_id: Optional[str]) -> ModelResponse:
+        nonlocal completed
+        completed = True
+        latency_ms = int((time.perf_counter() - start_time) * 1000)
+        result = build_model_response(model_name, response_content)
+        add_to_cache(cache_name, cache_key, result, prompt_hash, model_id, latency_ms)
+        # A quiz served from the header-only answer is rebuilt with the full one
+        quiz_result_cache.discard_question(cache_key)
+        return result
+
+    if settings.openai_streaming:
+        loop = asyncio.get_running_loop()
+        header: asyncio.Future = loop.create_future()
+
+        async def stream_in_slot() -> None:
+            nonlocal start_time
+            try:
+                # Waits for a provider slot behind higher-priority calls (may raise AdmissionRejected)
+                async with provider_scheduler.slot(cache_name):
+                    start_time = time.perf_counter()
+                    stream_ended = loop.create_future()
+                    response_content, _ = await stream_chat_answer(
+                        client, cache_completed,
+                        on_usage=lambda usage: record_usage(cache_name, chat_usage(usage), time.perf_counter() - start_time),
+                        on_end=stream_ended.set_result,
+                        **create_kwargs
+                    )
+                    logger.debug(f"{model_name} answer header received after {time.perf_counter() - start_time:.2f}s")
+                    result = build_model_response(model_name, response_content)
+                    if not completed:
+                        # Readers arriving while the reasoning streams in get the header instead of a new call
+                        add_to_cache(cache_name, cache_key, result, prompt_hash, None,
+                                     int((time.perf_counter() - start_time) * 1000))
+                    if not header.done():
+                        header.set_result(result)
+                    error = await stream_ended
+                    if error is not None:
+                        raise error
+            except Exception as e:
+                if not header.done():
+                    header.set_exception(e)
+            finally:
+                if not header.done():
+                    header.cancel()
+
+        task = loop.create_task(stream_in_slot())
+        _stream_tasks.add(task)
+        task.add_done_callback(_stream_tasks.discard)
+        return await header
+
+    # Waits for a provider slot behind higher-priority calls (may raise AdmissionRejected)
+    async with provider_scheduler.slot(cache_name):
+        start_time = time.perf_counter()
+        response = await client.chat.completions.create(**create_kwargs)
+        record_usage(cache_name, chat_usage(getattr(response, "usage", None)), time.perf_counter() - start_time)
+    return cache_completed(response.choices[0].message.content, response.model)
+
+
+# Global stale-while-revalidate state shared by every lookup
+background_refresher = BackgroundRefresher()
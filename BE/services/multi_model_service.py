@@ -2,259 +2,126 @@
 Multi-model AI service for quiz processing using OpenAI GPT-4.1, Google Gemini, and xAI Grok
 """
 
-import re
 import asyncio
 import logging
-from typing import List, Tuple
+import functools
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException
 
-# AI Model imports
-from google.genai import types
+from config import settings
 
 # Schema imports
 from schemas.responses import AnswerResponse, ModelResponse, MultiModelAnalysis
 
 # Service imports
-from services.cache_service import (
-    create_cache_key, get_from_cache, add_to_cache,
-)
-from services.ai_clients import get_openai_client, get_xai_client, get_gemini_client
+from services.cache_service import create_cache_key, add_to_cache, register_prompt_version
+from services.prompts import XAI_PROMPT, GEMINI_PROMPT, gemini_output_limit, gemini_usage, record_usage
+from services.ai_clients import get_xai_client, get_gemini_client
+from services.ai_service import fetch_openai_result
+from services.answer_parser import build_model_response
+from services.model_results import lookup_results, fetch_result, get_result, complete_chat_answer, register_leg
+from services.consensus import VoteResult, run_quorum
+from services.feedback_store import feedback_store
+from services.difficulty import estimate_difficulty, note_vote_outcome
+from services.metrics import metrics
+from services.scheduler import AdmissionRejected, provider_scheduler
+from services.circuit_breaker import ProviderUnavailable
 
 logger = logging.getLogger(__name__)
 
-
-def parse_answer_response(response_content: str, model_name: str) -> Tuple[str, int, str]:
-    """Parse AI response to extract answer, confidence, and reasoning"""
-    try:
-
-        logger.info(f"Parsing response from {model_name}")
-        logger.info(f"Response content: {response_content}")
-
-        # Strategy 1: Look for explicit Answer: pattern
-        answer_match = re.search(r'[Aa]nswer:\s*([A-Da-d])', response_content)
-        if answer_match:
-            answer = answer_match.group(1).upper()
-        else:
-            # Strategy 2: Look for standalone letter patterns
-            letter_matches = re.findall(r'\b([A-Da-d])\b', response_content)
-            if letter_matches:
-                answer = letter_matches[0].upper()
-            else:
-                # Strategy 3: Fallback to first found letter
-                all_letters = re.findall(r'([A-Da-d])', response_content)
-                answer = all_letters[0].upper() if all_letters else "A"
-        
-        # Enhanced confidence parsing
-        confidence_patterns = [
-            r'[Cc]onfidence:\s*(\d+)',
-            r'[Cc]onfidence\s+[Ll]evel:\s*(\d+)',
-            r'(\d+)/10',
-            r'(\d+)\s*out\s*of\s*10',
-        ]
-        
-        confidence = 1  # Default confidence
-        for pattern in confidence_patterns:
-            conf_match = re.search(pattern, response_content)
-            if conf_match:
-                confidence = min(10, max(1, int(conf_match.group(1))))
-                break
-        
-        # Extract reasoning
-        reasoning_patterns = [
-            r'[Rr]easoning:\s*(.+?)(?:\n|$)',
-            r'[Ee]xplanation:\s*(.+?)(?:\n|$)',
-            r'[Jj]ustification:\s*(.+?)(?:\n|$)',
-            r'[Bb]ecause:\s*(.+?)(?:\n|$)',
-        ]
-        
-        reasoning = "No reasoning provided"
-        for pattern in reasoning_patterns:
-            reasoning_match = re.search(pattern, response_content, re.DOTALL)
-            if reasoning_match:
-                reasoning = reasoning_match.group(1).strip()
-                break
-        
-        # If no explicit reasoning found, try to extract everything after the confidence
-        if reasoning == "No reasoning provided":
-            # Look for content after confidence line
-            after_confidence = re.search(r'[Cc]onfidence:\s*\d+\s*(.+)', response_content, re.DOTALL)
-            if after_confidence:
-                potential_reasoning = after_confidence.group(1).strip()
-                if len(potential_reasoning) > 10:  # Only use if substantial content
-                    reasoning = potential_reasoning
-        
-        return answer, confidence, reasoning
-        
-    except Exception as e:
-        logger.warning(f"Error parsing {model_name} response: {e}")
-        return "A", 1, f"Error parsing reasoning from {model_name}"
+# Precompiled prompts; their hash is stored with every cached answer so a prompt change
+# can be invalidated selectively (see /invalidate-cache). OpenAI's is registered by ai_service.
+register_prompt_version("xai", XAI_PROMPT.prompt_hash)
+register_prompt_version("gemini", GEMINI_PROMPT.prompt_hash)
 
 
 async def get_openai_answer(question: str, options: List[str]) -> ModelResponse:
-    """Get answer from OpenAI GPT-4.1"""
-    # Check cache first
-    cache_key = create_cache_key(question, options)
-    cached_response = get_from_cache("openai", cache_key)
-    if cached_response:
-        logger.debug("Returning cached OpenAI response")
-        return cached_response
-    
-    try:
-        formatted_options = []
-        for i, option in enumerate(options):
-            letter = chr(65 + i)  # A, B, C, D
-            formatted_options.append(f"{letter}. {option}")
-        
-        options_text = "\n".join(formatted_options)
-        
-        prompt = f"""You are an expert quiz assistant. Analyze this question carefully and provide the best answer.
-
-            Question: {question}
-
-            Options:
-            {options_text}
-
-            Instructions:
-            1. Think through each option systematically
-            2. Choose the most accurate answer
-            3. Provide your confidence level (1-10)
-
-            Format your response as:
-            Answer: [A/B/C/D]
-            Confidence: [1-10]
-            Reasoning: [Brief explanation]"""
-
-        openai_client = get_openai_client()
-        
-        response = await openai_client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": "You are a highly accurate quiz assistant. Always provide clear, confident answers in the requested format."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0.1
-        )
-        
-        response_content = response.choices[0].message.content
-        answer, confidence, reasoning = parse_answer_response(response_content, "gpt-4.1")
-        
-        result = ModelResponse(
-            model="gpt-4.1",
-            answer=answer,
-            confidence=confidence,
-            raw=response_content,
-            reasoning=reasoning
-        )
-        
-        # Cache the successful response
-        add_to_cache("openai", cache_key, result)
-        return result
-        
-    except Exception as e:
-        logger.error(f"Error getting OpenAI answer: {e}")
-        # Return error response instead of raising exception
-        return ModelResponse(
-            model="gpt-4.1",
-            answer="A",  # Arbitrary fallback answer
-            confidence=1,  # Minimum confidence for failed request
-            raw=f"OpenAI Error: {str(e)}",
-            reasoning="Error: OpenAI model failed to respond",
-            error=True
-        )
+    """Get answer from OpenAI GPT-4.1 (the same stored result single-model mode uses)"""
+    return await get_result("openai", fetch_openai_result, question, options)
 
 
 async def get_gemini_answer(question: str, options: List[str]) -> ModelResponse:
     """Get answer from Google Gemini"""
-    # Check cache first
-    cache_key = create_cache_key(question, options)
-    cached_response = get_from_cache("gemini", cache_key)
-    if cached_response:
-        logger.debug("Returning cached Gemini response")
-        return cached_response
-    
+    return await get_result("gemini", _fetch_gemini_answer, question, options)
+
+
+async def _fetch_gemini_answer(question: str, options: List[str], cache_key: str) -> ModelResponse:
+    """Call Google Gemini and cache the result"""
     try:
         gemini_client = get_gemini_client()
         
-        formatted_options = []
-        for i, option in enumerate(options):
-            letter = chr(65 + i)  # A, B, C, D
-            formatted_options.append(f"{letter}. {option}")
-        
-        options_text = "\n".join(formatted_options)
-        
-        prompt = f"""Analyze this educational quiz question and select the most accurate answer.
+        prompt = GEMINI_PROMPT.user_text(question, options)
 
-            Question: {question}
-
-            Options:
-            {options_text}
-
-            Please provide:
-            1. Your selected answer (A, B, C, or D)
-            2. Your confidence level (1-10 scale)
-            3. Brief reasoning
-
-            Format your response as:
-            Answer: [A/B/C/D]
-            Confidence: [1-10]
-            Reasoning: [Brief explanation]"""
+        # Thinking budget and search grounding scale with how hard the question looks
+        difficulty = estimate_difficulty(question, options, cache_key)
 
         # check time taken by each requests to get response
-        logger.info("Sending request to Gemini model...")
-        # Start time
-        start_time = asyncio.get_event_loop().time()
-
-        response = await asyncio.to_thread(
-            gemini_client.models.generate_content,
-            model='gemini-2.5-pro',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=-1),
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-                temperature=0.1,
+        logger.info(f"Sending request to Gemini model ({difficulty.variant}: {', '.join(difficulty.reasons) or 'simple'})...")
+        # Imported on first use so startup does not load the Gemini SDK
+        from google.genai import types
+
+        async with provider_scheduler.slot("gemini"):
+            # Start time
+            start_time = asyncio.get_event_loop().time()
+
+            response = await asyncio.to_thread(
+                gemini_client.models.generate_content,
+                model='gemini-2.5-pro',
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=difficulty.thinking_budget),
+                    tools=[types.Tool(google_search=types.GoogleSearch())] if difficulty.use_search else None,
+                    temperature=0.1,
+                    max_output_tokens=gemini_output_limit(difficulty.thinking_budget),
+                    stop_sequences=GEMINI_PROMPT.stop,
+                )
             )
-        )
 
-        # end time
-        end_time = asyncio.get_event_loop().time()
+            # end time
+            end_time = asyncio.get_event_loop().time()
         elapsed_time = end_time - start_time
+        metrics.observe("gemini_tier_latency", difficulty.tier, elapsed_time)
+        record_usage("gemini", gemini_usage(getattr(response, "usage_metadata", None)), elapsed_time)
         logger.info(f"Gemini response received in {elapsed_time:.2f} seconds")
 
-        # Handle safety filtering and blocked responses
-        if not response.candidates or not response.candidates[0].content.parts:
-            # Check finish reason
-            finish_reason = response.candidates[0].finish_reason if response.candidates else None
-            logger.warning(f"Gemini response blocked - finish_reason: {finish_reason}")
+        # Handle safety filtering, blocked responses and answers cut off by the output cap
+        candidate = response.candidates[0] if response.candidates else None
+        finish_reason = candidate.finish_reason if candidate else None
+        has_text = bool(candidate and candidate.content and candidate.content.parts)
+        response_content = (response.text or "") if has_text else ""
+        # Matches the SDK enum and the string form replayed recordings carry
+        truncated = "MAX_TOKENS" in str(finish_reason) and "answer:" not in response_content.lower()
+        if not response_content.strip() or truncated:
+            # Thinking can use up max_output_tokens before any answer text is written
+            logger.warning(f"Gemini returned no usable answer - finish_reason: {finish_reason}")
             
-            # Return a default response when blocked
-            return ModelResponse(
+            # Not a vote: excluded from consensus and only negative-cached, so it is retried later
+            error_response = ModelResponse(
                 model="gemini-2.5-pro",
                 answer="A",  # Default answer
-                confidence=0,  # Low confidence due to blocking
-                raw=f"Response blocked by safety filters (finish_reason: {finish_reason})",
-                reasoning="Content blocked by safety filters"
+                confidence=1,  # Lowest confidence, no answer given
+                raw=f"No answer in Gemini response (finish_reason: {finish_reason})",
+                reasoning="Error: Gemini response was blocked or empty",
+                error=True
             )
+            add_to_cache("gemini", cache_key, error_response)
+            return error_response
         
-        response_content = response.text
-        answer, confidence, reasoning = parse_answer_response(response_content, "gemini-2.5-pro")
-        
-        result = ModelResponse(
-            model="gemini-2.5-pro",
-            answer=answer,
-            confidence=confidence,
-            raw=response_content,
-            reasoning=reasoning
-        )
+        result = build_model_response("gemini-2.5-pro", response_content)
         
         # Cache the successful response
-        add_to_cache("gemini", cache_key, result)
+        add_to_cache(
+            "gemini", cache_key, result, GEMINI_PROMPT.prompt_hash,
+            getattr(response, 'model_version', None), int(elapsed_time * 1000), difficulty.variant
+        )
         return result
         
+    except (AdmissionRejected, ProviderUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Error getting Gemini answer: {e}")
-        # Return error response instead of raising exception
-        return ModelResponse(
+        # Return error response instead of raising exception (briefly negative-cached)
+        error_response = ModelResponse(
             model="gemini-2.5-pro",
             answer="B",  # Arbitrary fallback answer (different from OpenAI)
             confidence=1,  # Minimum confidence for failed request
@@ -262,78 +129,41 @@ async def get_gemini_answer(question: str, options: List[str]) -> ModelResponse:
             reasoning="Error: Gemini model failed to respond",
             error=True
         )
+        add_to_cache("gemini", cache_key, error_response)
+        return error_response
 
 
 async def get_xai_answer(question: str, options: List[str]) -> ModelResponse:
     """Get answer from xAI Grok"""
-    # Check cache first
-    cache_key = create_cache_key(question, options)
-    cached_response = get_from_cache("xai", cache_key)
-    if cached_response:
-        logger.debug("Returning cached xAI response")
-        return cached_response
-    
-    try:
-        formatted_options = []
-        for i, option in enumerate(options):
-            letter = chr(65 + i)  # A, B, C, D
-            formatted_options.append(f"{letter}. {option}")
-        
-        options_text = "\n".join(formatted_options)
-        
-        prompt = f"""You are an expert quiz assistant. Analyze this question carefully and provide the best answer.
-
-            Question: {question}
-
-            Options:
-            {options_text}
+    return await get_result("xai", _fetch_xai_answer, question, options)
 
-            Instructions:
-            1. Think through each option systematically
-            2. Choose the most accurate answer
-            3. Provide your confidence level (1-10)
-
-            Format your response as:
-            Answer: [A/B/C/D]
-            Confidence: [1-10]
-            Reasoning: [Brief explanation]"""
 
+async def _fetch_xai_answer(question: str, options: List[str], cache_key: str) -> ModelResponse:
+    """Call xAI Grok and cache the result"""
+    try:
         xai_client = get_xai_client()
         
-        response = await xai_client.chat.completions.create(
+        result = await complete_chat_answer(
+            xai_client, "xai", cache_key, "grok-4", XAI_PROMPT.prompt_hash,
             model="grok-4",
-            messages=[
-                {"role": "system", "content": "You are a highly accurate quiz assistant. Always provide clear, confident answers in the requested format."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0.1
+            messages=XAI_PROMPT.messages(question, options),
+            temperature=0.1,
+            **XAI_PROMPT.chat_params()
         )
 
         logger.info(100*"-")
         logger.info("Received response from xAI Grok model")
-        logger.info(f"xAI response content: {response}")
+        logger.info(f"xAI response content: {result.raw}")
         logger.info(100*"-")
         
-        response_content = response.choices[0].message.content
-        answer, confidence, reasoning = parse_answer_response(response_content, "grok-4")
-        
-        result = ModelResponse(
-            model="grok-4",
-            answer=answer,
-            confidence=confidence,
-            raw=response_content,
-            reasoning=reasoning
-        )
-        
-        # Cache the successful response
-        add_to_cache("xai", cache_key, result)
         return result
         
+    except (AdmissionRejected, ProviderUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Error getting xAI answer: {e}")
-        # Return error response instead of raising exception
-        return ModelResponse(
+        # Return error response instead of raising exception (briefly negative-cached)
+        error_response = ModelResponse(
             model="grok-4",
             answer="C",  # Arbitrary fallback answer (different from others)
             confidence=1,  # Minimum confidence for failed request
@@ -341,167 +171,167 @@ async def get_xai_answer(question: str, options: List[str]) -> ModelResponse:
             reasoning="Error: xAI Grok model failed to respond",
             error=True
         )
-
-
-def analyze_model_responses(model_responses: List[ModelResponse]) -> MultiModelAnalysis:
-    """Analyze responses from multiple models to determine consensus and confidence"""
-    try:
-        answers = [resp.answer for resp in model_responses]
-        confidences = [resp.confidence for resp in model_responses]
-        
-        avg_confidence = sum(confidences) / len(confidences)
-        
-        unique_answers = list(set(answers))
-        consensus = len(unique_answers) == 1
-        
-        if consensus:
-            consensus_answer = unique_answers[0]
-            conflicting_answers = []
-        else:
-            consensus_answer = None
-            conflicting_answers = unique_answers
-        
-        return MultiModelAnalysis(
-            consensus=consensus,
-            consensus_answer=consensus_answer,
-            avg_confidence=round(avg_confidence, 1),
-            conflicting_answers=conflicting_answers,
-            ai_model_responses=model_responses
-        )
-        
-    except Exception as e:
-        logger.error(f"Error analyzing model responses: {e}")
-        return MultiModelAnalysis(
-            consensus=False,
-            consensus_answer=None,
-            avg_confidence=5.0,
-            conflicting_answers=[resp.answer for resp in model_responses],
-            ai_model_responses=model_responses
-        )
-
-
-async def get_multi_model_answer(question: str, options: List[str]) -> AnswerResponse:
-    """Get answers from multiple AI models and analyze consensus"""
+        add_to_cache("xai", cache_key, error_response)
+        return error_response
+
+
+# Model reported for each leg
+LEG_MODEL_NAMES = {"openai": "gpt-4.1", "gemini": "gemini-2.5-pro", "xai": "grok-4"}
+
+# Provider fetch per configurable model leg (settings.consensus_models, settings.ensemble_profiles)
+MODEL_LEGS = {
+    "openai": fetch_openai_result,
+    "gemini": _fetch_gemini_answer,
+    "xai": _fetch_xai_answer,
+}
+register_leg("gemini", _fetch_gemini_answer)
+register_leg("xai", _fetch_xai_answer)
+
+
+def resolve_models(models: Optional[List[str]] = None, profile: Optional[str] = None) -> List[str]:
+    """
+    Model legs for a request: an explicit list, a named profile (settings.ensemble_profiles),
+    or settings.consensus_models when neither is given. Raises ValueError for unknown names.
+    """
+    if models and profile:
+        raise ValueError("Give either models or profile, not both")
+    if profile:
+        if profile not in settings.ensemble_profiles:
+            raise ValueError(f"Unknown profile '{profile}' (known: {', '.join(settings.ensemble_profiles)})")
+        models = settings.ensemble_profiles[profile]
+    names = list(dict.fromkeys(name.lower() for name in (models or settings.consensus_models)))
+    unknown = [name for name in names if name not in MODEL_LEGS]
+    if unknown:
+        raise ValueError(f"Unknown model(s) {', '.join(unknown)} (known: {', '.join(MODEL_LEGS)})")
+    return names
+
+
+def analyze_model_responses(vote: VoteResult, model_responses: Dict[str, ModelResponse],
+                            skipped_models: Optional[List[str]] = None) -> MultiModelAnalysis:
+    """Summarize a weighted vote over model responses (see services.consensus)"""
+    responses = list(model_responses.values())
+    confidences = [resp.confidence for resp in responses if not resp.error]
+    avg_confidence = sum(confidences) / len(confidences) if confidences else 1.0
+    
+    return MultiModelAnalysis(
+        consensus=vote.consensus,
+        consensus_answer=vote.answer if vote.consensus else None,
+        avg_confidence=round(avg_confidence, 1),
+        conflicting_answers=[] if vote.consensus else vote.conflicting_answers,
+        ai_model_responses=responses,
+        consensus_probability=round(vote.probability, 4),
+        answer_probabilities=vote.probabilities or None,
+        votes=vote.votes,
+        skipped_models=skipped_models or []
+    )
+
+
+async def get_multi_model_answer(question: str, options: List[str], topic: Optional[str] = None,
+                                 models: Optional[List[str]] = None) -> AnswerResponse:
+    """
+    Get answers from multiple AI models and combine them with a weighted, calibrated vote
+    models: legs to ask (see resolve_models); each leg answers from its own cache when it can,
+    so any subset of models that was asked before is served without provider calls
+    """
     try:
         logger.info(f"Processing multi-model question: {question[:50]}...")
         
-        # Get responses from all models in parallel
-        tasks = [
-            get_openai_answer(question, options),
-            get_gemini_answer(question, options),
-            # get_xai_answer(question, options)
-        ]
-        
-        # Execute all tasks and handle exceptions gracefully
-        model_responses = await asyncio.gather(*tasks, return_exceptions=False)
-        
-        # All responses should now be ModelResponse objects (including error responses)
-        valid_responses = [resp for resp in model_responses if isinstance(resp, ModelResponse)]
-        error_responses = [resp for resp in valid_responses if getattr(resp, 'error', False)]
-        successful_responses = [resp for resp in valid_responses if not getattr(resp, 'error', False)]
+        model_names = resolve_models(models)
+        
+        # Models with a poor feedback record on this topic are not asked at all
+        model_names, routed_out = feedback_store.route(model_names, topic)
+        
+        # Legs already answered in any mode vote for free; only the missing ones are fetched
+        cache_key = create_cache_key(question, options)
+        cached = lookup_results(model_names, question, options, cache_key)
+        unavailable: List[ProviderUnavailable] = []
+        
+        async def ask_leg(name: str) -> ModelResponse:
+            try:
+                return await fetch_result(name, MODEL_LEGS[name], question, options, cache_key)
+            except ProviderUnavailable as e:
+                # Open circuit: counts as a failed vote but is not stored as this question's answer
+                unavailable.append(e)
+                return ModelResponse(model=LEG_MODEL_NAMES[name], answer="A", confidence=1, raw=f"{name} unavailable: {e}",
+                                     reasoning=f"Error: {name} is temporarily unavailable", error=True)
+        
+        legs = [(name, functools.partial(ask_leg, name)) for name in model_names if name not in cached]
+        
+        # Quorum first; remaining models only while the vote is uncertain
+        vote, model_responses, skipped_models = await run_quorum(legs, len(options), known=cached)
+        skipped_models = routed_out + skipped_models
+        if unavailable and len(unavailable) == len(model_responses):
+            # Nothing but open circuits: report the outage (503) rather than an all-error vote
+            raise unavailable[0]
+        cache_hits = {name: name in cached for name in model_responses}
+        logger.info(f"Multi-model legs cached: {[n for n, hit in cache_hits.items() if hit] or 'none'}, "
+                    f"fetched: {[n for n, hit in cache_hits.items() if not hit] or 'none'}")
+        
+        valid_responses = list(model_responses.values())
+        error_responses = [resp for resp in valid_responses if resp.error]
+        successful_responses = [resp for resp in valid_responses if not resp.error]
         
         logger.info(f"Multi-model results: {len(successful_responses)} successful, {len(error_responses)} errors")
         
-        if not valid_responses:
-            logger.error("No valid responses from any AI models")
-            # This should not happen with the new error handling, but keeping as fallback
-            return AnswerResponse(
-                answer="A",
-                confidence=1,
-                raw="All AI models failed to respond. This is a fallback answer.",
-                model="fallback",
-                consensus=False,
-                individual_answers={}
-            )
+        analysis = analyze_model_responses(vote, model_responses, skipped_models)
+        analysis.cached_models = [name for name, hit in cache_hits.items() if hit]
+        note_vote_outcome(cache_key, len(vote.conflicting_answers) > 1)
         
-        # Modified consensus analysis: If ANY model fails, consensus is automatically FALSE
-        if error_responses:
-            # Force consensus to False when any model fails
-            consensus_result = False
-            consensus_answer = None
-            logger.info(f"Consensus set to False due to {len(error_responses)} failed model(s)")
-        else:
-            # Only analyze consensus when all models are successful
-            analysis = analyze_model_responses(successful_responses)
-            consensus_result = analysis.consensus
-            consensus_answer = analysis.consensus_answer
-        
-        # Determine primary answer and confidence
-        primary_reasoning = ""
-        if successful_responses and consensus_result and not error_responses:
-            # True consensus only when all models succeed and agree
-            analysis = analyze_model_responses(successful_responses)
-            primary_answer = analysis.consensus_answer
-            primary_confidence = int(round(analysis.avg_confidence))
-            highlight_type = "single"
-            raw_response = f"Consensus achieved: {analysis.consensus_answer} (Average confidence: {analysis.avg_confidence})"
-            # Combine reasoning from successful models for consensus
-            reasoning_parts = [resp.reasoning for resp in successful_responses if resp.reasoning and resp.reasoning != "No reasoning provided" and not resp.reasoning.startswith("Error:")]
-            primary_reasoning = " | ".join(reasoning_parts[:2]) if reasoning_parts else "All models agree on this answer"
-        else:
-            # No consensus due to model failures or answer conflicts
-            # Analyze all available responses to get statistics
-            analysis = analyze_model_responses(valid_responses)
-            
-            # Use highest confidence answer as primary (prefer successful responses)
-            if successful_responses:
-                highest_conf_response = max(successful_responses, key=lambda x: x.confidence)
-            else:
-                highest_conf_response = max(valid_responses, key=lambda x: x.confidence)
-            primary_answer = highest_conf_response.answer
-            primary_confidence = int(round(analysis.avg_confidence))
-            primary_reasoning = highest_conf_response.reasoning or "Selected highest confidence answer from available models"
+        if vote.answer is None:
+            # Every model failed: no evidence to vote on
+            logger.error("No valid responses from any AI models")
+            primary_answer = max(valid_responses, key=lambda x: x.confidence).answer
+            primary_confidence = 1
+            primary_reasoning = "Selected highest confidence answer from available models"
             highlight_type = "multiple"
-            
-            # Build descriptive raw response
-            if error_responses and successful_responses:
-                # Mixed success/failure scenario
-                raw_response = f"No consensus: {len(error_responses)} model(s) failed, remaining models disagree"
-            elif error_responses:
-                # All models failed scenario
-                raw_response = f"No consensus: All {len(error_responses)} model(s) failed"
+            raw_response = f"No consensus: All {len(error_responses)} model(s) failed"
+        else:
+            primary_answer = vote.answer
+            primary_confidence = min(10, max(1, int(round(vote.probability * 10))))
+            supporters = [resp for resp in successful_responses if resp.answer == vote.answer]
+            if vote.consensus:
+                highlight_type = "single"
+                raw_response = f"Consensus achieved: {vote.answer} (Probability: {vote.probability:.2f})"
+                # Combine reasoning from the models that voted for the answer
+                reasoning_parts = [resp.reasoning for resp in supporters if resp.reasoning and resp.reasoning != "No reasoning provided" and not resp.reasoning.startswith("Error:")]
+                primary_reasoning = " | ".join(reasoning_parts[:2]) if reasoning_parts else "All models agree on this answer"
             else:
-                # All models succeeded but disagree
-                raw_response = f"No consensus: Models disagree - {', '.join(analysis.conflicting_answers)} (Average confidence: {analysis.avg_confidence})"
+                highlight_type = "multiple"
+                primary_reasoning = max(supporters, key=lambda x: x.confidence).reasoning or "Selected most probable answer from available models"
+                if error_responses:
+                    raw_response = f"No consensus: {len(error_responses)} model(s) failed, remaining evidence is not conclusive (Probability: {vote.probability:.2f})"
+                else:
+                    raw_response = f"No consensus: Models disagree - {', '.join(vote.conflicting_answers)} (Probability of {vote.answer}: {vote.probability:.2f})"
         
-        logger.info(f"Multi-model analysis complete: {len(successful_responses)} successful, {len(error_responses)} errors, Consensus: {consensus_result}")
+        logger.info(f"Multi-model analysis complete: {len(successful_responses)} successful, {len(error_responses)} errors, "
+                    f"Consensus: {vote.consensus} (p={vote.probability:.2f}, skipped: {skipped_models or 'none'})")
         
         # Create individual_answers dictionary for the extension
         individual_answers = {}
-        for resp in valid_responses:
+        for name, resp in model_responses.items():
             individual_answers[resp.model] = {
                 "answer": resp.answer,
                 "confidence": resp.confidence,
                 "reasoning": resp.reasoning or "No reasoning provided",
-                "error": getattr(resp, 'error', False)
+                "error": resp.error,
+                "cached": cache_hits[name]
             }
         
-        # Create analysis object for response (use consensus_result)
-        if error_responses:
-            # When any model fails, create a modified analysis that reflects no consensus
-            final_analysis = MultiModelAnalysis(
-                consensus=False,
-                consensus_answer=None,
-                avg_confidence=analysis.avg_confidence if 'analysis' in locals() else 1.0,
-                conflicting_answers=list(set([resp.answer for resp in valid_responses])),
-                ai_model_responses=valid_responses
-            )
-        else:
-            # Use the original analysis when all models succeed
-            final_analysis = analysis
-        
         return AnswerResponse(
             answer=primary_answer,
             confidence=primary_confidence,
             raw=raw_response,
             reasoning=primary_reasoning,
             model="multi-model",
-            multi_model_analysis=final_analysis,
+            multi_model_analysis=analysis,
             highlight_type=highlight_type,
-            consensus=consensus_result,  # Use the forced consensus result
-            individual_answers=individual_answers
+            consensus=vote.consensus,
+            individual_answers=individual_answers,
+            cache_hits=cache_hits
         )
         
+    except (AdmissionRejected, ProviderUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Error in multi-model processing: {e}")
         raise HTTPException(status_code=500, detail=f"Multi-model service error: {str(e)}")
@@ -0,0 +1,128 @@
+"""
+On-demand stack-sampling profiler
+A sampler thread reads every thread's current stack (sys._current_frames) at a fixed rate for the
+requested duration and aggregates identical stacks. Nothing runs between profiles, so the idle
+overhead is zero; while sampling, the cost is one stack walk per thread per interval.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+class ProfileResult:
+    """Aggregated samples: collapsed stack -> number of samples it was seen in"""
+
+    def __init__(self, stacks: Counter, samples: int, duration: float, interval: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+        self.interval = interval
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format (flamegraph.pl, speedscope, inferno)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 30) -> List[dict]:
+        """Functions by self samples (innermost frame) with their inclusive total"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]  # first element is the thread name
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return [
+            {
+                "function": frame,
+                "self": count,
+                "self_percent": round(100.0 * count / self.samples, 1) if self.samples else 0.0,
+                "total": total[frame],
+                "total_percent": round(100.0 * total[frame] / self.samples, 1) if self.samples else 0.0
+            }
+            for frame, count in own.most_common(limit)
+        ]
+
+    def to_dict(self, limit: int = 30) -> dict:
+        return {
+            "duration": round(self.duration, 3),
+            "interval": self.interval,
+            "samples": self.samples,
+            "top_functions": self.top_functions(limit),
+            "stacks": dict(self.stacks.most_common())
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Runs one sampling session at a time"""
+
+    def __init__(self, interval: float = settings.profiler_interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float, loop_thread_only: bool = False,
+            loop_thread_id: Optional[int] = None) -> ProfileResult:
+        """Sample stacks for `seconds` (blocking; call from a worker thread)"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            return self._sample(seconds, loop_thread_only, loop_thread_id)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, loop_thread_only: bool,
+                loop_thread_id: Optional[int]) -> ProfileResult:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        names: Dict[int, str] = {}
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_tick = started
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_tick:
+                time.sleep(next_tick - now)
+            next_tick += self.interval
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me or (loop_thread_only and thread_id != loop_thread_id):
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                parts = []
+                while frame is not None:
+                    parts.append(_frame_label(frame))
+                    frame = frame.f_back
+                parts.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(parts))] += 1
+            samples += 1
+
+        duration = time.perf_counter() - started
+        logger.info(f"🔬 Profile finished: {samples} samples over {duration:.1f}s, {len(stacks)} distinct stacks")
+        return ProfileResult(stacks, samples, duration, self.interval)
+
+
+# Global profiler used by /debug/profile
+profiler = SamplingProfiler()
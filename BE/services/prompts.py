@@ -0,0 +1,186 @@
+"""
+Compiled provider prompts
+Templates are normalized once at import (source indentation stripped, blank-line runs collapsed)
+and ordered static-first: system text and instructions form an identical prefix for every call,
+and only the question and options at the end vary. Each prompt also carries the output budget
+(max tokens) that the three-line answer format needs.
+"""
+
+import re
+import logging
+import functools
+import textwrap
+from typing import List, Optional, Tuple
+
+from config import settings
+from services.cache_service import create_prompt_hash
+from services.metrics import metrics
+
+# Optional exact tokenizer (falls back to a local estimate when not installed)
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Provider prefix-cache affinity: requests carrying the same key are routed to the same cache
+AFFINITY_PROMPT_CACHE_KEY = "prompt_cache_key"  # OpenAI request parameter
+AFFINITY_CONVERSATION_HEADER = "x-grok-conv-id"  # xAI request header
+
+# Estimator units: words, punctuation marks, line breaks with their indentation, runs of spaces
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\s*\n[ \t]*|[ \t]{2,}")
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    """o200k_base (the GPT-4.1 encoding) when tiktoken and its data file are available"""
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # The encoding file is downloaded on first use; offline, fall back to the estimate
+            _encoding_failed = True
+            logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text: exact with tiktoken, otherwise a local estimate (within ~10% for English prose)"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def tokenizer_name() -> str:
+    return "tiktoken o200k_base" if _get_encoding() is not None else "local estimate"
+
+
+def compile_text(text: str) -> str:
+    """Strip indentation and trailing spaces from every line and collapse runs of blank lines"""
+    lines = [line.strip() for line in textwrap.dedent(text).strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def format_options(options: List[str]) -> str:
+    """Format options as lettered lines (A. ..., B. ...)"""
+    return "\n".join(f"{chr(65 + i)}. {option}" for i, option in enumerate(options))
+
+
+class CompiledPrompt:
+    """One provider prompt: static prefix (system + instructions) followed by the question"""
+
+    def __init__(self, instructions: str, system: Optional[str] = None,
+                 max_output_tokens: Optional[int] = None, stop: Optional[List[str]] = None,
+                 affinity: Optional[str] = None):
+        self.system = compile_text(system) if system else None
+        self.instructions = compile_text(instructions)
+        self.max_output_tokens = max_output_tokens
+        self.stop = stop
+        self.affinity = affinity
+        # Stored with every cached answer so a prompt change can be invalidated selectively
+        self.prompt_hash = create_prompt_hash(*filter(None, (self.system, self.instructions)))
+        # Same static prefix, same key: lets the provider send every call to the shard holding the prefix
+        self.cache_key = f"quiz-{self.prompt_hash[:16]}"
+
+    @functools.cached_property
+    def static_tokens(self) -> int:
+        """Tokens in the static prefix (counted on first use, not at import)"""
+        return count_tokens(self.system or "") + count_tokens(self.instructions)
+
+    def user_text(self, question: str, options: List[str]) -> str:
+        return f"{self.instructions}\n\nQuestion: {question.strip()}\n\nOptions:\n{format_options(options)}"
+
+    def messages(self, question: str, options: List[str]) -> List[dict]:
+        """Chat messages for OpenAI-compatible APIs"""
+        messages = [{"role": "system", "content": self.system}] if self.system else []
+        messages.append({"role": "user", "content": self.user_text(question, options)})
+        return messages
+
+    def chat_params(self) -> dict:
+        """Output budget parameters for a chat completion"""
+        params = {"max_tokens": self.max_output_tokens} if self.max_output_tokens else {}
+        if self.stop:
+            params["stop"] = self.stop
+        if self.affinity == AFFINITY_PROMPT_CACHE_KEY:
+            params["prompt_cache_key"] = self.cache_key
+        elif self.affinity == AFFINITY_CONVERSATION_HEADER:
+            params["extra_headers"] = {AFFINITY_CONVERSATION_HEADER: self.cache_key}
+        return params
+
+    def input_tokens(self, question: str, options: List[str]) -> int:
+        return count_tokens(self.system or "") + count_tokens(self.user_text(question, options))
+
+
+SYSTEM_PROMPT = "You are a highly accurate quiz assistant. Always provide clear, confident answers in the requested format."
+
+QUIZ_INSTRUCTIONS = """
+    Analyze the question below carefully and think through each option systematically.
+    Choose the most accurate answer and rate your confidence from 1 to 10.
+
+    Reply with exactly these three lines and nothing else:
+    Answer: [A/B/C/D]
+    Confidence: [1-10]
+    Reasoning: [One brief sentence]
+"""
+
+GEMINI_INSTRUCTIONS = """
+    Analyze the educational quiz question below and select the most accurate answer.
+    Give your selected answer, your confidence (1-10 scale) and brief reasoning.
+
+    Reply with exactly these three lines and nothing else:
+    Answer: [A/B/C/D]
+    Confidence: [1-10]
+    Reasoning: [One brief sentence]
+"""
+
+# GPT-4.1 (single-model and consensus calls share the prompt and the cache). No stop sequence:
+# models sometimes put a blank line between the Answer and Confidence lines, and a "\n\n" stop
+# would cut the confidence off; the token cap already ends any extra text after the reasoning
+OPENAI_PROMPT = CompiledPrompt(QUIZ_INSTRUCTIONS, SYSTEM_PROMPT, settings.answer_max_tokens,
+                               affinity=AFFINITY_PROMPT_CACHE_KEY if settings.prompt_cache_affinity else None)
+
+# grok-4 is a reasoning model: it rejects stop sequences and its reasoning tokens count against
+# max_tokens, so it keeps the previous budget
+XAI_PROMPT = CompiledPrompt(QUIZ_INSTRUCTIONS, SYSTEM_PROMPT, 150,
+                            affinity=AFFINITY_CONVERSATION_HEADER if settings.prompt_cache_affinity else None)
+
+# Gemini thinking tokens count against max_output_tokens, so the cap is added per call on top of
+# the thinking budget (see gemini_output_limit). Gemini 2.5 caches shared prefixes implicitly;
+# explicit CachedContent needs a far longer prefix (thousands of tokens) than this prompt has.
+GEMINI_PROMPT = CompiledPrompt(GEMINI_INSTRUCTIONS)
+
+
+def gemini_output_limit(thinking_budget: int) -> Optional[int]:
+    """max_output_tokens for a Gemini call: thinking budget plus the answer budget (None when dynamic)"""
+    if thinking_budget < 0:
+        return None
+    return thinking_budget + settings.answer_max_tokens
+
+
+def chat_usage(usage) -> Optional[Tuple[int, int, int]]:
+    """(prompt, cached prompt, completion) tokens from an OpenAI-compatible usage object"""
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return usage.prompt_tokens or 0, getattr(details, "cached_tokens", None) or 0, usage.completion_tokens or 0
+
+
+def gemini_usage(usage_metadata) -> Optional[Tuple[int, int, int]]:
+    """(prompt, cached prompt, completion incl. thinking) tokens from Gemini usage metadata"""
+    if usage_metadata is None:
+        return None
+    return (
+        usage_metadata.prompt_token_count or 0,
+        usage_metadata.cached_content_token_count or 0,
+        (usage_metadata.candidates_token_count or 0) + (usage_metadata.thoughts_token_count or 0)
+    )
+
+
+def record_usage(provider: str, counts: Optional[Tuple[int, int, int]], seconds: Optional[float] = None) -> None:
+    """Add a call's token usage (and prefix-cached vs. uncached latency) to /metrics"""
+    if counts is not None:
+        metrics.record_tokens(provider, *counts, seconds=seconds)
@@ -0,0 +1,373 @@
+"""
+Provider traffic recording and replay
+The recorder wraps the provider clients from ai_clients and appends one compact JSON line per
+call (prompt, response, latency, streamed chunk timings, errors) to a size-rotated log. The
+replay clients serve those recordings back with the original timing, optionally accelerated,
+so the whole service can be benchmarked or load-tested against realistic provider behavior
+without network access.
+"""
+
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from types import SimpleNamespace
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from services.prompts import chat_usage, gemini_usage
+
+logger = logging.getLogger(__name__)
+
+RECORDING_FILE = "provider-calls.jsonl"
+
+
+class ReplayMiss(Exception):
+    """Raised in strict replay mode when no recording matches a call"""
+
+
+class ReplayedProviderError(Exception):
+    """A provider error replayed from a recording"""
+
+
+def request_key(provider: str, model: str, prompt: Any) -> str:
+    """Stable key for a call: provider, model and prompt (messages or contents)"""
+    payload = json.dumps([provider, model, prompt], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ProviderRecorder:
+    """
+    Appends call records to a rotating JSONL log (thread-safe; Gemini calls run in worker threads)
+
+    One line per call: {"t", "p" (provider), "k" (request key), "m" (model), "in" (prompt),
+    "lat" (seconds until the call returned), "out" (text), "mid" (model id), and optionally
+    "hdr" (seconds until a stream opened), "ch" ([offset, text] per streamed chunk),
+    "u" ([prompt, cached prompt, completion] tokens), "fr" (finish reason), "err" (error message)}.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = settings.provider_record_max_bytes,
+                 backups: int = settings.provider_record_backups):
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(path / RECORDING_FILE, maxBytes=max_bytes, backupCount=backups,
+                                      encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        # Used directly rather than through a logger, so application log levels and handlers never apply
+        self._handler = handler
+        self.path = path
+        self.records = 0
+
+    def write(self, record: dict) -> None:
+        try:
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+            self._handler.handle(logging.makeLogRecord({"msg": line}))
+            self.records += 1
+        except Exception as e:
+            logger.warning(f"Failed to record provider call: {e}")
+
+
+def _round(seconds: float) -> float:
+    return round(seconds, 3)
+
+
+class _RecordingStream:
+    """Passes a chat completion stream through while noting each chunk's text and arrival time"""
+
+    def __init__(self, stream, record: dict, started: float, recorder: ProviderRecorder):
+        self._stream = stream
+        self._record = record
+        self._started = started
+        self._recorder = recorder
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        chunks: List[list] = []
+        try:
+            async for chunk in self._stream:
+                self._record["mid"] = self._record.get("mid") or getattr(chunk, "model", None)
+                if getattr(chunk, "usage", None):
+                    self._record["u"] = chat_usage(chunk.usage)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    chunks.append([_round(time.perf_counter() - self._started), delta])
+                yield chunk
+        except Exception as e:
+            self._record["err"] = str(e)
+            raise
+        finally:
+            self._record["lat"] = _round(time.perf_counter() - self._started)
+            self._record["ch"] = chunks
+            self._record["out"] = "".join(text for _, text in chunks)
+            self._recorder.write(self._record)
+
+
+class _RecordingCompletions:
+    def __init__(self, completions, provider: str, recorder: ProviderRecorder):
+        self._completions = completions
+        self._provider = provider
+        self._recorder = recorder
+
+    async def create(self, **kwargs):
+        model, messages = kwargs.get("model"), kwargs.get("messages")
+        record = {"t": time.time(), "p": self._provider, "k": request_key(self._provider, model, messages),
+                  "m": model, "in": messages}
+        started = time.perf_counter()
+        try:
+            response = await self._completions.create(**kwargs)
+        except Exception as e:
+            record.update(lat=_round(time.perf_counter() - started), err=str(e))
+            self._recorder.write(record)
+            raise
+        if kwargs.get("stream"):
+            record["hdr"] = _round(time.perf_counter() - started)
+            return _RecordingStream(response, record, started, self._recorder)
+        record.update(lat=_round(time.perf_counter() - started), out=response.choices[0].message.content,
+                      mid=response.model, u=chat_usage(getattr(response, "usage", None)))
+        self._recorder.write(record)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class RecordingOpenAIClient:
+    """OpenAI-compatible client (OpenAI, xAI) whose chat completions are recorded"""
+
+    def __init__(self, client, provider: str, recorder: ProviderRecorder):
+        self._client = client
+        self.chat = SimpleNamespace(completions=_RecordingCompletions(client.chat.completions, provider, recorder))
+
+    def __getattr__(self, name):
+        # Files and Batch API calls pass through unrecorded
+        return getattr(self._client, name)
+
+
+class _RecordingGeminiModels:
+    def __init__(self, models, provider: str, recorder: ProviderRecorder):
+        self._models = models
+        self._provider = provider
+        self._recorder = recorder
+
+    def generate_content(self, *, model: str, contents: Any, **kwargs):
+        record = {"t": time.time(), "p": self._provider, "k": request_key(self._provider, model, contents),
+                  "m": model, "in": contents}
+        started = time.perf_counter()
+        try:
+            response = self._models.generate_content(model=model, contents=contents, **kwargs)
+        except Exception as e:
+            record.update(lat=_round(time.perf_counter() - started), err=str(e))
+            self._recorder.write(record)
+            raise
+        candidate = response.candidates[0] if response.candidates else None
+        blocked = candidate is None or not candidate.content or not candidate.content.parts
+        record.update(
+            lat=_round(time.perf_counter() - started),
+            out=None if blocked else response.text,
+            mid=getattr(response, "model_version", None),
+            u=gemini_usage(getattr(response, "usage_metadata", None)),
+            fr=str(candidate.finish_reason) if candidate is not None and candidate.finish_reason else None
+        )
+        self._recorder.write(record)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class RecordingGeminiClient:
+    """Gemini client whose generate_content calls are recorded"""
+
+    def __init__(self, client, provider: str, recorder: ProviderRecorder):
+        self._client = client
+        self.models = _RecordingGeminiModels(client.models, provider, recorder)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class ReplayStore:
+    """
+    Recorded calls indexed by request key
+
+    Repeated calls with the same key cycle through that key's recordings in order. A call with no
+    recording gets a deterministic pick among the provider's other recordings (its answer will not
+    fit the question, but the timing and failure behavior are real), or ReplayMiss when strict.
+    """
+
+    def __init__(self, directory: str, speed: float = settings.provider_replay_speed,
+                 strict: bool = settings.provider_replay_strict):
+        self.speed = speed
+        self.strict = strict
+        self._by_key: Dict[Tuple[str, str], List[dict]] = {}
+        self._by_provider: Dict[str, List[dict]] = {}
+        self._cursors: Dict[Tuple[str, str], int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load(Path(directory))
+
+    def _load(self, directory: Path) -> None:
+        # Rotated files hold older calls: provider-calls.jsonl.5 ... .1, then the live file
+        files = sorted(directory.glob(f"{RECORDING_FILE}*"),
+                       key=lambda path: -int(path.suffix[1:]) if path.suffix[1:].isdigit() else 0)
+        for path in files:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by a crash
+                    self._by_key.setdefault((record["p"], record["k"]), []).append(record)
+                    self._by_provider.setdefault(record["p"], []).append(record)
+        total = sum(len(records) for records in self._by_provider.values())
+        logger.info(f"📼 Loaded {total} recorded provider calls from {directory} "
+                    f"({', '.join(f'{p}: {len(r)}' for p, r in self._by_provider.items()) or 'none'})")
+
+    def pick(self, provider: str, key: str) -> dict:
+        records = self._by_key.get((provider, key))
+        if records:
+            self.hits += 1
+            cursor = self._cursors.get((provider, key), 0)
+            self._cursors[(provider, key)] = cursor + 1
+            return records[cursor % len(records)]
+        self.misses += 1
+        candidates = self._by_provider.get(provider)
+        if self.strict or not candidates:
+            raise ReplayMiss(f"No recorded {provider} call for request {key}")
+        return candidates[int(key, 16) % len(candidates)]
+
+    def scaled(self, seconds: Optional[float]) -> float:
+        if not seconds or self.speed <= 0:
+            return 0.0
+        return seconds / self.speed
+
+    def stats(self) -> dict:
+        return {
+            "recordings": {provider: len(records) for provider, records in self._by_provider.items()},
+            "speed": self.speed,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+def _chat_chunk(model_id: Optional[str], text: str):
+    return SimpleNamespace(model=model_id, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+def _chat_usage(record: dict):
+    if not record.get("u"):
+        return None
+    prompt, cached, completion = record["u"]
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion,
+                           prompt_tokens_details=SimpleNamespace(cached_tokens=cached))
+
+
+class _ReplayCompletions:
+    def __init__(self, provider: str, store: ReplayStore):
+        self._provider = provider
+        self._store = store
+
+    async def create(self, *, model: str, messages: Any, stream: bool = False, **kwargs):
+        record = self._store.pick(self._provider, request_key(self._provider, model, messages))
+        chunks = record.get("ch")
+        if chunks is None:
+            # Recorded without streaming: the whole text arrives at once
+            chunks = [[record["lat"], record["out"]]] if record.get("out") is not None else []
+
+        if not stream:
+            await asyncio.sleep(self._store.scaled(record["lat"]))
+            if record.get("err"):
+                raise ReplayedProviderError(record["err"])
+            text = "".join(text for _, text in chunks)
+            return SimpleNamespace(model=record.get("mid") or model, usage=_chat_usage(record), choices=[
+                SimpleNamespace(index=0, message=SimpleNamespace(role="assistant", content=text), finish_reason="stop")
+            ])
+
+        opened_at = record.get("hdr", chunks[0][0] if chunks else record["lat"])
+        await asyncio.sleep(self._store.scaled(opened_at))
+        if record.get("err") and not chunks:
+            raise ReplayedProviderError(record["err"])
+        include_usage = bool((kwargs.get("stream_options") or {}).get("include_usage"))
+        return self._replay_stream(record, chunks, opened_at, include_usage)
+
+    async def _replay_stream(self, record: dict, chunks: List[list], elapsed: float, include_usage: bool):
+        for offset, text in chunks:
+            await asyncio.sleep(self._store.scaled(offset - elapsed))
+            elapsed = max(elapsed, offset)
+            yield _chat_chunk(record.get("mid"), text)
+        if record.get("err"):
+            raise ReplayedProviderError(record["err"])
+        if include_usage:
+            # Like the real API: a final chunk with no choices carries the usage
+            yield SimpleNamespace(model=record.get("mid"), choices=[], usage=_chat_usage(record))
+
+
+class ReplayOpenAIClient:
+    """Stands in for an OpenAI-compatible client, answering chat completions from recordings"""
+
+    def __init__(self, provider: str, store: ReplayStore):
+        self.chat = SimpleNamespace(completions=_ReplayCompletions(provider, store))
+
+
+class _ReplayGeminiModels:
+    def __init__(self, provider: str, store: ReplayStore):
+        self._provider = provider
+        self._store = store
+
+    def generate_content(self, *, model: str, contents: Any, **kwargs):
+        # Called through asyncio.to_thread like the real SDK, so a blocking sleep is fine here
+        record = self._store.pick(self._provider, request_key(self._provider, model, contents))
+        time.sleep(self._store.scaled(record["lat"]))
+        if record.get("err"):
+            raise ReplayedProviderError(record["err"])
+        text = record.get("out")
+        parts = [SimpleNamespace(text=text)] if text is not None else []
+        prompt, cached, completion = record.get("u") or (0, 0, 0)
+        return SimpleNamespace(
+            candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts), finish_reason=record.get("fr"))],
+            text=text,
+            model_version=record.get("mid"),
+            usage_metadata=SimpleNamespace(prompt_token_count=prompt, cached_content_token_count=cached,
+                                           candidates_token_count=completion, thoughts_token_count=0)
+        )
+
+
+class ReplayGeminiClient:
+    """Stands in for the Gemini client, answering generate_content from recordings"""
+
+    def __init__(self, provider: str, store: ReplayStore):
+        self.models = _ReplayGeminiModels(provider, store)
+
+
+_recorder: Optional[ProviderRecorder] = None
+_replay_store: Optional[ReplayStore] = None
+
+
+def get_recorder() -> Optional[ProviderRecorder]:
+    """Shared recorder when PROVIDER_RECORD_DIR is set, else None"""
+    global _recorder
+    if _recorder is None and settings.provider_record_dir:
+        _recorder = ProviderRecorder(settings.provider_record_dir)
+        logger.info(f"📼 Recording provider calls to {_recorder.path / RECORDING_FILE}")
+    return _recorder
+
+
+def get_replay_store() -> Optional[ReplayStore]:
+    """Shared replay store when PROVIDER_REPLAY_DIR is set, else None"""
+    global _replay_store
+    if _replay_store is None and settings.provider_replay_dir:
+        _replay_store = ReplayStore(settings.provider_replay_dir, settings.provider_replay_speed,
+                                    settings.provider_replay_strict)
+    return _replay_store
+
+
+def reset_recording() -> None:
+    """Forget the recorder and replay store so changed settings take effect"""
+    global _recorder, _replay_store
+    _recorder = None
+    _replay_store = None
@@ -0,0 +1,147 @@
+"""
+Whole-quiz result cache for /ask-batch
+A quiz page is posted as the same list of questions over and over. Its fingerprint is an
+order-insensitive hash of the question cache keys (plus the model ensemble), and the finished
+batch is stored under it as a serialized payload, so a repeated quiz is one dictionary lookup
+instead of N per-question lookups and N rebuilt responses. A quiz that changed gets a new
+fingerprint and falls back to the per-question caches, and a stored quiz is dropped as soon as
+one of its questions' answers is rewritten (background refresh, full streamed completion).
+"""
+
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from config import settings
+from schemas.responses import BatchAnswerResponse
+
+logger = logging.getLogger(__name__)
+
+
+def quiz_fingerprint(question_keys: Sequence[str], models: Optional[List[str]] = None,
+                     topic: Optional[str] = None) -> str:
+    """Order-insensitive fingerprint of a quiz: its question keys and the ensemble answering it"""
+    # Topic only changes answers through multi-model routing
+    ensemble = ",".join(models) + "|" + (topic or "") if models else "single"
+    content = "\x00".join(sorted(question_keys)) + "\x00" + ensemble
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class QuizEntry:
+    """A stored batch: the payload in the order it was asked plus per-question results for re-ordering"""
+    __slots__ = ("created_at", "order", "payload", "by_key")
+
+    def __init__(self, created_at: float, order: Tuple[str, ...], payload: bytes, by_key: Dict[str, dict]):
+        self.created_at = created_at
+        self.order = order
+        self.payload = payload
+        self.by_key = by_key
+
+
+class QuizResultCache:
+    """LRU of serialized /ask-batch results keyed by quiz fingerprint"""
+
+    def __init__(self, max_entries: int = settings.quiz_cache_size,
+                 ttl_seconds: float = settings.quiz_cache_ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, QuizEntry]" = OrderedDict()
+        self._by_question: Dict[str, Set[str]] = {}  # question cache key -> fingerprints of quizzes holding it
+        self.hits = 0
+        self.reordered_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidated = 0
+
+    def _remove(self, fingerprint: str) -> None:
+        entry = self._entries.pop(fingerprint)
+        for key in entry.by_key:
+            fingerprints = self._by_question.get(key)
+            if fingerprints is not None:
+                fingerprints.discard(fingerprint)
+                if not fingerprints:
+                    del self._by_question[key]
+
+    def get(self, fingerprint: str, order: Sequence[str]) -> Optional[bytes]:
+        """JSON payload for the quiz in the requested question order, or None"""
+        entry = self._entries.get(fingerprint)
+        if entry is not None and self.ttl_seconds and time.time() - entry.created_at > self.ttl_seconds:
+            self._remove(fingerprint)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(fingerprint)
+        self.hits += 1
+        if entry.order == tuple(order):
+            return entry.payload
+        # Same questions in a different order: re-index the stored results
+        self.reordered_hits += 1
+        return json.dumps([{**entry.by_key[key], "index": index} for index, key in enumerate(order)]).encode()
+
+    def contains(self, fingerprint: str) -> bool:
+        """Whether a live payload is stored for the quiz (does not count as a lookup)"""
+        entry = self._entries.get(fingerprint)
+        return entry is not None and not (self.ttl_seconds and time.time() - entry.created_at > self.ttl_seconds)
+
+    def put(self, fingerprint: str, order: Sequence[str], results: List[BatchAnswerResponse]) -> bool:
+        """
+        Store a finished batch; batches with failed questions are not stored, and neither are
+        batches holding answers that are due for a background refresh (see services.model_results)
+        """
+        if not self.max_entries:
+            return False
+        if any(result is None or result.error_message for result in results):
+            return False
+        if any((result.confidence or 0) < settings.cache_refresh_below_confidence for result in results):
+            return False
+
+        dumped = [result.model_dump() for result in results]
+        for item in dumped:
+            # Replays are served from stored results, whatever the first batch had to fetch
+            if item.get("cache_hits"):
+                item["cache_hits"] = {name: True for name in item["cache_hits"]}
+            for answer in (item.get("individual_answers") or {}).values():
+                if "cached" in answer:
+                    answer["cached"] = True
+        by_key = {key: {k: v for k, v in item.items() if k != "index"} for key, item in zip(order, dumped)}
+        if fingerprint in self._entries:
+            self._remove(fingerprint)
+        self._entries[fingerprint] = QuizEntry(time.time(), tuple(order), json.dumps(dumped).encode(), by_key)
+        for key in by_key:
+            self._by_question.setdefault(key, set()).add(fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+        self.stores += 1
+        return True
+
+    def discard_question(self, cache_key: str) -> int:
+        """Drop every stored quiz holding the question (its stored answer changed); returns how many"""
+        fingerprints = list(self._by_question.get(cache_key, ()))
+        for fingerprint in fingerprints:
+            self._remove(fingerprint)
+        self.invalidated += len(fingerprints)
+        return len(fingerprints)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_question.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "reordered_hits": self.reordered_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "invalidated": self.invalidated,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global whole-quiz cache instance
+quiz_result_cache = QuizResultCache()
@@ -0,0 +1,270 @@
+"""
+Priority scheduling and admission control for provider calls
+Each provider has a fixed number of concurrent slots; waiting calls are served interactive first,
+then batch items, then background work. Within a class, calls are ordered by weighted fair
+queuing across API keys so one key's large batch cannot starve the others. Interactive requests
+whose expected queueing delay exceeds the latency SLO are rejected up front (HTTP 429 +
+Retry-After) instead of timing out.
+"""
+
+import math
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional
+
+from config import settings
+from services.metrics import metrics
+from services.api_keys import current_api_key
+from services.circuit_breaker import circuit_breakers
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+# Weight of the newest call in the per-provider service-time average
+SERVICE_TIME_ALPHA = 0.2
+
+
+class RequestClass(NamedTuple):
+    priority: int
+    enforce_slo: bool
+
+
+# Set per request (or background task) and inherited by every provider call it makes
+current_request_class: ContextVar[RequestClass] = ContextVar(
+    "current_request_class", default=RequestClass(INTERACTIVE, False)
+)
+
+
+# Coalescing key of the provider call being made (set by services.inflight), so a higher-priority
+# caller joining a queued call can promote it instead of waiting behind background work
+current_call_key: ContextVar[Optional[Hashable]] = ContextVar("current_call_key", default=None)
+
+
+def set_request_class(priority: int, enforce_slo: bool = False) -> None:
+    """Classify the provider calls made by the current request or task"""
+    current_request_class.set(RequestClass(priority, enforce_slo))
+
+
+class AdmissionRejected(Exception):
+    """Raised when the expected wait for a provider slot exceeds the caller's SLO"""
+
+    def __init__(self, provider: str, expected_wait: float, slo: float):
+        self.provider = provider
+        self.expected_wait = expected_wait
+        self.retry_after = max(1, math.ceil(expected_wait - slo))
+        super().__init__(
+            f"{provider} is overloaded: expected wait {expected_wait:.1f}s exceeds {slo:.0f}s SLO, "
+            f"retry after {self.retry_after}s"
+        )
+
+
+class ProviderQueue:
+    """Concurrency slots for one provider with a priority-ordered wait queue"""
+
+    def __init__(self, name: str, concurrency: int, initial_service_seconds: float):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.active = 0
+        self.service_seconds = initial_service_seconds
+        self._waiters: List[tuple] = []  # heap of (priority, finish tag, seq, future)
+        self._queued_calls: Dict[Hashable, list] = {}  # call key -> [priority, finish tag, future]
+        self._seq = itertools.count()
+        # Weighted fair queuing: virtual clock and the last finish tag handed out per API key
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self.admitted = 0
+        self.rejected = 0
+
+    def queued_ahead(self, priority: int) -> int:
+        # A promoted call has two heap entries but is one call
+        return len({id(future) for waiter_priority, _, _, future in self._waiters
+                    if waiter_priority <= priority and not future.done()})
+
+    def expected_wait(self, priority: int) -> float:
+        """Rough queueing delay for a new call: full rounds of service ahead of it"""
+        ahead = self.queued_ahead(priority)
+        if self.active < self.concurrency and ahead == 0:
+            return 0.0
+        return math.ceil((ahead + 1) / self.concurrency) * self.service_seconds
+
+    async def acquire(self, priority: int, tenant: str = "", weight: float = 1.0,
+                      call_key: Optional[Hashable] = None) -> None:
+        # Waiters only exist while every slot is taken (release hands slots over directly)
+        if self.active < self.concurrency:
+            self.active += 1
+            return
+
+        # A key's calls are spaced 1/weight apart on the virtual clock, so keys with queued work
+        # take turns in proportion to their weights
+        start = max(self._virtual_time, self._last_finish.get(tenant, 0.0))
+        finish = start + 1.0 / weight
+        self._last_finish[tenant] = finish
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, finish, next(self._seq), future))
+        if call_key is not None:
+            self._queued_calls[call_key] = [priority, finish, future]
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the waiter was cancelled
+                self.release()
+            raise
+        finally:
+            if call_key is not None:
+                self._queued_calls.pop(call_key, None)
+
+    def promote(self, call_key: Hashable, priority: int) -> bool:
+        """
+        Move a queued call up to a higher priority (lower number); returns whether it was queued lower
+        The call gets a second heap entry; whichever entry is popped first hands it the slot and
+        the other is skipped as done.
+        """
+        queued = self._queued_calls.get(call_key)
+        if queued is None or queued[0] <= priority or queued[2].done():
+            return False
+        queued[0] = priority
+        heapq.heappush(self._waiters, (priority, queued[1], next(self._seq), queued[2]))
+        return True
+
+    def release(self) -> None:
+        while self._waiters:
+            _, finish, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._virtual_time = max(self._virtual_time, finish)
+                # Hand the slot straight to the next waiter; active count is unchanged
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def record_service_time(self, seconds: float) -> None:
+        self.service_seconds += SERVICE_TIME_ALPHA * (seconds - self.service_seconds)
+
+    def stats(self) -> dict:
+        waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+        counted = set()
+        for priority, _, _, future in sorted(self._waiters, key=lambda waiter: waiter[0]):
+            # Promoted calls have two entries; count each once, at its current priority
+            if not future.done() and id(future) not in counted:
+                counted.add(id(future))
+                waiting[PRIORITY_NAMES[priority]] += 1
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": waiting,
+            "avg_service_seconds": round(self.service_seconds, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
+
+
+class ProviderScheduler:
+    """Per-provider priority queues shared by every provider call in the process"""
+
+    def __init__(self, concurrency: int = settings.scheduler_concurrency,
+                 initial_service_seconds: float = settings.scheduler_initial_service_seconds):
+        self.concurrency = concurrency
+        self.initial_service_seconds = initial_service_seconds
+        self._queues: Dict[str, ProviderQueue] = {}
+
+    def _queue(self, provider: str) -> ProviderQueue:
+        queue = self._queues.get(provider)
+        if queue is None:
+            queue = self._queues[provider] = ProviderQueue(provider, self.concurrency, self.initial_service_seconds)
+        return queue
+
+    @staticmethod
+    def slo_for(priority: int) -> Optional[float]:
+        return {
+            INTERACTIVE: settings.scheduler_slo_interactive,
+            BATCH: settings.scheduler_slo_batch,
+        }.get(priority)
+
+    def admit(self, providers: Iterable[str], priority: int) -> None:
+        """Raise AdmissionRejected if any provider's expected wait exceeds the SLO for this priority"""
+        slo = self.slo_for(priority)
+        if not slo:
+            return
+        for provider in providers:
+            queue = self._queue(provider)
+            expected_wait = queue.expected_wait(priority)
+            if expected_wait > slo:
+                queue.rejected += 1
+                logger.warning(f"🚦 Rejecting {PRIORITY_NAMES[priority]} call to {provider}: "
+                               f"expected wait {expected_wait:.1f}s > SLO {slo:.0f}s")
+                raise AdmissionRejected(provider, expected_wait, slo)
+
+    def expected_wait(self, provider: str, priority: int) -> float:
+        """Expected queueing delay for a new call to the provider at this priority"""
+        return self._queue(provider).expected_wait(priority)
+
+    def promote(self, call_key: Hashable, priority: int) -> bool:
+        """Raise a queued call's priority when a more urgent caller starts waiting on it"""
+        promoted = any(queue.promote(call_key, priority) for queue in self._queues.values())
+        if promoted:
+            logger.debug(f"Promoted queued call {call_key} to {PRIORITY_NAMES[priority]}")
+        return promoted
+
+    @asynccontextmanager
+    async def slot(self, provider: str):
+        """
+        Hold one of the provider's concurrency slots for the duration of a call
+        Fails fast with ProviderUnavailable while the provider's circuit breaker is open; an
+        exception escaping the call counts as a provider failure
+        """
+        breaker = circuit_breakers.get(provider)
+        breaker.before_call()
+        request_class = current_request_class.get()
+        if request_class.enforce_slo:
+            try:
+                self.admit([provider], request_class.priority)
+            except AdmissionRejected:
+                breaker.record_cancelled()
+                raise
+
+        api_key = current_api_key.get()
+        queue = self._queue(provider)
+        queued_at = time.perf_counter()
+        try:
+            if api_key is None:
+                await queue.acquire(request_class.priority, call_key=current_call_key.get())
+            else:
+                await queue.acquire(request_class.priority, api_key.name, api_key.weight, current_call_key.get())
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            raise
+        started = time.perf_counter()
+        queue.admitted += 1
+        metrics.observe("scheduler_wait", f"{provider}/{PRIORITY_NAMES[request_class.priority]}", started - queued_at)
+        try:
+            yield
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        else:
+            breaker.record_success()
+        finally:
+            elapsed = time.perf_counter() - started
+            queue.record_service_time(elapsed)
+            queue.release()
+            if api_key is not None:
+                api_key.record_provider_call(elapsed)
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: queue.stats() for name, queue in self._queues.items()}
+
+
+# Global scheduler shared by all provider calls
+provider_scheduler = ProviderScheduler()
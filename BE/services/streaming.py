@@ -0,0 +1,109 @@
+"""
+Streaming chat completions with early answer extraction
+Resolves as soon as the "Answer: X / Confidence: N" header has streamed in; the rest of the
+completion (the reasoning) keeps streaming in the background and is handed to a callback
+"""
+
+import re
+import asyncio
+import logging
+from typing import Any, Callable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A field only counts once the character after it has arrived, so "Confidence: 1" is not
+# taken from a stream that is about to continue with "0"
+ANSWER_FIELD = re.compile(r'[Aa]nswer:\s*\**\s*([A-Da-d])(?=[^A-Za-z])')
+CONFIDENCE_FIELD = re.compile(r'[Cc]onfidence:\s*\**\s*(\d+)(?=\D)')
+
+# Keep references to background consumers so they are not garbage collected mid-stream
+_background_tasks: Set[asyncio.Task] = set()
+
+
+class IncrementalAnswerParser:
+    """Accumulates streamed text and reports when both header fields are complete"""
+
+    def __init__(self):
+        self._parts = []
+        self.text = ""
+        self.answer: Optional[str] = None
+        self.confidence: Optional[int] = None
+
+    def feed(self, delta: str) -> bool:
+        """Add a chunk of text; returns True once answer and confidence are both known"""
+        self._parts.append(delta)
+        self.text = "".join(self._parts)
+        if self.answer is None:
+            match = ANSWER_FIELD.search(self.text)
+            if match:
+                self.answer = match.group(1).upper()
+        if self.confidence is None:
+            match = CONFIDENCE_FIELD.search(self.text)
+            if match:
+                self.confidence = min(10, max(1, int(match.group(1))))
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self.answer is not None and self.confidence is not None
+
+
+async def stream_chat_answer(
+    client: Any,
+    on_complete: Callable[[str, Optional[str]], None],
+    on_usage: Optional[Callable[[Any], None]] = None,
+    on_end: Optional[Callable[[Optional[Exception]], None]] = None,
+    **create_kwargs
+) -> Tuple[str, bool]:
+    """
+    Run a streaming chat completion and return as soon as the answer header is parsed
+
+    Returns (text_so_far, finished). When finished is False the stream is still being consumed
+    in the background; on_complete(full_text, model_id) is called once it ends, whether or not
+    the early return happened. Errors before the header propagate to the caller; errors after
+    it are logged and on_complete is not called. on_usage(usage) receives the token usage the
+    provider sends in the final chunk. on_end(error) is called last, once the provider stream is
+    closed, with the exception that ended it or None.
+    """
+    if on_usage:
+        create_kwargs["stream_options"] = {"include_usage": True}
+    stream = await client.chat.completions.create(stream=True, **create_kwargs)
+    loop = asyncio.get_running_loop()
+    header_ready: asyncio.Future = loop.create_future()
+
+    async def consume() -> None:
+        parser = IncrementalAnswerParser()
+        model_id = usage = None
+        try:
+            async for chunk in stream:
+                model_id = model_id or getattr(chunk, "model", None)
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta and parser.feed(delta) and not header_ready.done():
+                    header_ready.set_result((parser.text, False))
+        except Exception as e:
+            if not header_ready.done():
+                header_ready.set_exception(e)
+            else:
+                logger.warning(f"Stream failed after early answer was returned: {e}")
+            if on_end:
+                on_end(e)
+            return
+
+        if not header_ready.done():
+            header_ready.set_result((parser.text, True))
+        try:
+            if on_usage:
+                on_usage(usage)
+            on_complete(parser.text, model_id)
+        except Exception as e:
+            logger.error(f"Error handling completed stream: {e}")
+        if on_end:
+            on_end(None)
+
+    task = loop.create_task(consume())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return await header_ready
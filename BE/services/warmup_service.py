@@ -0,0 +1,213 @@
+"""
+Cache warm-up service
+Pre-fills the response caches for a list of questions in the background. Speculative prefetches
+sent by the extension when a quiz page loads are warm-up jobs too, deduplicated per quiz.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from config import settings
+from services.cache_service import create_cache_key, peek_cache
+from services.model_results import fetch_result
+from services.multi_model_service import MODEL_LEGS, resolve_models, get_multi_model_answer
+from services.scheduler import set_request_class, BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept around for status queries
+MAX_TRACKED_JOBS = 20
+
+
+class WarmupJob:
+    """Progress of one background warm-up run"""
+
+    def __init__(self, questions: List[dict], multi_model: bool, models: Optional[List[str]] = None,
+                 topic: Optional[str] = None, fingerprint: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.questions = questions
+        self.multi_model = multi_model
+        # Prefetch jobs: the ensemble the quiz will be answered with, and the quiz fingerprint
+        self.models = models
+        self.topic = topic
+        self.fingerprint = fingerprint
+        self.holders = 1  # Pages waiting on this prefetch; it is cancelled when the last one leaves
+        self.status = "pending"
+        self.total = len(questions)
+        self.already_cached = 0
+        self.filled = 0
+        self.failed = 0
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "multi_model": self.multi_model,
+            "models": self.models,
+            "prefetch": self.fingerprint is not None,
+            "total": self.total,
+            "processed": self.already_cached + self.filled + self.failed,
+            "already_cached": self.already_cached,
+            "filled": self.filled,
+            "failed": self.failed,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class WarmupService:
+    """Runs warm-up jobs through the same rate-limited provider path as /ask-batch"""
+
+    def __init__(self, batch_size: int = settings.batch_size, delay: float = settings.rate_limit_delay):
+        self.batch_size = max(1, batch_size)
+        self.delay = delay
+        self._jobs: "OrderedDict[str, WarmupJob]" = OrderedDict()
+
+    @staticmethod
+    def _is_cached(question: str, options: List[str], multi_model: bool) -> bool:
+        """Whether /ask would answer from cache (peeks, so probes do not count as lookups)"""
+        cache_key = create_cache_key(question, options)
+        if multi_model:
+            # Every leg /ask?multi_model=true asks by default
+            return all(peek_cache(name, cache_key) is not None for name in resolve_models())
+        # Single mode answers from any stored leg in its preference order
+        return any(peek_cache(name, cache_key) is not None for name in settings.single_model_preference)
+
+    @staticmethod
+    def _quorum_cached(question: str, options: List[str], models: List[str]) -> bool:
+        """Enough legs stored that answering the question needs no provider call"""
+        cache_key = create_cache_key(question, options)
+        stored = [name for name in models if peek_cache(name, cache_key) is not None]
+        return len(stored) >= min(len(models), max(1, settings.consensus_quorum))
+
+    def _needs_fill(self, question: str, options: List[str], multi_model: bool,
+                    models: Optional[List[str]]) -> bool:
+        if models:
+            return not self._quorum_cached(question, options, models)
+        return not self._is_cached(question, options, multi_model)
+
+    def count_uncached(self, questions: List[dict], multi_model: bool = False,
+                       models: Optional[List[str]] = None) -> int:
+        """Questions a job would send to a provider (what the caller's quota is charged for)"""
+        return sum(
+            self._needs_fill(item["question"], item["options"], multi_model, models) for item in questions
+        )
+
+    async def _warm_one(self, job: WarmupJob, question: str, options: List[str]) -> None:
+        if not self._needs_fill(question, options, job.multi_model, job.models):
+            job.already_cached += 1
+            return
+
+        try:
+            if job.models and len(job.models) > 1:
+                # The same quorum the user's request will run, so it finds exactly these legs stored
+                response = await get_multi_model_answer(question, options, job.topic, job.models)
+                if all(leg["error"] for leg in (response.individual_answers or {}).values()):
+                    job.failed += 1
+                    return
+            else:
+                # Only the legs that are missing; single mode fills OpenAI, which it asks on a miss
+                cache_key = create_cache_key(question, options)
+                legs = job.models or (resolve_models() if job.multi_model else ["openai"])
+                responses = await asyncio.gather(*(
+                    fetch_result(name, MODEL_LEGS[name], question, options, cache_key)
+                    for name in legs if peek_cache(name, cache_key) is None
+                ))
+                if any(response.error for response in responses):
+                    job.failed += 1
+                    return
+            job.filled += 1
+        except Exception as e:
+            logger.warning(f"Warm-up job {job.id}: failed to fill '{question[:50]}...': {e}")
+            job.failed += 1
+
+    async def _run(self, job: WarmupJob) -> None:
+        # Warm-up only uses provider capacity that interactive and batch requests leave free
+        set_request_class(BACKGROUND)
+        job.status = "running"
+        logger.info(f"🔥 Warm-up job {job.id} started: {job.total} questions (multi_model={job.multi_model})")
+        try:
+            for start in range(0, job.total, self.batch_size):
+                batch = job.questions[start:start + self.batch_size]
+                misses_before = job.filled + job.failed
+                await asyncio.gather(*(
+                    self._warm_one(job, item["question"], item["options"]) for item in batch
+                ))
+                # Only pause between batches that actually called a provider
+                if job.filled + job.failed > misses_before and start + self.batch_size < job.total:
+                    await asyncio.sleep(self.delay)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Warm-up job {job.id} crashed: {e}")
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"🔥 Warm-up job {job.id} {job.status}: {job.to_dict()}")
+
+    def start(self, questions: List[dict], multi_model: bool = False, models: Optional[List[str]] = None,
+              topic: Optional[str] = None, fingerprint: Optional[str] = None) -> WarmupJob:
+        """
+        Schedule a warm-up job on the running event loop and return it immediately
+        A prefetch (fingerprint given) for a quiz that is already being prefetched returns that job
+        """
+        if fingerprint is not None:
+            job = self.running_prefetch(fingerprint)
+            if job is not None:
+                logger.info(f"🔥 Quiz {fingerprint[:12]} is already being prefetched by job {job.id}")
+                job.holders += 1
+                return job
+        job = WarmupJob(questions, multi_model, models, topic, fingerprint)
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        self._jobs[job.id] = job
+
+        # Forget the oldest finished jobs
+        while len(self._jobs) > MAX_TRACKED_JOBS:
+            oldest_id = next(iter(self._jobs))
+            if not self._jobs[oldest_id].task.done():
+                break
+            del self._jobs[oldest_id]
+        return job
+
+    def running_prefetch(self, fingerprint: str) -> Optional[WarmupJob]:
+        """The prefetch job still running for a quiz, if any"""
+        for job in self._jobs.values():
+            if job.fingerprint == fingerprint and job.task is not None and not job.task.done():
+                return job
+        return None
+
+    def get(self, job_id: str) -> Optional[WarmupJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.task is None or job.task.done():
+            return False
+        job.task.cancel()
+        return True
+
+    def release_prefetch(self, job_id: str) -> bool:
+        """A page no longer needs a prefetch; the job is cancelled once no page holds it"""
+        job = self._jobs.get(job_id)
+        if job is None or job.fingerprint is None or job.task is None or job.task.done():
+            return False
+        job.holders -= 1
+        if job.holders <= 0:
+            job.task.cancel()
+        return True
+
+    def list_jobs(self) -> List[Dict]:
+        return [job.to_dict() for job in self._jobs.values()]
+
+
+# Global warm-up service instance
+warmup_service = WarmupService()
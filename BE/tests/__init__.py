@@ -0,0 +1,3 @@
+"""
+Tests package - run with python -m pytest from the BE directory
+"""
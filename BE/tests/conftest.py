@@ -0,0 +1,74 @@
+"""
+Test setup: run against the BE package the same way the app does (python -m pytest from BE)
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+BE_DIR = Path(__file__).resolve().parent.parent
+
+# Settings require an API key; the tests never authenticate with it
+os.environ.setdefault("QUIZ_API_KEY", "test-key")
+
+# Relative paths (cache directory, .env) resolve as they do for the server
+os.chdir(BE_DIR)
+if str(BE_DIR) not in sys.path:
+    sys.path.insert(0, str(BE_DIR))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Replace the global cache manager with an empty one in a temporary directory"""
+    from services import cache_service
+
+    manager = cache_service.CacheManager(cache_dir=tmp_path, save_interval=0.02)
+    manager.ensure_loaded()
+    monkeypatch.setattr(cache_service, "cache_manager", manager)
+    yield manager
+    manager.executor.shutdown(wait=True)
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    """Local OpenAI-compatible stand-in (benchmarks.stub_provider) running for the whole session"""
+    import socket
+    import threading
+
+    import uvicorn
+    from benchmarks.stub_provider import StubConfig, create_app
+
+    class Config(StubConfig):
+        pass
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(Config), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    yield Config, f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+
+
+@pytest.fixture
+def stub(stub_server, monkeypatch):
+    """Stub provider config, fast and with the default answer; changes are undone after the test"""
+    config, _ = stub_server
+    for name, value in (("ttft", 0.0), ("token_delay", 0.0), ("batch_delay", 0.05), ("batch_fail_every", 0),
+                        ("chunk_chars", 0), ("fail_status", 0), ("answer", config.answer)):
+        monkeypatch.setattr(config, name, value)
+    return config
+
+
+@pytest.fixture
+def stub_client(stub_server):
+    """Factory for AsyncOpenAI clients talking to the stub (no retries, so failures surface at once)"""
+    from openai import AsyncOpenAI
+
+    _, base_url = stub_server
+    return lambda: AsyncOpenAI(api_key="stub", base_url=base_url, max_retries=0)
@@ -0,0 +1,43 @@
+"""
+Tests for single-model answers: which stored legs may serve a request
+"""
+
+import asyncio
+
+from services import ai_service
+from services.answer_parser import build_model_response
+from services.cache_service import add_to_cache, create_cache_key
+
+QUESTION = "What is the capital of Australia?"
+OPTIONS = ["Sydney", "Canberra", "Melbourne", "Perth"]
+
+
+def store_gemini_answer() -> None:
+    add_to_cache("gemini", create_cache_key(QUESTION, OPTIONS),
+                 build_model_response("gemini-2.5-pro", "Answer: B\nConfidence: 9\nReasoning: Capital."))
+
+
+def test_plain_single_mode_answers_from_any_preferred_leg(cache, monkeypatch):
+    async def no_call(question, options, cache_key):
+        raise AssertionError("OpenAI should not be asked")
+
+    monkeypatch.setattr(ai_service, "fetch_openai_result", no_call)
+    store_gemini_answer()
+    response = asyncio.run(ai_service.get_ai_answer(QUESTION, OPTIONS))
+    assert response.model == "gemini-2.5-pro"
+    assert response.cache_hits == {"gemini": True}
+
+
+def test_explicit_openai_ensemble_ignores_other_legs(cache, monkeypatch):
+    calls = []
+
+    async def fetch_openai(question, options, cache_key):
+        calls.append(cache_key)
+        return build_model_response("gpt-4.1", "Answer: B\nConfidence: 8\nReasoning: Capital.")
+
+    monkeypatch.setattr(ai_service, "fetch_openai_result", fetch_openai)
+    store_gemini_answer()
+    response = asyncio.run(ai_service.get_ai_answer(QUESTION, OPTIONS, ["openai"]))
+    assert response.model == "gpt-4.1"
+    assert response.cache_hits == {"openai": False}
+    assert len(calls) == 1
@@ -0,0 +1,48 @@
+"""
+Bulk answering against the stub Batch API: which questions are submitted and how result files
+are read back into the cache
+"""
+
+import asyncio
+
+from services import batch_service
+from services.answer_parser import build_model_response
+from services.batch_service import BatchService, build_batch_lines
+from services.cache_service import add_to_cache, create_cache_key, peek_cache
+
+QUESTIONS = [
+    {"question": f"What is {n} + {n}?", "options": [str(n), str(2 * n), str(3 * n), str(4 * n)]}
+    for n in range(1, 7)
+]
+
+
+def test_questions_stored_for_any_single_mode_leg_are_skipped(cache):
+    first, second = (create_cache_key(item["question"], item["options"]) for item in QUESTIONS[:2])
+    add_to_cache("gemini", first, build_model_response("gemini-2.5-flash", "Answer: B\nConfidence: 9"))
+    add_to_cache("openai", second, build_model_response("gpt-4.1", "Answer: B\nConfidence: 9"))
+
+    lines, already_cached = build_batch_lines(QUESTIONS + QUESTIONS[2:3])
+    assert (len(lines), already_cached) == (4, 3)
+    # The scan peeks, so it leaves the hit/miss counters alone
+    assert all(counters.hits == counters.misses == 0 for counters in cache.counters.values())
+
+
+def test_result_files_fill_the_cache(cache, stub, stub_client, monkeypatch):
+    stub.batch_fail_every = 3
+    monkeypatch.setattr(batch_service, "get_openai_client", stub_client)
+    service = BatchService(poll_interval=0.02, max_requests=4)
+
+    async def scenario():
+        job = service.start(QUESTIONS)
+        await asyncio.wait_for(job.task, 5)
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "completed", job.error
+    assert len(job.provider_batches) == 2
+    # Every third request of each provider batch fails: 1 of 4 and 0 of 2
+    assert (job.submitted, job.filled, job.failed) == (6, 5, 1)
+
+    stored = [peek_cache("openai", create_cache_key(item["question"], item["options"])) for item in QUESTIONS]
+    assert sum(result is not None for result in stored) == 5
+    assert all((result.answer, result.confidence) == ("B", 9) for result in stored if result is not None)
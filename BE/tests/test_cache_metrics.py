@@ -0,0 +1,52 @@
+"""
+Space-Saving sketch: the bucket list keeps the sketch's guarantees against exact counts
+"""
+
+import random
+from collections import Counter
+
+from services.cache_metrics import SpaceSaving
+
+
+def check_buckets(sketch: SpaceSaving) -> None:
+    """Buckets hold every tracked key under its count and are linked in ascending order"""
+    counts, count = [], sketch._min
+    while count is not None:
+        assert sketch._buckets[count]
+        assert all(sketch._counts[key][0] == count for key in sketch._buckets[count])
+        counts.append(count)
+        count = sketch._next[count]
+    assert counts == sorted(sketch._buckets)
+    assert sum(len(bucket) for bucket in sketch._buckets.values()) == len(sketch._counts)
+
+
+def test_estimates_bound_the_true_counts():
+    rng = random.Random(7)
+    # Zipf-like stream: a few hot questions and a long tail
+    stream = [f"q{int(rng.paretovariate(1.1))}" for _ in range(20000)]
+    exact = Counter(stream)
+    sketch = SpaceSaving(capacity=30)
+    for index, key in enumerate(stream):
+        sketch.add(key, key)
+        if index % 997 == 0:
+            check_buckets(sketch)
+    check_buckets(sketch)
+
+    assert len(sketch._counts) == 30
+    assert sum(count for count, _, _ in sketch._counts.values()) == sketch.total == len(stream)
+    for key, (count, error, _) in sketch._counts.items():
+        assert count - error <= exact[key] <= count
+    for key, true_count in exact.items():
+        if true_count > len(stream) / sketch.capacity:
+            assert key in sketch._counts
+    assert sketch.top(1)[0]["key"] == exact.most_common(1)[0][0]
+
+
+def test_clear_resets_the_buckets():
+    sketch = SpaceSaving(capacity=2)
+    for key in "aabc":
+        sketch.add(key)
+    sketch.clear()
+    sketch.add("d")
+    check_buckets(sketch)
+    assert sketch.top() == [{"key": "d", "question": None, "count": 1, "max_overcount": 0}]
@@ -0,0 +1,135 @@
+"""
+Fault-injection tests for cache persistence: crash recovery, failed writes and group commit
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from schemas.responses import ModelResponse
+from services import cache_service
+from services.cache_service import CacheManager
+
+SAVE_INTERVAL = 0.02
+
+
+def make_response(answer: str = "B", confidence: int = 8) -> ModelResponse:
+    return ModelResponse(
+        model="gpt-4o-mini",
+        answer=answer,
+        confidence=confidence,
+        raw=f"Answer: {answer}\nConfidence: {confidence}\nReasoning: test",
+        reasoning="test"
+    )
+
+
+@pytest.fixture
+def manager(tmp_path):
+    cache_manager = CacheManager(cache_dir=tmp_path, save_interval=SAVE_INTERVAL)
+    yield cache_manager
+    cache_manager.executor.shutdown(wait=True)
+
+
+def reload(tmp_path) -> CacheManager:
+    cache_manager = CacheManager(cache_dir=tmp_path, save_interval=SAVE_INTERVAL)
+    cache_manager.ensure_loaded()
+    return cache_manager
+
+
+async def wait_for_flush(cache_manager: CacheManager) -> None:
+    await asyncio.sleep(SAVE_INTERVAL * 5)
+
+
+def test_truncated_file_recovers_from_backup(manager, tmp_path):
+    # No event loop: every insert is saved synchronously, so the second one leaves a .bak
+    manager.add_to_cache("openai", "first", make_response("A"))
+    manager.add_to_cache("openai", "second", make_response("C"))
+    cache_file = manager.cache_files["openai"]
+    assert manager._backup_path(cache_file).exists()
+
+    # Simulate a torn write of the main file
+    cache_file.write_text(cache_file.read_text(encoding="utf-8")[:40], encoding="utf-8")
+
+    recovered = reload(tmp_path)
+    assert recovered.get_from_cache("openai", "first").answer == "A"
+    assert not cache_file.exists()
+    quarantined = list(tmp_path.glob("openai_cache.json.corrupt-*"))
+    assert len(quarantined) == 1
+    assert quarantined[0].read_text(encoding="utf-8").startswith("{")
+    recovered.executor.shutdown(wait=True)
+
+
+def test_stale_temp_file_removed_at_load(manager, tmp_path):
+    manager.add_to_cache("openai", "key", make_response())
+    stale_tmp = tmp_path / ".openai_cache.json.abc123.tmp"
+    stale_tmp.write_text('{"partial":', encoding="utf-8")
+
+    recovered = reload(tmp_path)
+    assert not stale_tmp.exists()
+    assert recovered.get_from_cache("openai", "key") is not None
+    recovered.executor.shutdown(wait=True)
+
+
+@pytest.mark.parametrize("target", ["json.dump", "os.replace"])
+def test_failed_write_keeps_model_dirty_and_retries(manager, monkeypatch, target):
+    module_name, attr = target.split(".")
+    module = getattr(cache_service, module_name)
+    original = getattr(module, attr)
+
+    def failing(*args, **kwargs):
+        raise OSError(f"injected {target} failure")
+
+    async def scenario():
+        manager.ensure_loaded()
+        monkeypatch.setattr(module, attr, failing)
+        manager.add_to_cache("openai", "key", make_response())
+        await wait_for_flush(manager)
+
+        assert "openai" in manager._dirty
+        assert not manager.cache_files["openai"].exists()
+        assert manager.counters["openai"].save_failures > 0
+        # The failed write leaves no temp file behind
+        assert not list(manager.cache_dir.glob(".*.tmp"))
+
+        monkeypatch.setattr(module, attr, original)
+        await wait_for_flush(manager)
+        assert "openai" not in manager._dirty
+
+    asyncio.run(scenario())
+    saved = json.loads(manager.cache_files["openai"].read_text(encoding="utf-8"))
+    assert "key" in saved
+
+
+def test_burst_of_inserts_coalesces_into_one_write(manager, monkeypatch):
+    writes = []
+    original = manager._save_cache_to_file
+
+    def counting_save(cache, cache_file, generation=None):
+        writes.append((cache_file, len(cache)))
+        return original(cache, cache_file, generation)
+
+    monkeypatch.setattr(manager, "_save_cache_to_file", counting_save)
+
+    async def scenario():
+        manager.ensure_loaded()
+        for i in range(50):
+            manager.add_to_cache("openai", f"key-{i}", make_response())
+        await wait_for_flush(manager)
+
+    asyncio.run(scenario())
+    assert writes == [(manager.cache_files["openai"], 50)]
+
+
+def test_clear_discards_snapshot_written_after_it(manager):
+    manager.add_to_cache("openai", "key", make_response())
+    cache_file = manager.cache_files["openai"]
+    snapshot, generation = dict(manager._caches["openai"]), manager._generation
+
+    manager.clear_all_caches()
+    assert not cache_file.exists()
+
+    # A flush that took its snapshot before the clear reaches the rename step afterwards
+    assert manager._save_cache_to_file(snapshot, cache_file, generation)
+    assert not cache_file.exists()
+    assert not list(manager.cache_dir.glob(".*.tmp"))
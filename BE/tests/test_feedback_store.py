@@ -0,0 +1,59 @@
+"""
+Feedback log I/O: read in the background instead of at import, appended off the event loop
+"""
+
+import json
+import asyncio
+
+from services.feedback_store import FeedbackStore
+
+SAVE_INTERVAL = 0.02
+
+
+def make_store(tmp_path) -> FeedbackStore:
+    return FeedbackStore(path=tmp_path / "feedback.ndjson", save_interval=SAVE_INTERVAL)
+
+
+def test_log_is_read_by_the_background_load(tmp_path):
+    record = {"t": 0, "k": "key", "topic": "math", "correct": "B", "m": {"test-model": ["B", 9]}}
+    (tmp_path / "feedback.ndjson").write_text(json.dumps(record) + "\n", encoding="utf-8")
+    store = make_store(tmp_path)
+    assert not store.loaded
+
+    async def scenario():
+        await store.start_background_load()
+
+    asyncio.run(scenario())
+    assert store.loaded
+    assert store.stats()["models"]["test-model"] == {"correct": 1, "total": 1, "accuracy": 1.0}
+    store.shutdown()
+
+
+def test_records_are_appended_after_the_request_returns(tmp_path):
+    store = make_store(tmp_path)
+
+    async def scenario():
+        await store.wait_until_loaded()
+        for key in ("first", "second"):
+            assert store.record(key, "A", {"test-model": ("A", 7)}) == {"test-model": True}
+        # Nothing was written on the event loop
+        assert not store.path.exists()
+        await asyncio.sleep(SAVE_INTERVAL * 5)
+
+    asyncio.run(scenario())
+    lines = store.path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["k"] for line in lines] == ["first", "second"]
+    store.shutdown()
+
+
+def test_shutdown_appends_pending_records(tmp_path):
+    store = make_store(tmp_path)
+
+    async def scenario():
+        store.record("key", "C", {"test-model": ("D", 4)})
+
+    asyncio.run(scenario())
+    store.shutdown()
+    reloaded = make_store(tmp_path)
+    assert reloaded.stats()["questions"] == 1
+    reloaded.shutdown()
@@ -0,0 +1,74 @@
+"""
+Tests for the per-model result store: background refresh of weak stored answers
+"""
+
+import asyncio
+
+from config import settings
+from services import model_results
+from services.answer_parser import DEFAULT_CONFIDENCE, build_model_response, is_parse_fallback
+from services.cache_service import add_to_cache, peek_cache
+from services.model_results import BackgroundRefresher
+
+QUESTION = "Which planet is known as the red planet?"
+OPTIONS = ["Venus", "Jupiter", "Mars", "Saturn"]
+
+
+def fake_leg(text: str, calls: list):
+    async def fetch(question, options, cache_key):
+        calls.append(cache_key)
+        result = build_model_response("gpt-4.1", text)
+        add_to_cache("openai", cache_key, result)
+        return result
+    return fetch
+
+
+def test_parse_fallback_answer_is_refreshed(cache, monkeypatch):
+    monkeypatch.setattr(settings, "cache_refresh_interval_seconds", 0)
+    calls = []
+    monkeypatch.setitem(model_results._leg_fetchers, "openai",
+                        fake_leg("Answer: C\nConfidence: 9\nReasoning: Iron oxide.", calls))
+    refresher = BackgroundRefresher()
+
+    async def scenario():
+        add_to_cache("openai", "key", build_model_response("gpt-4.1", "The answer is probably C"))
+        stored = peek_cache("openai", "key")
+        # Not low-confidence: only the missing Answer: line marks it for a refresh
+        assert stored.confidence == DEFAULT_CONFIDENCE >= settings.cache_refresh_below_confidence
+        assert is_parse_fallback(stored.raw)
+
+        assert refresher.maybe_refresh("openai", QUESTION, OPTIONS, "key", stored)
+        await asyncio.gather(*refresher._tasks)
+
+    asyncio.run(scenario())
+    assert calls == ["key"]
+    refreshed = peek_cache("openai", "key")
+    assert (refreshed.answer, refreshed.confidence) == ("C", 9)
+    assert refresher.replaced == 1
+
+
+def test_worse_refresh_keeps_stored_answer(cache, monkeypatch):
+    monkeypatch.setattr(settings, "cache_refresh_interval_seconds", 0)
+    monkeypatch.setattr(settings, "cache_soft_ttl_seconds", 1)
+    calls = []
+    monkeypatch.setitem(model_results._leg_fetchers, "openai",
+                        fake_leg("Answer: B\nConfidence: 3\nReasoning: Unsure.", calls))
+    refresher = BackgroundRefresher()
+
+    async def scenario():
+        add_to_cache("openai", "key", build_model_response("gpt-4.1", "Answer: C\nConfidence: 9"))
+        cache._caches["openai"]["key"].created_at -= 10
+        assert refresher.maybe_refresh("openai", QUESTION, OPTIONS, "key", peek_cache("openai", "key"))
+        await asyncio.gather(*refresher._tasks)
+
+    asyncio.run(scenario())
+    assert calls == ["key"]
+    assert peek_cache("openai", "key").confidence == 9
+    assert refresher.kept == 1
+
+
+def test_confident_answer_is_not_refreshed(cache, monkeypatch):
+    monkeypatch.setitem(model_results._leg_fetchers, "openai", fake_leg("Answer: C\nConfidence: 9", []))
+    add_to_cache("openai", "key", build_model_response("gpt-4.1", "Answer: C\nConfidence: 8"))
+    refresher = BackgroundRefresher()
+    assert not refresher.needs_refresh("openai", "key", peek_cache("openai", "key"), 0)
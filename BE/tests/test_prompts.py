@@ -0,0 +1,25 @@
+"""
+Prompt output budgets against the answer parser: an answer laid out with blank lines keeps its confidence
+"""
+
+import pytest
+
+from services.answer_parser import parse_answer_response
+from services.prompts import GEMINI_PROMPT, OPENAI_PROMPT, XAI_PROMPT
+
+BLANK_LINE_ANSWER = "Answer: B\n\nConfidence: 9\n\nReasoning: Mercury orbits closest to the Sun."
+
+
+def apply_stop(text: str, stop) -> str:
+    """What the provider returns: the completion cut before the first stop sequence"""
+    for sequence in stop or []:
+        text = text.split(sequence, 1)[0]
+    return text
+
+
+@pytest.mark.parametrize("prompt", [OPENAI_PROMPT, GEMINI_PROMPT, XAI_PROMPT], ids=["openai", "gemini", "xai"])
+def test_blank_line_answer_keeps_its_confidence(prompt):
+    # prompt.stop goes out as the chat "stop" parameter or Gemini's stop_sequences
+    returned = apply_stop(BLANK_LINE_ANSWER, prompt.stop)
+    assert parse_answer_response(returned) == ("B", 9, "Mercury orbits closest to the Sun.")
+
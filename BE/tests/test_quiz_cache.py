@@ -0,0 +1,98 @@
+"""
+Whole-quiz cache for /ask-batch: rate charging on replays, replayed cache hits and invalidation
+when a stored answer is rewritten
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from config import settings
+from routes import quiz
+from schemas.requests import BatchRequest
+from services import model_results
+from services.answer_parser import build_model_response
+from services.cache_service import add_to_cache, create_cache_key, peek_cache
+from services.model_results import BackgroundRefresher
+from services.quiz_cache import QuizResultCache
+
+QUESTIONS = [
+    {"question": "What is 2 + 2?", "options": ["3", "4", "5", "6"]},
+    {"question": "Which planet is closest to the Sun?", "options": ["Venus", "Mercury", "Earth", "Mars"]},
+]
+
+
+@pytest.fixture
+def quiz_cache(cache, monkeypatch):
+    """Fresh quiz cache in front of a stored OpenAI answer for every question"""
+    quiz_cache = QuizResultCache(max_entries=10, ttl_seconds=600)
+    monkeypatch.setattr(quiz, "quiz_result_cache", quiz_cache)
+    monkeypatch.setattr(model_results, "quiz_result_cache", quiz_cache)
+    for item in QUESTIONS:
+        add_to_cache("openai", create_cache_key(item["question"], item["options"]),
+                     build_model_response("gpt-4.1", "Answer: B\nConfidence: 8\nReasoning: Known."))
+    return quiz_cache
+
+
+@pytest.fixture
+def charges(monkeypatch):
+    charged = []
+    monkeypatch.setattr(quiz, "charge_current_key", charged.append)
+    return charged
+
+
+def ask_batch(request: BatchRequest):
+    return asyncio.run(quiz.ask_questions_batch(request, multi_model=False))
+
+
+def test_quiz_cache_hit_is_not_charged_per_question(quiz_cache, charges):
+    request = BatchRequest(questions=QUESTIONS)
+    results = ask_batch(request)
+    assert [result.answer for result in results] == ["B", "B"]
+    assert charges == [len(QUESTIONS) - 1]
+
+    replay = ask_batch(request)
+    assert replay.headers["X-Quiz-Cache"] == "hit"
+    # Only the middleware's one token for the request
+    assert charges == [len(QUESTIONS) - 1]
+
+
+def test_replayed_payload_reports_cache_hits(quiz_cache):
+    order = ["first"]
+    result = quiz.BatchAnswerResponse(index=0, answer="B", confidence=8, cache_hits={"openai": False},
+                                      individual_answers={"gpt-4.1": {"answer": "B", "cached": False}})
+    assert quiz_cache.put("quiz", order, [result])
+    replayed = json.loads(quiz_cache.get("quiz", order))[0]
+    assert replayed["cache_hits"] == {"openai": True}
+    assert replayed["individual_answers"]["gpt-4.1"]["cached"] is True
+
+
+def test_refreshed_answer_drops_stored_quizzes(cache, quiz_cache, monkeypatch):
+    monkeypatch.setattr(settings, "cache_refresh_interval_seconds", 0)
+    monkeypatch.setattr(settings, "cache_soft_ttl_seconds", 1)
+    item = QUESTIONS[0]
+    cache_key = create_cache_key(item["question"], item["options"])
+
+    async def fetch(question, options, key):
+        result = build_model_response("gpt-4.1", "Answer: B\nConfidence: 10\nReasoning: Arithmetic.")
+        add_to_cache("openai", key, result)
+        return result
+
+    monkeypatch.setitem(model_results._leg_fetchers, "openai", fetch)
+    refresher = BackgroundRefresher()
+
+    async def scenario():
+        await quiz.ask_questions_batch(BatchRequest(questions=QUESTIONS), multi_model=False)
+        await quiz.ask_questions_batch(BatchRequest(questions=QUESTIONS[:1]), multi_model=False)
+        assert quiz_cache.stats()["entries"] == 2
+
+        cache._caches["openai"][cache_key].created_at -= 10
+        assert refresher.maybe_refresh("openai", item["question"], item["options"], cache_key,
+                                       peek_cache("openai", cache_key))
+        await asyncio.gather(*refresher._tasks)
+
+    asyncio.run(scenario())
+    assert refresher.replaced == 1
+    assert quiz_cache.stats()["entries"] == 0
+    assert quiz_cache.invalidated == 2
@@ -0,0 +1,103 @@
+"""
+Streaming answers against the local stub provider: early header, missing header, failures and
+the full-completion write that replaces the early cache entry
+"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from services import ai_service
+from services.answer_parser import is_parse_fallback
+from services.cache_service import create_cache_key, get_from_cache, peek_cache
+from services.model_results import _stream_tasks, complete_chat_answer
+from services.streaming import IncrementalAnswerParser, stream_chat_answer
+
+QUESTION = "Which gas do plants absorb for photosynthesis?"
+OPTIONS = ["Oxygen", "Carbon dioxide", "Nitrogen", "Helium"]
+MESSAGES = [{"role": "user", "content": QUESTION}]
+
+
+@pytest.fixture
+def streaming(monkeypatch):
+    monkeypatch.setattr(settings, "openai_streaming", True)
+
+
+def test_parser_waits_for_fields_split_mid_token():
+    parser = IncrementalAnswerParser()
+    assert not parser.feed("Ans")
+    assert not parser.feed("wer: B\nConfid")
+    # "1" could still be the start of "10"
+    assert not parser.feed("ence: 1")
+    assert parser.feed("0\nReas")
+    assert (parser.answer, parser.confidence) == ("B", 10)
+
+
+def test_header_resolves_before_stream_ends(stub, stub_client):
+    stub.chunk_chars = 3
+    stub.token_delay = 0.01
+    completed = []
+
+    async def scenario():
+        done = asyncio.Event()
+
+        def on_complete(text, model_id):
+            completed.append(text)
+            done.set()
+
+        text, finished = await stream_chat_answer(stub_client(), on_complete, model="gpt-4.1", messages=MESSAGES)
+        assert not finished
+        assert not completed
+        assert "Confidence: 9" in text
+        await asyncio.wait_for(done.wait(), 5)
+        return text
+
+    text = asyncio.run(scenario())
+    assert completed == [stub.answer]
+    assert len(text) < len(stub.answer)
+
+
+def test_stream_without_header_is_stored_when_it_ends(cache, stub, stub_client, streaming):
+    stub.answer = "Plants take in carbon dioxide, so the second option."
+    stub.chunk_chars = 5
+
+    async def scenario():
+        return await complete_chat_answer(stub_client(), "openai", "key", "gpt-4.1", "hash",
+                                          model="gpt-4.1", messages=MESSAGES)
+
+    result = asyncio.run(scenario())
+    assert result.raw == stub.answer
+    stored = peek_cache("openai", "key")
+    assert stored.raw == stub.answer
+    assert is_parse_fallback(stored.raw)
+
+
+def test_failure_before_header_is_negative_cached(cache, stub, stub_client, streaming, monkeypatch):
+    stub.fail_status = 500
+    monkeypatch.setattr(ai_service, "get_openai_client", stub_client)
+    cache_key = create_cache_key(QUESTION, OPTIONS)
+
+    result = asyncio.run(ai_service.fetch_openai_result(QUESTION, OPTIONS, cache_key))
+    assert result.error
+    assert peek_cache("openai", cache_key) is None
+    negative = get_from_cache("openai", cache_key)
+    assert negative is not None and negative.error
+
+
+def test_full_completion_replaces_early_entry(cache, stub, stub_client, streaming):
+    stub.chunk_chars = 4
+    stub.token_delay = 0.01
+
+    async def scenario():
+        result = await complete_chat_answer(stub_client(), "openai", "key", "gpt-4.1", "hash",
+                                            model="gpt-4.1", messages=MESSAGES)
+        early = peek_cache("openai", "key")
+        await asyncio.gather(*_stream_tasks)
+        return result, early
+
+    result, early = asyncio.run(scenario())
+    assert (result.answer, result.confidence) == ("B", 9)
+    # Stored as soon as the header arrived, so a concurrent miss would not call the provider again
+    assert early is not None and early.raw == result.raw != stub.answer
+    assert peek_cache("openai", "key").raw == stub.answer
@@ -17,4 +17,31 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
     // Return true to indicate async response
     return true;
   }
-});
\ No newline at end of file
+});
+// === Speculative prefetch cleanup ===
+// content.js reports the backend prefetch job of each quiz tab; the job is released when the tab
+// closes (the page itself may not get to send anything) or when the page asks for it on pagehide.
+// Jobs are kept in session storage because the service worker can be stopped in between.
+function cancelPrefetchForTab(tabId) {
+  const storageKey = `prefetch_${tabId}`;
+  chrome.storage.session.get([storageKey], (result) => {
+    const job = result[storageKey];
+    if (!job) return;
+    chrome.storage.session.remove(storageKey);
+    fetch(`http://localhost:3000/prefetch/${job.jobId}`, {
+      method: 'DELETE',
+      headers: { 'X-API-Key': job.apiKey }
+    }).catch((error) => console.warn('Could not cancel prefetch job:', error));
+  });
+}
+
+chrome.runtime.onMessage.addListener((request, sender) => {
+  if (!sender.tab) return;
+  if (request.action === 'prefetchStarted') {
+    chrome.storage.session.set({ [`prefetch_${sender.tab.id}`]: { jobId: request.jobId, apiKey: request.apiKey } });
+  } else if (request.action === 'cancelPrefetch') {
+    cancelPrefetchForTab(sender.tab.id);
+  }
+});
+
+chrome.tabs.onRemoved.addListener((tabId) => cancelPrefetchForTab(tabId));
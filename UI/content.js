@@ -266,6 +266,67 @@ window.extractEnglishText = extractEnglishText;
 window.formatConfidence = formatConfidence;
 window.getConfidenceColor = getConfidenceColor;
 
+// Quiz/topic name sent with requests so the backend can learn per-topic model accuracy
+function getQuizTopic() {
+  const heading = document.querySelector('h1.entry-title, .entry-title, h1');
+  const text = heading ? heading.innerText.trim() : document.title.trim();
+  return extractEnglishText(text).slice(0, 200) || null;
+}
+
+// Report the correct answers WP Pro Quiz reveals after submission back to the backend
+async function sendAnswerFeedback() {
+  const pending = allQuizData.filter(q => q.status === 'completed' && !q.feedbackSent && q.element);
+  if (pending.length === 0) return;
+  
+  const apiKey = await new Promise(resolve => getApiKey(resolve));
+  if (!apiKey) return;
+  const topic = getQuizTopic();
+  
+  for (const questionData of pending) {
+    const optionItems = Array.from(questionData.element.querySelectorAll('.wpProQuiz_questionListItem'));
+    const correctIndex = optionItems.findIndex(item => item.classList.contains('wpProQuiz_answerCorrect'));
+    if (correctIndex < 0 || correctIndex >= questionData.options.length) continue;
+    
+    questionData.feedbackSent = true;
+    try {
+      const response = await fetch("http://localhost:3000/feedback", {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          "X-API-Key": apiKey
+        },
+        body: JSON.stringify({
+          question: questionData.question,
+          options: questionData.options,
+          correct_answer: String.fromCharCode(65 + correctIndex),
+          topic: topic
+        })
+      });
+      if (!response.ok) {
+        console.warn(`[Quiz Assistant] Feedback for Q${questionData.index + 1} rejected: ${response.status}`);
+      }
+    } catch (err) {
+      console.warn(`[Quiz Assistant] Could not send feedback for Q${questionData.index + 1}:`, err);
+      questionData.feedbackSent = false;
+    }
+  }
+}
+
+// Send feedback once the quiz marks answers as correct (after the user submits it)
+let feedbackObserver = null;
+function watchForQuizResults() {
+  if (feedbackObserver || typeof MutationObserver === 'undefined') return;
+  
+  let feedbackTimer = null;
+  feedbackObserver = new MutationObserver(mutations => {
+    const revealed = mutations.some(m => m.target.classList && m.target.classList.contains('wpProQuiz_answerCorrect'));
+    if (!revealed) return;
+    clearTimeout(feedbackTimer);
+    feedbackTimer = setTimeout(sendAnswerFeedback, 1000);
+  });
+  feedbackObserver.observe(document.body, { subtree: true, attributes: true, attributeFilter: ['class'] });
+}
+
 // Function to extract all quiz questions at once
 function extractAllQuestions() {
   console.log("Extracting all quiz questions...");
@@ -333,7 +394,8 @@ async function processAllQuestionsAsync(mode = 'single') {
       questions: allQuizData.map(questionData => ({
         question: questionData.question,
         options: questionData.options
-      }))
+      })),
+      topic: getQuizTopic()
     };
     
     // Add multi_model parameter for multi-model analysis
@@ -437,6 +499,7 @@ async function processAllQuestionsAsync(mode = 'single') {
   isProcessing = false;
   window.isProcessing = isProcessing;
   showResultsUI();
+  watchForQuizResults();
   console.log("All questions processed!");
 }
 
@@ -449,7 +512,8 @@ async function processQuestion(questionData, mode = 'single', retryCount = 0) {
     
     const requestBody = { 
       question: questionData.question, 
-      options: questionData.options 
+      options: questionData.options,
+      topic: getQuizTopic()
     };
     
     // Add multi_model parameter for multi-model analysis
@@ -482,7 +546,12 @@ async function processQuestion(questionData, mode = 'single', retryCount = 0) {
     if (!response.ok) {
       const errorText = await response.text();
       console.error('[Quiz Assistant] HTTP error in single:', response.status, errorText);
-      throw new Error(`HTTP ${response.status}: ${errorText}`);
+      const httpError = new Error(`HTTP ${response.status}: ${errorText}`);
+      // Server is shedding load: wait as long as it asks before retrying
+      if (response.status === 429) {
+        httpError.retryAfterMs = (parseInt(response.headers.get('Retry-After'), 10) || 1) * 1000;
+      }
+      throw httpError;
     }
     const data = await response.json();
     
@@ -525,6 +594,7 @@ async function processQuestion(questionData, mode = 'single', retryCount = 0) {
     
     // Clear any previous retry counts
     if (questionData.retryCount) delete questionData.retryCount;
+    watchForQuizResults();
     
   } catch (error) {
     console.error(`Error processing question ${questionData.index + 1} (attempt ${retryCount + 1}):`, error);
@@ -534,8 +604,8 @@ async function processQuestion(questionData, mode = 'single', retryCount = 0) {
       console.log(`Retrying question ${questionData.index + 1} (attempt ${retryCount + 2}/${maxRetries + 1})`);
       questionData.retryCount = retryCount + 1;
       
-      // Wait before retry (exponential backoff)
-      await new Promise(resolve => setTimeout(resolve, 1000 * (retryCount + 1)));
+      // Wait before retry (exponential backoff, or the server's Retry-After when overloaded)
+      await new Promise(resolve => setTimeout(resolve, error.retryAfterMs || 1000 * (retryCount + 1)));
       
       // Recursive retry
       return await processQuestion(questionData, mode, retryCount + 1);
@@ -1923,6 +1993,75 @@ window.testCORS = async function() {
   }
 };
 
+// === Speculative prefetch ===
+// As soon as quiz questions are on the page, ask the backend to answer them in its low-priority
+// background lane, so most answers are cached by the time the user clicks "Process All".
+// The background worker cancels the prefetch when this tab closes or navigates away.
+let prefetchJobId = null;
+
+async function prefetchQuiz() {
+  const questions = extractAllQuestions();
+  if (questions.length === 0 || prefetchJobId) return;
+  
+  const apiKey = await new Promise(resolve => getApiKey(resolve));
+  if (!apiKey) return;
+  try {
+    const response = await fetch("http://localhost:3000/prefetch", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        "X-API-Key": apiKey
+      },
+      body: JSON.stringify({
+        questions: questions.map(q => ({ question: q.question, options: q.options })),
+        topic: getQuizTopic()
+      })
+    });
+    if (!response.ok) {
+      console.warn(`[Quiz Assistant] Prefetch rejected: ${response.status}`);
+      return;
+    }
+    const result = await response.json();
+    console.log(`[Quiz Assistant] Prefetch ${result.status} for ${questions.length} questions`);
+    if (result.job) {
+      prefetchJobId = result.job.job_id;
+      if (typeof chrome !== 'undefined' && chrome.runtime && chrome.runtime.sendMessage) {
+        chrome.runtime.sendMessage({ action: 'prefetchStarted', jobId: prefetchJobId, apiKey: apiKey });
+      }
+    }
+  } catch (err) {
+    console.warn('[Quiz Assistant] Prefetch failed (backend not running?):', err);
+  }
+}
+
+function cancelPrefetch() {
+  if (!prefetchJobId) return;
+  if (typeof chrome !== 'undefined' && chrome.runtime && chrome.runtime.sendMessage) {
+    chrome.runtime.sendMessage({ action: 'cancelPrefetch', jobId: prefetchJobId });
+  }
+  prefetchJobId = null;
+}
+
+// Quiz markup may be rendered after document_end; wait (briefly) for the first question
+function schedulePrefetch() {
+  if (document.querySelector(".wpProQuiz_listItem")) {
+    prefetchQuiz();
+    return;
+  }
+  if (typeof MutationObserver === 'undefined') return;
+  const observer = new MutationObserver(() => {
+    if (document.querySelector(".wpProQuiz_listItem")) {
+      observer.disconnect();
+      prefetchQuiz();
+    }
+  });
+  observer.observe(document.body, { childList: true, subtree: true });
+  setTimeout(() => observer.disconnect(), 30000);
+}
+
+window.addEventListener('pagehide', cancelPrefetch);
+schedulePrefetch();
+
 // Make functions available immediately
 console.log("Enhanced Quiz Assistant content script loaded successfully");
 console.log("Available functions: runQuizAssistant(), autoCompleteQuiz(), searchQuestion(), searchAllQuestions(), testCORS(), clearQuizLogs()");